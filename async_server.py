@@ -0,0 +1,514 @@
+"""
+Async Webhook Server - asyncio entry point for the trading bot
+Serves the same routes as webhook_server.py (/webhook, /health, /balance,
+/positions, /history, /events and the dashboard) on an aiohttp server. All
+Binance calls go through one AsyncClient whose aiohttp session keeps a pool of
+keep-alive connections, so an alert waiting on Binance holds no thread. Every
+call is charged to the same RateLimiter budget as the blocking client.
+Alerts take the same path as on the Flask server (trading_core.py): they are
+de-duplicated, coalesced (COALESCE_WINDOW), queued on per-account workers
+(ORDER_QUEUE_ENABLED) and routed (ROUTING_CONFIG), each routed account with
+its own AsyncClient and balance snapshot. The blocking server module
+(webhook_server.py) is not imported.
+
+Usage:
+    python async_server.py
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+
+import aiohttp
+from aiohttp import web
+from binance.client import AsyncClient, Client
+from binance.exceptions import BinanceAPIException
+
+from exchange_sim import simulator_client
+from logging_config import LazyJson, setup_logging
+import metrics
+from rate_limiter import AsyncLimitedClient, RateLimitExceeded, PRIORITY_DASHBOARD
+from reconciler import FillReconciler
+from routing import Router, load_routing_config
+from signal_parser import parse_payload, signal_error
+import trading_core as core
+from trading_core import AlertPipeline, BinanceStatus, build_account
+
+# Connection pool size for the shared Binance session
+ASYNC_POOL_SIZE = int(os.getenv('ASYNC_POOL_SIZE', '20'))
+HOST = os.getenv('HOST', '0.0.0.0')
+PORT = int(os.getenv('PORT', '5000'))
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+logger = logging.getLogger('async_server')
+
+# ============================================================================
+# BINANCE ACCESS
+# ============================================================================
+
+async def create_binance_client(api_key=None, api_secret=None, testnet=None, name='main'):
+    """AsyncClient over a keep-alive connection pool (None if it can't connect)"""
+    try:
+        connector = aiohttp.TCPConnector(limit=ASYNC_POOL_SIZE, keepalive_timeout=60)
+        client_class = simulator_client(AsyncClient, core.BINANCE_SIMULATOR_URL) if core.BINANCE_SIMULATOR_URL else AsyncClient
+        client = await client_class.create(
+            core.BINANCE_API_KEY if api_key is None else api_key,
+            core.BINANCE_API_SECRET if api_secret is None else api_secret,
+            testnet=core.BINANCE_TESTNET if testnet is None else testnet,
+            session_params={'connector': connector}
+        )
+        target = f"simulator at {core.BINANCE_SIMULATOR_URL}" if core.BINANCE_SIMULATOR_URL else "Testnet"
+        logger.info(f"Async Binance client for account '{name}' initialized against {target} (pool size {ASYNC_POOL_SIZE})")
+        return AsyncLimitedClient(client, core.rate_limiter, account=name)
+    except Exception as e:
+        logger.error(f"Failed to initialize async Binance client for account '{name}': {e}")
+        return None
+
+
+async def load_routed_accounts(app):
+    """Load ROUTING_CONFIG into the app's router and give every routed account its own AsyncClient"""
+    def make_account(name, settings):
+        return build_account(name, None, app['execute'], settings=settings)
+
+    main = app['router'].accounts[app['router'].default_account]
+    app['router'] = load_routing_config(core.ROUTING_CONFIG, make_account, main)
+    for account in app['router'].all_accounts():
+        if account is not main:
+            account.client = await create_binance_client(*core.account_credentials(account.settings), name=account.name)
+
+
+def main_account(app):
+    """The account behind the server's own API keys (the router's fallback)"""
+    router = app['router']
+    return router.accounts[router.default_account]
+
+
+@core.BALANCE_CHECK_SECONDS.time()
+async def ensure_balances(app, account=None):
+    """Refresh an account's balance snapshot (default: main) if it is older than BALANCE_MAX_AGE"""
+    account = account or main_account(app)
+    cache = account.balance_cache
+    if cache.age() <= core.BALANCE_MAX_AGE:
+        return
+    async with app['balance_locks'].setdefault(account.name, asyncio.Lock()):
+        # Another request may have refreshed it while we waited for the lock
+        if cache.age() > core.BALANCE_MAX_AGE:
+            cache.load(await account.client.get_account())
+
+
+async def balance_refresher(app):
+    """Background task keeping every account's balance snapshot fresh"""
+    while True:
+        for account in app['router'].all_accounts():
+            try:
+                if account.client:
+                    account.balance_cache.load(await account.client.get_account())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Balance refresh failed for account '{account.name}': {e}")
+        await asyncio.sleep(core.BALANCE_REFRESH_INTERVAL)
+
+
+@core.PRICE_LOOKUP_SECONDS.time()
+async def get_market_price(app, symbol):
+    """Price from the streamed price book, falling back to the async ticker endpoint"""
+    price = core.price_book.get(symbol, max_age=core.PRICE_MAX_AGE)
+    if price is not None or not app['client']:
+        return price
+    ticker = await app['client'].get_symbol_ticker(symbol=symbol)
+    price = float(ticker['price'])
+    core.price_book.update(symbol, price)
+    return price
+
+# ============================================================================
+# ORDER EXECUTION
+# ============================================================================
+
+async def process_signal(app, data):
+    """Async counterpart of webhook_server.process_signal. Returns (response, http_status)"""
+    signal = str(data.get('signal', '')).lower()
+    symbol = data.get('symbol', core.TRADING_PAIR)
+    price = data.get('price', 0)
+    timestamp = datetime.now().isoformat()
+
+    if price == 0:
+        try:
+            price = await get_market_price(app, symbol) or 0
+        except Exception as e:
+            logger.warning(f"Could not fetch market price: {e}")
+
+    error_msg = signal_error(signal, price)
+    if error_msg:
+        logger.error(error_msg)
+        core.save_trade(timestamp, signal, symbol, price, status='error', error=error_msg)
+        core.SIGNALS_TOTAL.labels('invalid', 'error').inc()
+        return {'error': error_msg}, 400
+
+    order_id = None
+    quantity = None
+    status = 'success'
+    error = None
+    base_asset, quote_asset = core.exchange_info.assets(symbol)
+
+    try:
+        # Pick the account and sizing rule for this alert, then that account's async client
+        account, route = app['router'].resolve(symbol, data.get('strategy'), data.get('account'))
+        if not account.client:
+            raise Exception(f"Binance client for account '{account.name}' not initialized")
+        client = account.client
+        cache = account.balance_cache
+        trade_quantity = core.order_size(route, data, price)
+        trade_quantity = core.exchange_info.normalize_quantity(symbol, trade_quantity, price)
+        await ensure_balances(app, account)
+
+        if signal == 'buy':
+            balance = cache.get_free(quote_asset)
+            required = trade_quantity * price if price > 0 else trade_quantity
+            if balance < required:
+                raise Exception(f"Insufficient {quote_asset} balance. Required: {required}, Available: {balance}")
+            side = Client.SIDE_BUY
+        else:
+            base_balance = cache.get_free(base_asset)
+            if base_balance < trade_quantity:
+                raise Exception(f"Insufficient {base_asset} balance. Required: {trade_quantity}, Available: {base_balance}")
+            side = Client.SIDE_SELL
+
+        logger.info("Executing %s order: %s %s (%s)", side, trade_quantity, symbol, account.name)
+        order_start = time.perf_counter()
+        try:
+            order = await client.create_order(
+                symbol=symbol,
+                side=side,
+                type=Client.ORDER_TYPE_MARKET,
+                quantity=trade_quantity
+            )
+        except BinanceAPIException as e:
+            cache.invalidate()
+            raise Exception(f"Binance API error: {e.message}")
+        finally:
+            core.ORDER_SECONDS.observe(time.perf_counter() - order_start)
+        order_id = order.get('orderId')
+        quantity = order.get('executedQty')
+        core.record_fill(account, symbol, order, base_asset, quote_asset)
+        logger.info(f"Trade executed successfully: {signal} {quantity} {symbol}")
+
+    except Exception as e:
+        status = 'error'
+        error = str(e)
+        logger.error(f"Trade execution failed: {error}")
+
+    core.save_trade(timestamp, signal, symbol, price, order_id, status, quantity, error)
+    core.SIGNALS_TOTAL.labels(signal, status).inc()
+
+    response = {
+        'status': status,
+        'signal': signal,
+        'symbol': symbol,
+        'price': price,
+        'order_id': order_id,
+        'quantity': quantity,
+        'timestamp': timestamp
+    }
+    if error:
+        response['error'] = error
+    return response, 200 if status == 'success' else 500
+
+
+def execute_threadsafe(app, data):
+    """process_signal for order workers and the coalescing window's timers, which run on threads"""
+    return asyncio.run_coroutine_threadsafe(process_signal(app, data), app['loop']).result()
+
+
+class BlockingClient:
+    """Blocking view of an async client for code on other threads (the fill reconciler)"""
+
+    def __init__(self, client, loop):
+        self._client = client
+        self._loop = loop
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        return lambda *args, **kwargs: asyncio.run_coroutine_threadsafe(method(*args, **kwargs), self._loop).result()
+
+# ============================================================================
+# ROUTES
+# ============================================================================
+
+@core.WEBHOOK_SECONDS.time()
+async def webhook(request):
+    """Receive TradingView webhook alerts"""
+    try:
+        content_type = request.headers.get('Content-Type', '')
+        body = await request.read()
+        form = await request.post() if 'multipart/form-data' in content_type else None
+        parse_start = time.perf_counter()
+        parsed = parse_payload(content_type, body, args=request.query, form=form, default_symbol=core.TRADING_PAIR)
+        core.PARSE_SECONDS.observe(time.perf_counter() - parse_start)
+
+        if parsed is None:
+            logger.error(f"Could not parse webhook. Content-Type: {content_type}, raw data: {body[:500]!r}")
+            return web.json_response({
+                'error': 'Could not parse webhook payload',
+                'content_type': content_type,
+                'hint': 'Send JSON, form fields, signal|symbol|price or the TradingView template message'
+            }, status=400)
+
+        data = parsed.to_dict()
+        logger.info("Received webhook (%s): %s", parsed.format, LazyJson(data),
+                    extra={'format': parsed.format, 'alert': data})
+        fingerprint, seen = core.claim_alert(data)
+        if seen:
+            response, status = core.duplicate_response(data, fingerprint, seen)
+            return web.json_response(response, status=status)
+        # Coalescing window or order queue first (see trading_core.AlertPipeline), else execute now
+        pipeline = request.app['pipeline']
+        response, status = pipeline.hold(data) or pipeline.enqueue(data) or await process_signal(request.app, data)
+        core.settle_alert(fingerprint, status, response.get('job_id'))
+        return web.json_response(response, status=status)
+    except Exception as e:
+        error_msg = f"Webhook processing error: {e}"
+        logger.error(error_msg)
+        return web.json_response({'error': error_msg}, status=500)
+
+
+async def connectivity_monitor(app):
+    """Background task: one Binance ping per HEALTH_CHECK_INTERVAL, shared by /health and every dashboard"""
+    status = app['binance_status']
+    while True:
+        client = app['client']
+        if client is None:
+            status.update('not_initialized', 'Binance client not initialized. Check API keys.', False)
+        else:
+            try:
+                with core.rate_limiter.priority(PRIORITY_DASHBOARD):
+                    await client.ping()
+                status.update('connected', None)
+            except asyncio.CancelledError:
+                raise
+            except RateLimitExceeded:
+                pass  # ping shed to save request weight: keep the last known state
+            except Exception as e:
+                status.update('error', str(e))
+        await asyncio.sleep(core.HEALTH_CHECK_INTERVAL)
+
+
+async def health(request):
+    """Health check endpoint (connectivity as of the last background ping)"""
+    app = request.app
+    cache = app['balance_cache']
+    pipeline = app['pipeline']
+    return web.json_response({
+        'status': 'healthy',
+        'server': 'async',
+        'timestamp': datetime.now().isoformat(),
+        **app['binance_status'].state,
+        'binance_simulator': core.BINANCE_SIMULATOR_URL or None,
+        'api_key_set': bool(core.BINANCE_API_KEY and core.BINANCE_API_KEY != 'your_testnet_api_key'),
+        'api_secret_set': bool(core.BINANCE_API_SECRET and core.BINANCE_API_SECRET != 'your_testnet_api_secret'),
+        'order_queue': {a.name: a.order_queue.stats() for a in app['router'].all_accounts()} if core.ORDER_QUEUE_ENABLED else None,
+        'balance_cache_age': round(cache.age(), 3) if cache.age() < 1e9 else None,
+        'price_stream_connected': core.price_stream.connected,
+        'rate_limit': core.rate_limiter.stats(),
+        'dedup': core.alert_index.stats() if core.DEDUP_ENABLED else None,
+        'coalescing': pipeline.coalescer.stats() if pipeline.coalescer else None,
+        'reconciler': app['reconciler'].stats() if core.RECONCILE_ENABLED else None
+    })
+
+
+async def job_status(request):
+    """Status of a queued order job"""
+    job = request.app['pipeline'].find_job(request.match_info['job_id'])
+    if not job:
+        return web.json_response({'error': f"Unknown job: {request.match_info['job_id']}"}, status=404)
+    return web.json_response(job)
+
+
+async def metrics_endpoint(request):
+    """Prometheus text-format metrics (same registry as the Flask server)"""
+    return web.Response(body=metrics.render().encode(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
+
+async def positions(request):
+    account = request.query.get('account')
+    symbol = request.query.get('symbol', '').upper() or None
+    rows = core.position_book.all(account=account, symbol=symbol)
+    return web.json_response({'positions': rows, 'totals': core.position_book.totals(rows), 'count': len(rows)})
+
+
+async def balance(request):
+    """Get account balances"""
+    if not request.app['client']:
+        return web.json_response({
+            'error': 'Binance client not initialized. Please check your API keys in .env file.',
+            'details': 'Make sure BINANCE_API_KEY and BINANCE_API_SECRET are set correctly'
+        }, status=500)
+    try:
+        with core.rate_limiter.priority(PRIORITY_DASHBOARD):
+            await ensure_balances(request.app)
+    except RateLimitExceeded:
+        # Refresh shed to save request weight for trading: serve the last snapshot
+        pass
+    except BinanceAPIException as e:
+        return web.json_response({
+            'error': f"Binance API error: {e.message}",
+            'details': 'Check your API keys and ensure they are for Binance Testnet',
+            'code': e.code
+        }, status=500)
+    except Exception as e:
+        return web.json_response({
+            'error': f"Failed to fetch account: {e}",
+            'details': 'Network error or invalid API credentials'
+        }, status=500)
+    return web.json_response({'balances': core.format_balances(request.app['balance_cache'].snapshot())})
+
+
+async def history(request):
+    """Get trade history (see trading_core.history_page for the query parameters)"""
+    try:
+        if_none_match = [tag.value for tag in request.if_none_match or ()]
+        loop = asyncio.get_running_loop()
+        body, etag, status = await loop.run_in_executor(
+            None, core.history_page, request.query, request.query_string, if_none_match
+        )
+        headers = {'ETag': f'"{etag}"'} if etag else {}
+        if body is None:
+            return web.Response(status=status, headers=headers)
+        return web.json_response(body, status=status, headers=headers)
+    except Exception as e:
+        return web.json_response({'error': str(e)}, status=500)
+
+
+async def events(request):
+    """Server-Sent Events stream for the dashboard"""
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    await response.prepare(request)
+    # asyncio-native subscriber: an open dashboard holds no executor thread
+    frames = core.event_bus.stream_async(core.event_bus.subscribe_async())
+    try:
+        async for frame in frames:
+            await response.write(frame.encode())
+    except (ConnectionResetError, asyncio.CancelledError):
+        pass
+    finally:
+        await frames.aclose()
+    return response
+
+
+async def index(request):
+    """Serve the main dashboard page"""
+    return web.FileResponse(os.path.join(STATIC_DIR, 'index.html'))
+
+
+async def serve_static(request):
+    """Serve static files (CSS, JS, etc.)"""
+    path = os.path.normpath(os.path.join(STATIC_DIR, request.match_info['path']))
+    if not path.startswith(STATIC_DIR + os.sep) or not os.path.isfile(path):
+        raise web.HTTPNotFound()
+    return web.FileResponse(path)
+
+# ============================================================================
+# APP
+# ============================================================================
+
+async def on_startup(app):
+    app['loop'] = asyncio.get_running_loop()
+    if app['client'] is None and app['connect']:
+        app['client'] = await create_binance_client()
+    main_account(app).client = app['client']
+    if app['connect'] and os.path.exists(core.ROUTING_CONFIG):
+        await load_routed_accounts(app)
+    core.init_trade_history()
+    if core.DEDUP_ENABLED:
+        core.alert_index.load()
+    core.position_book.start()
+    if app['client'] and app['connect']:
+        try:
+            core.exchange_info.load(await app['client'].get_exchange_info())
+        except Exception as e:
+            logger.warning(f"Could not load exchange info, skipping local filter checks: {e}")
+    if core.PRICE_STREAM_ENABLED:
+        core.start_price_stream(app['router'])
+    accounts = app['router'].all_accounts()
+    if core.ORDER_QUEUE_ENABLED:
+        for account in accounts:
+            account.order_queue.start()
+    if any(account.client for account in accounts):
+        app['refresher'] = asyncio.create_task(balance_refresher(app))
+    app['monitor'] = asyncio.create_task(connectivity_monitor(app))
+    if core.RECONCILE_ENABLED and app['client'] and app['connect']:
+        # The reconciler pages history on its own thread, through the async clients
+        app['reconciler'].start()
+
+
+async def on_cleanup(app):
+    for task in ('refresher', 'monitor'):
+        if app.get(task):
+            app[task].cancel()
+    loop = asyncio.get_running_loop()
+    for account in app['router'].all_accounts():
+        if core.ORDER_QUEUE_ENABLED:
+            # Off the loop: the workers finish their jobs on it
+            await loop.run_in_executor(None, account.order_queue.stop)
+        if app['connect'] and account.client:
+            await account.client.wrapped.close_connection()
+
+
+def create_app(client=None, connect=True):
+    """
+    Build the aiohttp application.
+
+    client  - an already-created async Binance client (e.g. for benchmarks), charged
+              to the rate limiter like the others; when omitted and connect is True
+              one is created at startup
+    """
+    app = web.Application()
+    if client is not None:
+        client = AsyncLimitedClient(client, core.rate_limiter)
+    app['client'] = client
+    app['connect'] = connect and client is None
+    app['balance_locks'] = {}
+    app['execute'] = lambda data: execute_threadsafe(app, data)
+    # The account behind the server's own API keys; routed ones are added at startup
+    main = build_account('main', client, app['execute'], on_change=core.publish_balances)
+    app['balance_cache'] = main.balance_cache
+    app['router'] = Router({'main': main}, [], 'main')
+    app['pipeline'] = AlertPipeline(lambda: app['router'], app['execute'])
+    app['binance_status'] = BinanceStatus(False)
+    app['reconciler'] = FillReconciler(
+        core.trade_journal,
+        lambda: [(a.name, BlockingClient(a.client, app['loop']) if a.client else None)
+                 for a in app['router'].all_accounts()],
+        limiter=core.rate_limiter,
+        interval=core.RECONCILE_INTERVAL,
+        max_pages=core.RECONCILE_MAX_PAGES
+    )
+    app.router.add_post('/webhook', webhook)
+    app.router.add_get('/health', health)
+    app.router.add_get('/jobs/{job_id}', job_status)
+    app.router.add_get('/metrics', metrics_endpoint)
+    app.router.add_get('/positions', positions)
+    app.router.add_get('/balance', balance)
+    app.router.add_get('/history', history)
+    app.router.add_get('/events', events)
+    app.router.add_get('/', index)
+    app.router.add_get('/{path:.+}', serve_static)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == '__main__':
+    setup_logging()
+    logger.info("Starting Trading Bot Webhook Server (async)...")
+    logger.info(f"Trading Pair: {core.TRADING_PAIR}")
+    logger.info(f"Trade Amount: {core.TRADE_AMOUNT}")
+    logger.info(f"Server will listen on http://localhost:{PORT}")
+    web.run_app(create_app(), host=HOST, port=PORT, print=None)
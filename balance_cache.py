@@ -0,0 +1,153 @@
+"""
+Balance Cache - In-memory account balance snapshot
+Keeps a per-asset index of the Binance account so pre-trade checks and the
+dashboard don't need a full get_account() call every time
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceCache:
+    """
+    Account balances indexed by asset.
+
+    The snapshot is refreshed from `fetch_account` (normally client.get_account)
+    by a background thread, patched locally from order fills in between, and
+    re-fetched synchronously whenever a read finds it older than `max_age`.
+    `on_change` is called with a snapshot whenever the balances change.
+    """
+
+    def __init__(self, fetch_account, max_age=10.0, refresh_interval=5.0, on_change=None):
+        self.fetch_account = fetch_account
+        self.on_change = on_change
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self._balances = {}
+        self._updated_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.last_error = None
+
+    # ------------------------------------------------------------------
+    # Refreshing
+    # ------------------------------------------------------------------
+
+    def refresh(self):
+        """Fetch the full account once and rebuild the index. Raises on failure"""
+        with self._refresh_lock:
+            try:
+                account = self.fetch_account()
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            return self.load(account)
+
+    def load(self, account):
+        """Rebuild the index from a get_account() payload fetched by the caller"""
+        balances = {
+            b['asset']: {'free': float(b['free']), 'locked': float(b['locked'])}
+            for b in account['balances']
+        }
+        with self._lock:
+            changed = balances != self._balances
+            self._balances = balances
+            self._updated_at = time.time()
+        self.last_error = None
+        if changed:
+            self._notify()
+        return balances
+
+    def invalidate(self):
+        """Mark the snapshot stale and wake the refresher (e.g. after a rejected order)"""
+        with self._lock:
+            self._updated_at = 0.0
+        self._wakeup.set()
+
+    def age(self):
+        """Seconds since the last full refresh"""
+        return time.time() - self._updated_at
+
+    def ensure_fresh(self):
+        """Refresh synchronously if the snapshot is older than max_age"""
+        # Without fetch_account the owner refreshes through load() (e.g. from async code)
+        if self.fetch_account and self.age() > self.max_age:
+            self.refresh()
+
+    def start(self):
+        """Start the background refresh thread (idempotent)"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="balance-refresher", daemon=True)
+        self._thread.start()
+        logger.info(f"Balance cache refresher started (every {self.refresh_interval}s, max age {self.max_age}s)")
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Balance cache refresh failed: {e}")
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_free(self, asset):
+        """Free balance of an asset (0.0 if the account doesn't hold it)"""
+        self.ensure_fresh()
+        with self._lock:
+            entry = self._balances.get(asset)
+            return entry['free'] if entry else 0.0
+
+    def snapshot(self, refresh=True):
+        """Copy of the whole index: {asset: {'free': float, 'locked': float}}"""
+        if refresh:
+            self.ensure_fresh()
+        with self._lock:
+            return {asset: dict(entry) for asset, entry in self._balances.items()}
+
+    # ------------------------------------------------------------------
+    # Local updates
+    # ------------------------------------------------------------------
+
+    def apply_order(self, order, base_asset, quote_asset):
+        """Adjust balances from a filled order response without refetching the account"""
+        try:
+            executed = float(order.get('executedQty') or 0)
+            quote_qty = float(order.get('cummulativeQuoteQty') or 0)
+        except (TypeError, ValueError):
+            self.invalidate()
+            return
+        if executed <= 0:
+            return
+        sign = 1 if order.get('side') == 'BUY' else -1
+        with self._lock:
+            self._adjust(base_asset, sign * executed)
+            self._adjust(quote_asset, -sign * quote_qty)
+            for fill in order.get('fills') or []:
+                commission = float(fill.get('commission') or 0)
+                if commission:
+                    self._adjust(fill.get('commissionAsset'), -commission)
+        self._notify()
+
+    def _notify(self):
+        if not self.on_change:
+            return
+        with self._lock:
+            snapshot = {asset: dict(entry) for asset, entry in self._balances.items()}
+        try:
+            self.on_change(snapshot)
+        except Exception as e:
+            logger.error(f"Balance change callback failed: {e}")
+
+    def _adjust(self, asset, delta):
+        entry = self._balances.setdefault(asset, {'free': 0.0, 'locked': 0.0})
+        entry['free'] = max(0.0, entry['free'] + delta)
@@ -0,0 +1,230 @@
+"""
+Burst benchmark: Flask (threaded) server vs. async server
+Fires bursts of concurrent alerts at both entry points, each backed by a stub
+Binance client that answers after a fixed network latency, and reports
+throughput and latency percentiles
+
+With "sim" (or BINANCE_SIMULATOR_URL set) both servers use real python-binance
+clients against the local exchange simulator instead, so HTTP, signing and
+response parsing are part of the measurement. An in-process simulator shares
+the GIL with the Flask server; run exchange_sim.py separately for cleaner numbers.
+
+Usage:
+    python bench_async.py                        - 500 alerts, 50 concurrent, 50 ms exchange latency
+    python bench_async.py 2000 200 0.08          - alerts, concurrency, latency in seconds
+    python bench_async.py 500 50 0.05 sim        - against an in-process exchange simulator
+    BINANCE_SIMULATOR_URL=http://127.0.0.1:9000 python bench_async.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Keep benchmark trades out of the real journal and off the network
+os.environ.setdefault('TRADE_JOURNAL_FILE', os.path.join(tempfile.mkdtemp(), 'bench_journal.db'))
+os.environ.setdefault('PRICE_STREAM_ENABLED', 'false')
+# The stub exchange has no rate limits; don't let the client-side limiter throttle the burst
+os.environ.setdefault('RATE_LIMIT_WEIGHT_PER_MINUTE', '100000000')
+os.environ.setdefault('RATE_LIMIT_ORDERS_PER_10S', '100000000')
+# Every burst alert is identical on purpose
+os.environ.setdefault('DEDUP_ENABLED', 'false')
+
+import aiohttp
+from aiohttp import web
+from binance.client import Client
+from werkzeug.serving import make_server
+
+import webhook_server as ws
+import async_server
+import exchange_sim
+import trading_core
+
+ACCOUNT = {'balances': [
+    {'asset': 'USDT', 'free': '1000000000', 'locked': '0'},
+    {'asset': 'BTC', 'free': '1000000', 'locked': '0'},
+]}
+
+
+def fake_order(params, order_id):
+    return {
+        'orderId': order_id,
+        'symbol': params['symbol'],
+        'side': params['side'],
+        'status': 'FILLED',
+        'executedQty': str(params['quantity']),
+        'cummulativeQuoteQty': str(params['quantity'] * 50000),
+        'fills': [],
+    }
+
+
+class LatencyClient:
+    """Blocking stand-in for binance.Client: every call sleeps `latency` seconds"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.orders = 0
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        time.sleep(self.latency)
+
+    def ping(self):
+        self._wait()
+        return {}
+
+    def get_account(self):
+        self._wait()
+        return ACCOUNT
+
+    def get_symbol_ticker(self, symbol):
+        self._wait()
+        return {'symbol': symbol, 'price': '50000'}
+
+    def create_order(self, **params):
+        self._wait()
+        with self._lock:
+            self.orders += 1
+            return fake_order(params, self.orders)
+
+
+class AsyncLatencyClient(LatencyClient):
+    """Async stand-in for binance.AsyncClient with the same latency"""
+
+    async def ping(self):
+        await asyncio.sleep(self.latency)
+        return {}
+
+    async def get_account(self):
+        await asyncio.sleep(self.latency)
+        return ACCOUNT
+
+    async def get_symbol_ticker(self, symbol):
+        await asyncio.sleep(self.latency)
+        return {'symbol': symbol, 'price': '50000'}
+
+    async def create_order(self, **params):
+        await asyncio.sleep(self.latency)
+        self.orders += 1
+        return fake_order(params, self.orders)
+
+
+def start_simulator(latency):
+    """In-process exchange simulator with the given latency and no limits that a burst would hit"""
+    url, _ = exchange_sim.start_in_thread(exchange_sim.SimExchange(
+        latency_ms=latency * 1000,
+        weight_limit=100000000,
+        order_limit=100000000,
+        balances={'USDT': 1e12, 'BTC': 1e6},
+    ))
+    return url
+
+
+def start_flask(latency, simulator=None):
+    """Flask app on the threaded Werkzeug server, in a background thread"""
+    if simulator:
+        sim_client = exchange_sim.simulator_client(Client, simulator)
+        ws.set_client(sim_client(ws.BINANCE_API_KEY, ws.BINANCE_API_SECRET, testnet=True))
+    else:
+        ws.set_client(LatencyClient(latency))
+    ws.init_trade_history()
+    server = make_server('127.0.0.1', 0, ws.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def start_async(latency, simulator=None):
+    """Async app on its own event loop, in a background thread"""
+    ready = threading.Event()
+    holder = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        if simulator:
+            # create_binance_client() picks the simulator up from the server config
+            app = async_server.create_app()
+        else:
+            app = async_server.create_app(client=AsyncLatencyClient(latency), connect=False)
+        runner = web.AppRunner(app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        loop.run_until_complete(site.start())
+        holder['url'] = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        holder['loop'] = loop
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return holder['url']
+
+
+async def burst(url, alerts, concurrency):
+    """Send `alerts` webhooks with at most `concurrency` in flight"""
+    payload = json.dumps({'signal': 'buy', 'symbol': 'BTCUSDT', 'price': 50000, 'quantity': 0.001})
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.post(f"{url}/webhook", data=payload, headers={'Content-Type': 'application/json'}) as r:
+                    await r.read()
+                    if r.status != 200:
+                        errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(alerts)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return {
+        'alerts': alerts,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'alerts_per_sec': round(alerts / elapsed, 1),
+        'p50_ms': round(pct(0.50), 2),
+        'p99_ms': round(pct(0.99), 2),
+        'errors': errors,
+    }
+
+
+if __name__ == '__main__':
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    use_simulator = len(sys.argv) > 4 and sys.argv[4] == 'sim'
+
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    simulator = trading_core.BINANCE_SIMULATOR_URL or (start_simulator(latency) if use_simulator else None)
+    trading_core.BINANCE_SIMULATOR_URL = simulator or ''
+    _, flask_url = start_flask(latency, simulator)
+    async_url = start_async(latency, simulator)
+
+    results = {
+        'flask': asyncio.run(burst(flask_url, alerts, concurrency)),
+        'async': asyncio.run(burst(async_url, alerts, concurrency)),
+    }
+
+    print("=" * 80)
+    exchange = f"simulator at {simulator}" if simulator else "stub clients"
+    print(f"BURST BENCHMARK: {alerts} alerts, {concurrency} concurrent, {latency * 1000:.0f} ms exchange latency ({exchange})")
+    print("=" * 80)
+    print(f"{'Server':<8} {'alerts/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    print("-" * 80)
+    for name, r in results.items():
+        print(f"{name:<8} {r['alerts_per_sec']:>10} {r['p50_ms']:>10} {r['p99_ms']:>10} {r['errors']:>8}")
+    print("-" * 80)
+    print(json.dumps(results))
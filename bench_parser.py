@@ -0,0 +1,96 @@
+"""
+Micro-benchmark for the webhook payload parser
+Runs signal_parser.parse_payload over the payload shapes TradingView actually
+sends and reports parse time and memory allocation per payload
+
+Usage:
+    python bench_parser.py              - Default run (20000 iterations per payload)
+    python bench_parser.py 100000       - Custom iteration count
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+
+from signal_parser import parse_payload
+
+# (name, content type, body, query args)
+CORPUS = [
+    ('json (pine alert)', 'application/json',
+     b'{"signal": "buy", "symbol": "BTCUSDT", "price": 90104.49, "time": "1734120000000"}', {}),
+    ('json as text/plain', 'text/plain; charset=utf-8',
+     b'{"signal": "sell", "symbol": "BTCUSDT", "price": 90104.49, "time": "1734120000000"}', {}),
+    ('template text', 'text/plain; charset=utf-8',
+     b'order buy @ 0.001 filled on BTCUSDT', {}),
+    ('pipe text', 'text/plain; charset=utf-8',
+     b'buy|BTCUSDT|90104.49', {}),
+    ('form fields', 'application/x-www-form-urlencoded',
+     b'signal=buy&symbol=BTCUSDT&price=90104.49&quantity=0.001', {}),
+    ('form message', 'application/x-www-form-urlencoded',
+     b'message=order+sell+%40+0.002+filled+on+ETHUSDT', {}),
+    ('query string', '',
+     b'', {'signal': 'buy', 'symbol': 'BTCUSDT', 'price': '90104.49'}),
+    ('unparseable', 'text/plain',
+     b'hello from tradingview', {}),
+]
+
+
+def time_payload(content_type, body, args, iterations):
+    """Mean nanoseconds per parse"""
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        parse_payload(content_type, body, args=args)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def measure_allocations(content_type, body, args, iterations=1000):
+    """
+    Memory allocated by one parse, via tracemalloc:
+    peak bytes held during a single parse, and blocks still alive after
+    `iterations` parses (non-zero means something is being retained)
+    """
+    parse_payload(content_type, body, args=args)  # warm up caches
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    parse_payload(content_type, body, args=args)
+    _, peak = tracemalloc.get_traced_memory()
+    before = tracemalloc.take_snapshot()
+    for _ in range(iterations):
+        parse_payload(content_type, body, args=args)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return peak - base, retained
+
+
+def run(iterations=20000):
+    results = []
+    for name, content_type, body, args in CORPUS:
+        ns = time_payload(content_type, body, args, iterations)
+        peak_bytes, retained = measure_allocations(content_type, body, args)
+        parsed = parse_payload(content_type, body, args=args)
+        results.append({
+            'payload': name,
+            'format': parsed.format if parsed else None,
+            'us_per_parse': round(ns / 1000, 3),
+            'peak_bytes': peak_bytes,
+            'retained_blocks': retained,
+        })
+    return results
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    results = run(iterations)
+
+    print("=" * 80)
+    print(f"WEBHOOK PARSER BENCHMARK ({iterations} iterations per payload)")
+    print("=" * 80)
+    print(f"{'Payload':<22} {'Format':<10} {'us/parse':>10} {'peak bytes':>12} {'retained':>10}")
+    print("-" * 80)
+    for r in results:
+        print(f"{r['payload']:<22} {str(r['format']):<10} {r['us_per_parse']:>10.3f} {r['peak_bytes']:>12} {r['retained_blocks']:>10}")
+    print("-" * 80)
+    print(json.dumps(results))
@@ -0,0 +1,442 @@
+"""
+Webhook load test: sustained alerts/sec and per-stage latency
+Replays a mix of payload formats (JSON, form, template text, query string) at a
+controlled rate and concurrency against the Flask and/or async server, backed
+by the local exchange simulator, and records latency histograms for the whole
+request and for each stage of the webhook path:
+
+    parse          - signal_parser.parse_payload
+    price_lookup   - price book / REST ticker fallback (alerts without a price)
+    balance_check  - balance cache read (refresh from Binance when stale)
+    order          - create_order round trip to the exchange
+    journal_write  - save_trade (queueing the row for the journal writer)
+
+Results are written as JSON (with the git revision) so runs from different
+versions can be compared with --compare.
+
+The simulator runs in its own process; the servers and the load generator share
+this one, as they must for the stage timers.
+
+Usage:
+    python bench_webhook.py                                 - 1000 alerts at 200/s, 50 concurrent, both servers
+    python bench_webhook.py --rate 0 --alerts 5000          - as fast as possible
+    python bench_webhook.py --server async --mix json=1,template=1 --exchange-latency-ms 20
+    python bench_webhook.py --compare bench_webhook_results.json --out new.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode
+
+# Keep load-test trades out of the real journal; every template alert is identical on purpose
+os.environ.setdefault('TRADE_JOURNAL_FILE', os.path.join(tempfile.mkdtemp(), 'bench_journal.db'))
+os.environ.setdefault('DEDUP_ENABLED', 'false')
+os.environ.setdefault('RATE_LIMIT_WEIGHT_PER_MINUTE', '100000000')
+os.environ.setdefault('RATE_LIMIT_ORDERS_PER_10S', '100000000')
+
+import aiohttp
+from aiohttp import web
+from binance.client import Client
+from werkzeug.serving import make_server
+
+import webhook_server as ws
+import async_server
+import exchange_sim
+import trading_core
+
+STAGES = ['parse', 'price_lookup', 'balance_check', 'order', 'journal_write']
+
+# Histogram bucket upper bounds in microseconds (1-2-5 series, 1 us .. 10 s)
+BUCKETS_US = [m * 10 ** e for e in range(7) for m in (1, 2, 5)] + [10 ** 7]
+
+# Symbols traded and their order sizes. Form and query alerts carry no quantity and
+# trade TRADE_AMOUNT, so the simulator's MIN_NOTIONAL is lowered to keep those valid.
+QUANTITIES = {'BTCUSDT': '0.001', 'ETHUSDT': '0.01'}
+SYMBOLS = list(QUANTITIES)
+
+# ============================================================================
+# PAYLOADS
+# ============================================================================
+
+def json_payload(signal, symbol, price):
+    body = {'signal': signal, 'symbol': symbol, 'quantity': QUANTITIES[symbol]}
+    if price:
+        body['price'] = price
+    return 'application/json', json.dumps(body).encode(), ''
+
+
+def form_payload(signal, symbol, price):
+    fields = {'signal': signal, 'symbol': symbol, 'quantity': QUANTITIES[symbol]}
+    if price:
+        fields['price'] = price
+    return 'application/x-www-form-urlencoded', urlencode(fields).encode(), ''
+
+
+def template_payload(signal, symbol, price):
+    return 'text/plain; charset=utf-8', f"order {signal} @ {QUANTITIES[symbol]} filled on {symbol}".encode(), ''
+
+
+def query_payload(signal, symbol, price):
+    fields = {'signal': signal, 'symbol': symbol, 'quantity': QUANTITIES[symbol]}
+    if price:
+        fields['price'] = price
+    return '', b'', '?' + urlencode(fields)
+
+
+FORMATS = {
+    'json': json_payload,
+    'form': form_payload,
+    'template': template_payload,
+    'query': query_payload,
+}
+
+
+def parse_mix(spec):
+    """'json=4,form=2' -> {'json': 4.0, 'form': 2.0}"""
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        if name not in FORMATS:
+            raise ValueError(f"Unknown payload format '{name}' (expected one of {', '.join(FORMATS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_alerts(count, mix, prices, seed=0):
+    """Alternating buy/sell alerts in the given format mix; about half carry no price"""
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    alerts = []
+    for i in range(count):
+        fmt = rng.choices(names, weights)[0]
+        symbol = SYMBOLS[i % len(SYMBOLS)]
+        signal = 'buy' if (i // len(SYMBOLS)) % 2 == 0 else 'sell'
+        price = prices[symbol] if rng.random() < 0.5 else None
+        alerts.append((fmt, *FORMATS[fmt](signal, symbol, price)))
+    return alerts
+
+# ============================================================================
+# STAGE TIMERS
+# ============================================================================
+
+class StageTimes:
+    """Per-stage duration samples collected by wrapping the server's functions"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, stage, func):
+        # Both servers share trading_core: time the original function, not the other run's wrapper
+        func = getattr(func, 'unwrapped', func)
+        samples = self.samples[stage]
+        clock = time.perf_counter_ns
+        if asyncio.iscoroutinefunction(func):
+            async def timed(*args, **kwargs):
+                start = clock()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    samples.append(clock() - start)
+        else:
+            def timed(*args, **kwargs):
+                start = clock()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    samples.append(clock() - start)
+        timed.unwrapped = func
+        return timed
+
+    def reset(self):
+        for samples in self.samples.values():
+            samples.clear()
+
+
+def instrument_flask(times):
+    ws.parse_payload = times.wrap('parse', ws.parse_payload)
+    # process_signal lives in trading_core and looks these up there
+    trading_core.get_market_price = times.wrap('price_lookup', trading_core.get_market_price)
+    trading_core.get_account_balance = times.wrap('balance_check', trading_core.get_account_balance)
+    trading_core.execute_buy_order = times.wrap('order', trading_core.execute_buy_order)
+    trading_core.execute_sell_order = times.wrap('order', trading_core.execute_sell_order)
+    trading_core.save_trade = times.wrap('journal_write', trading_core.save_trade)
+
+
+def instrument_async(times, app):
+    async_server.parse_payload = times.wrap('parse', async_server.parse_payload)
+    async_server.get_market_price = times.wrap('price_lookup', async_server.get_market_price)
+    async_server.ensure_balances = times.wrap('balance_check', async_server.ensure_balances)
+    app['client'].create_order = times.wrap('order', app['client'].create_order)
+    trading_core.save_trade = times.wrap('journal_write', trading_core.save_trade)
+
+# ============================================================================
+# SERVERS
+# ============================================================================
+
+def start_simulator(latency_ms):
+    """exchange_sim.py in a child process with limits a load test won't hit; returns (process, url)"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ,
+               SIM_LATENCY_MS=str(latency_ms),
+               SIM_WEIGHT_LIMIT='100000000',
+               SIM_ORDER_LIMIT='100000000',
+               SIM_MIN_NOTIONAL='1',
+               SIM_BALANCES='USDT=1000000000,BTC=1000000,ETH=1000000')
+    process = subprocess.Popen([sys.executable, 'exchange_sim.py', str(port)], env=env,
+                               cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            exchange_sim.simulator_client(Client, url)('bench', 'bench')  # pings on creation
+            return process, url
+        except Exception:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Exchange simulator did not start on {url}")
+
+
+def start_flask(simulator, times):
+    client_class = exchange_sim.simulator_client(Client, simulator)
+    ws.set_client(client_class(ws.BINANCE_API_KEY, ws.BINANCE_API_SECRET, testnet=True))
+    ws.exchange_info.refresh(ws.client)
+    ws.init_trade_history()
+    instrument_flask(times)
+    server = make_server('127.0.0.1', 0, ws.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def start_async(times):
+    """Async app (connecting to trading_core.BINANCE_SIMULATOR_URL) on its own loop in a background thread"""
+    ready = threading.Event()
+    holder = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = async_server.create_app()
+        runner = web.AppRunner(app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        instrument_async(times, app)
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        loop.run_until_complete(site.start())
+        holder['url'] = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return holder['url']
+
+# ============================================================================
+# LOAD GENERATOR
+# ============================================================================
+
+async def drive(url, alerts, rate, concurrency):
+    """
+    Send the alerts on a fixed schedule (`rate` per second, 0 = back to back)
+    with at most `concurrency` in flight. Returns (service latencies, latencies
+    from the scheduled send time, status counts, seconds). The second set
+    includes time spent waiting for a free slot when the server falls behind.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    service, scheduled, statuses = [], [], Counter()
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        async def one(alert, due):
+            _, content_type, body, query = alert
+            async with semaphore:
+                start = time.perf_counter()
+                headers = {'Content-Type': content_type} if content_type else {}
+                try:
+                    async with session.post(f"{url}/webhook{query}", data=body, headers=headers) as r:
+                        await r.read()
+                        statuses[r.status] += 1
+                except aiohttp.ClientError:
+                    statuses['connection_error'] += 1
+                end = time.perf_counter()
+            service.append(end - start)
+            scheduled.append(end - due)
+
+        begin = time.perf_counter()
+        tasks = []
+        for i, alert in enumerate(alerts):
+            due = begin + i / rate if rate else time.perf_counter()
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(alert, due)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - begin
+
+    return service, scheduled, statuses, elapsed
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+
+def histogram(samples_ns):
+    """Latency summary in microseconds plus counts per BUCKETS_US bucket"""
+    if not samples_ns:
+        return None
+    values = sorted(samples_ns)
+    pct = lambda p: values[min(len(values) - 1, int(p * len(values)))] / 1000
+    counts = [0] * len(BUCKETS_US)
+    bucket = 0
+    for v in values:
+        while bucket < len(BUCKETS_US) - 1 and v / 1000 > BUCKETS_US[bucket]:
+            bucket += 1
+        counts[bucket] += 1
+    return {
+        'count': len(values),
+        'mean_us': round(sum(values) / len(values) / 1000, 2),
+        'p50_us': round(pct(0.50), 2),
+        'p90_us': round(pct(0.90), 2),
+        'p99_us': round(pct(0.99), 2),
+        'max_us': round(values[-1] / 1000, 2),
+        'buckets_us': BUCKETS_US,
+        'counts': counts,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_server(name, url, alerts, rate, concurrency, times):
+    # Warm up connections, caches and the exchange info table before measuring
+    asyncio.run(drive(url, alerts[:min(50, len(alerts))], 0, concurrency))
+    times.reset()
+    service, scheduled, statuses, elapsed = asyncio.run(drive(url, alerts, rate, concurrency))
+    ws.trade_journal.flush()
+    ok = statuses.get(200, 0)
+    return {
+        'alerts': len(alerts),
+        'seconds': round(elapsed, 3),
+        'alerts_per_sec': round(len(alerts) / elapsed, 1),
+        'ok': ok,
+        'errors': len(alerts) - ok,
+        'statuses': {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        'latency': histogram([int(s * 1e9) for s in service]),
+        'latency_from_schedule': histogram([int(s * 1e9) for s in scheduled]),
+        'stages': {stage: histogram(times.samples.get(stage)) for stage in STAGES},
+    }
+
+
+def compare(results, baseline):
+    """Print p50/p99 changes against a previous results file"""
+    print("-" * 80)
+    print(f"Compared with {baseline.get('revision')} ({baseline.get('timestamp')})")
+    print(f"{'Server':<7} {'Stage':<15} {'p50 us':>12} {'Δ p50':>8} {'p99 us':>12} {'Δ p99':>8}")
+    for server, result in results['servers'].items():
+        old = baseline.get('servers', {}).get(server)
+        if not old:
+            continue
+        rows = [('request', result['latency'], old['latency'])]
+        rows += [(s, result['stages'].get(s), old['stages'].get(s)) for s in STAGES]
+        for stage, new, prev in rows:
+            if not new or not prev:
+                continue
+            change = lambda key: f"{(new[key] / prev[key] - 1) * 100:+.0f}%" if prev[key] else 'n/a'
+            print(f"{server:<7} {stage:<15} {new['p50_us']:>12} {change('p50_us'):>8} {new['p99_us']:>12} {change('p99_us'):>8}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Webhook load test with per-stage latency histograms')
+    parser.add_argument('--server', default='both', choices=['flask', 'async', 'both'])
+    parser.add_argument('--alerts', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=200, help='alerts per second (0 = as fast as possible)')
+    parser.add_argument('--concurrency', type=int, default=50, help='most requests in flight')
+    parser.add_argument('--mix', default='json=4,form=2,template=2,query=1', help='payload format weights')
+    parser.add_argument('--exchange-latency-ms', type=float, default=5, help='simulated exchange latency')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='bench_webhook_results.json', help='results file (JSON)')
+    parser.add_argument('--compare', help='previous results file to diff against')
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    if trading_core.BINANCE_SIMULATOR_URL:
+        sim_process, simulator = None, trading_core.BINANCE_SIMULATOR_URL
+    else:
+        sim_process, simulator = start_simulator(args.exchange_latency_ms)
+        trading_core.BINANCE_SIMULATOR_URL = simulator
+
+    try:
+        mix = parse_mix(args.mix)
+        alerts = build_alerts(args.alerts, mix, {'BTCUSDT': 50000, 'ETHUSDT': 3000}, args.seed)
+        servers = ['flask', 'async'] if args.server == 'both' else [args.server]
+        results = {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': {
+                'alerts': args.alerts,
+                'rate': args.rate,
+                'concurrency': args.concurrency,
+                'mix': mix,
+                'exchange_latency_ms': args.exchange_latency_ms if sim_process else None,
+                'simulator': simulator,
+            },
+            'servers': {},
+        }
+        for name in servers:
+            times = StageTimes()
+            if name == 'flask':
+                url = start_flask(simulator, times)
+            else:
+                url = start_async(times)
+            results['servers'][name] = run_server(name, url, alerts, args.rate, args.concurrency, times)
+    finally:
+        if sim_process:
+            sim_process.terminate()
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print("=" * 80)
+    print(f"WEBHOOK LOAD TEST: {args.alerts} alerts at {args.rate or 'max'}/s, {args.concurrency} concurrent, "
+          f"mix {args.mix}")
+    print("=" * 80)
+    for name, r in results['servers'].items():
+        print(f"{name}: {r['alerts_per_sec']} alerts/s, {r['ok']} ok, {r['errors']} errors {r['statuses']}")
+        print(f"  {'Stage':<15} {'count':>7} {'mean us':>10} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'max us':>10}")
+        rows = [('request', r['latency']), ('from schedule', r['latency_from_schedule'])]
+        rows += [(s, r['stages'][s]) for s in STAGES]
+        for stage, h in rows:
+            if h:
+                print(f"  {stage:<15} {h['count']:>7} {h['mean_us']:>10} {h['p50_us']:>10} {h['p90_us']:>10} "
+                      f"{h['p99_us']:>10} {h['max_us']:>10}")
+    if baseline:
+        compare(results, baseline)
+    print("-" * 80)
+    print(f"✅ Results written to {args.out}")
@@ -0,0 +1,365 @@
+"""
+Candles - Loading and storing local OHLCV data
+Reads candle files (Binance kline CSV dumps, CSVs with a header, or Parquet)
+into plain lists of dicts for the replay engine and the strategy tools, and
+keeps a local columnar candle store so market data is downloaded only once.
+
+The store has one directory per symbol and interval. Each column (time, open,
+high, low, close, volume) is an append-only 1-D .npy file that is read through
+mmap, so a slice of years of 1m bars is a zero-copy view and only the pages
+touched are read from disk. The time column is sorted, which makes it the range
+index (a binary search per lookup).
+
+Usage:
+    python candles.py import BTCUSDT 1m BTCUSDT-1m-2024-*.csv   - append kline CSV dumps (incremental)
+    python candles.py info [BTCUSDT 1m]                         - rows, first/last bar and gaps per series
+    python candles.py gaps BTCUSDT 1m                           - list missing bars
+
+Other tools accept the store in place of a file as store:SYMBOL/INTERVAL
+(e.g. python sweep.py store:BTCUSDT/1m --start 2023-01-01 --grid ...).
+"""
+
+import csv
+import io
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+KLINE_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+# Root directory of the candle store
+CANDLE_STORE_DIR = os.getenv('CANDLE_STORE_DIR', 'candle_store')
+
+# Bar length per Binance kline interval, in milliseconds
+INTERVAL_MS = {
+    '1s': 1000, '1m': 60000, '3m': 180000, '5m': 300000, '15m': 900000, '30m': 1800000,
+    '1h': 3600000, '2h': 7200000, '4h': 14400000, '6h': 21600000, '8h': 28800000, '12h': 43200000,
+    '1d': 86400000, '3d': 259200000, '1w': 604800000,
+}
+
+STORE_PREFIX = 'store:'
+STORE_SPEC = re.compile(r'^store:([A-Za-z0-9]+)/(\w+)$')
+
+# Rows scanned per step when looking for gaps, so the scan never holds a whole column in memory
+GAP_SCAN_CHUNK = 1_000_000
+
+
+def to_millis(value):
+    """Candle/alert time as epoch milliseconds (accepts s, ms, us or ISO strings)"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return int(datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp() * 1000)
+    if number > 1e14:      # microseconds (newer Binance dumps)
+        return int(number / 1000)
+    if number < 1e11:      # seconds
+        return int(number * 1000)
+    return int(number)
+
+
+def format_millis(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+
+def load_ohlcv(path, start=None, end=None):
+    """
+    Candles from a CSV (with a header, or headerless Binance kline dump), a
+    Parquet file or the candle store (store:SYMBOL/INTERVAL, optionally limited
+    to the start/end time range)
+    """
+    if path.startswith(STORE_PREFIX):
+        return open_series(path).candles(start, end)
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Reading Parquet files needs pyarrow (pip install pyarrow)")
+        rows = pq.read_table(path).to_pylist()
+    else:
+        with open(path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            first = next(reader, None)
+            if first is None:
+                return []
+            try:
+                float(first[0])
+                header, rows_iter = None, [first]
+            except ValueError:
+                header, rows_iter = [c.strip().lower() for c in first], []
+            rows = []
+            for row in (*rows_iter, *reader):
+                if not row:
+                    continue
+                if header:
+                    rows.append(dict(zip(header, row)))
+                else:
+                    rows.append(dict(zip(KLINE_COLUMNS, row[:6])))
+
+    candles = []
+    for row in rows:
+        when = next((row[k] for k in ('time', 'open_time', 'timestamp', 'date') if row.get(k) not in (None, '')), None)
+        candles.append({
+            'time': to_millis(when),
+            'open': float(row['open']),
+            'high': float(row['high']),
+            'low': float(row['low']),
+            'close': float(row['close']),
+            'volume': float(row.get('volume') or 0),
+        })
+    candles.sort(key=lambda c: c['time'])
+    if start is not None or end is not None:
+        low = to_millis(start) if start is not None else None
+        high = to_millis(end) if end is not None else None
+        candles = [c for c in candles if (low is None or c['time'] >= low) and (high is None or c['time'] < high)]
+    return candles
+
+
+def load_close(path, start=None, end=None):
+    """Close prices as a float64 array (a zero-copy mmap view when read from the store)"""
+    if path.startswith(STORE_PREFIX):
+        return open_series(path).range(start, end)['close']
+    return np.array([c['close'] for c in load_ohlcv(path, start, end)], dtype=np.float64)
+
+# ============================================================================
+# COLUMN FILES
+# ============================================================================
+
+def _header(dtype, rows):
+    buffer = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buffer, {'descr': np.lib.format.dtype_to_descr(dtype),
+                                                  'fortran_order': False, 'shape': (rows,)})
+    return buffer.getvalue()
+
+
+def _read_header(f):
+    """(rows, dtype, data offset) of an open .npy file"""
+    np.lib.format.read_magic(f)
+    shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+    return shape[0], dtype, f.tell()
+
+
+def _column_rows(path):
+    with open(path, 'rb') as f:
+        return _read_header(f)[0]
+
+
+def _append_column(path, values, committed):
+    """
+    Append values to a 1-D .npy column holding `committed` valid rows.
+
+    Bytes past the committed rows (left by an interrupted append) are cut off
+    first; the row count in the header is rewritten in place last. numpy pads
+    the header so the count can grow without moving the data.
+    """
+    if not os.path.exists(path):
+        np.save(path, values)
+        return
+    with open(path, 'r+b') as f:
+        _, dtype, offset = _read_header(f)
+        header = _header(dtype, committed + len(values))
+        if len(header) != offset:
+            raise ValueError(f"Cannot grow {path} in place (header size changed)")
+        f.seek(offset + committed * dtype.itemsize)
+        f.truncate()
+        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(0)
+        f.write(header)
+
+# ============================================================================
+# CANDLE STORE
+# ============================================================================
+
+class CandleSeries:
+    """
+    Read-only, memory-mapped view of one symbol/interval.
+
+    Columns are np.memmap arrays; slicing them (range(), index()) reads only the
+    pages touched. The row count is the time column's, which is committed last.
+    """
+
+    def __init__(self, path, symbol, interval):
+        self.path = path
+        self.symbol = symbol
+        self.interval = interval
+        self.step = INTERVAL_MS.get(interval)
+        self.columns = {}
+        self.rows = 0
+        time_path = os.path.join(path, 'time.npy')
+        if not os.path.exists(time_path):
+            return
+        self.rows = min(_column_rows(os.path.join(path, f'{c}.npy')) for c in KLINE_COLUMNS)
+        for column in KLINE_COLUMNS:
+            data = np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r')
+            self.columns[column] = data[:self.rows]
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def time(self):
+        return self.columns.get('time', np.empty(0, dtype=np.int64))
+
+    def first(self):
+        return int(self.time[0]) if self.rows else None
+
+    def last(self):
+        return int(self.time[-1]) if self.rows else None
+
+    def index(self, when, side='left'):
+        """Row of the first bar at or after `when` (any to_millis format); binary search on the mmap"""
+        return int(np.searchsorted(self.time, to_millis(when), side=side))
+
+    def range(self, start=None, end=None):
+        """Columns for bars with start <= time < end, as zero-copy views: {column: array}"""
+        low = self.index(start) if start is not None else 0
+        high = self.index(end) if end is not None else self.rows
+        return {column: data[low:high] for column, data in self.columns.items()}
+
+    def candles(self, start=None, end=None):
+        """Bars in the range as dicts (the format load_ohlcv returns)"""
+        columns = self.range(start, end)
+        if not columns:
+            return []
+        lists = {column: data.tolist() for column, data in columns.items()}
+        return [dict(zip(KLINE_COLUMNS, values)) for values in zip(*(lists[c] for c in KLINE_COLUMNS))]
+
+    def gaps(self, start=None, end=None):
+        """Missing bars as [(last bar before the gap, first bar after it, bars missing)]"""
+        if not self.step:
+            raise ValueError(f"Unknown interval '{self.interval}'")
+        times = self.range(start, end).get('time')
+        found = []
+        if times is None or len(times) < 2:
+            return found
+        for low in range(0, len(times) - 1, GAP_SCAN_CHUNK):
+            chunk = np.asarray(times[low:low + GAP_SCAN_CHUNK + 1])
+            deltas = np.diff(chunk)
+            for i in np.flatnonzero(deltas != self.step):
+                found.append((int(chunk[i]), int(chunk[i + 1]), int(deltas[i] // self.step) - 1))
+        return found
+
+    def info(self):
+        gaps = self.gaps() if self.step else []
+        return {
+            'symbol': self.symbol,
+            'interval': self.interval,
+            'rows': self.rows,
+            'first': format_millis(self.first()) if self.rows else None,
+            'last': format_millis(self.last()) if self.rows else None,
+            'gaps': len(gaps),
+            'missing_bars': sum(g[2] for g in gaps),
+            'bytes': sum(data.nbytes for data in self.columns.values()),
+        }
+
+
+class CandleStore:
+    """Append-only columnar candle files under `root`/SYMBOL/INTERVAL/"""
+
+    def __init__(self, root=CANDLE_STORE_DIR):
+        self.root = root
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def series(self, symbol, interval):
+        """Memory-mapped view of a series (empty if nothing was stored yet)"""
+        return CandleSeries(self.path(symbol, interval), symbol.upper(), interval)
+
+    def list(self):
+        """[(symbol, interval)] of every stored series"""
+        found = []
+        if os.path.isdir(self.root):
+            for symbol in sorted(os.listdir(self.root)):
+                for interval in sorted(os.listdir(os.path.join(self.root, symbol))):
+                    if os.path.exists(os.path.join(self.root, symbol, interval, 'time.npy')):
+                        found.append((symbol, interval))
+        return found
+
+    def append(self, symbol, interval, columns):
+        """
+        Append bars newer than the last stored one. `columns` maps each of
+        KLINE_COLUMNS to an array; rows must be sorted by time. Older or
+        duplicate bars are skipped. Returns (appended, skipped).
+        """
+        path = self.path(symbol, interval)
+        os.makedirs(path, exist_ok=True)
+        existing = self.series(symbol, interval)
+        times = np.asarray(columns['time'], dtype=np.int64)
+        keep = np.ones(len(times), dtype=bool)
+        if len(times) > 1:
+            keep[1:] = np.diff(times) > 0
+        if existing.rows:
+            keep &= times > existing.last()
+        appended = int(keep.sum())
+        if appended:
+            # Every other column first; the time column's header is the commit point
+            for column in KLINE_COLUMNS[1:] + ['time']:
+                dtype = np.int64 if column == 'time' else np.float64
+                values = np.asarray(columns[column], dtype=dtype)[keep]
+                _append_column(os.path.join(path, f'{column}.npy'), values, existing.rows)
+        return appended, len(times) - appended
+
+    def import_csv(self, path, symbol, interval):
+        """Append a Binance kline CSV dump (or any file load_ohlcv reads); returns (appended, skipped)"""
+        candles = load_ohlcv(path)
+        columns = {column: [c[column] for c in candles] for column in KLINE_COLUMNS}
+        return self.append(symbol, interval, columns)
+
+
+def open_series(spec, root=None):
+    """CandleSeries for a 'store:SYMBOL/INTERVAL' spec"""
+    match = STORE_SPEC.match(spec)
+    if not match:
+        raise ValueError(f"Expected store:SYMBOL/INTERVAL, got '{spec}'")
+    series = CandleStore(root or CANDLE_STORE_DIR).series(match.group(1), match.group(2))
+    if not series.rows:
+        raise ValueError(f"No candles stored for {match.group(1).upper()} {match.group(2)}")
+    return series
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    store = CandleStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'info'
+
+    if command == 'import' and len(sys.argv) >= 5:
+        symbol, interval, files = sys.argv[2].upper(), sys.argv[3], sorted(sys.argv[4:])
+        if interval not in INTERVAL_MS:
+            print(f"❌ Unknown interval '{interval}' (expected one of {', '.join(INTERVAL_MS)})")
+            sys.exit(1)
+        total, started = 0, time.perf_counter()
+        for path in files:
+            appended, skipped = store.import_csv(path, symbol, interval)
+            total += appended
+            print(f"✅ {path}: {appended} bars appended" + (f", {skipped} already stored or out of order" if skipped else ''))
+        print(json.dumps({**store.series(symbol, interval).info(), 'imported': total,
+                          'seconds': round(time.perf_counter() - started, 3)}))
+
+    elif command == 'info':
+        series_list = [(sys.argv[2].upper(), sys.argv[3])] if len(sys.argv) >= 4 else store.list()
+        print("=" * 80)
+        print(f"CANDLE STORE ({store.root})")
+        print("=" * 80)
+        for symbol, interval in series_list:
+            info = store.series(symbol, interval).info()
+            print(f"{symbol:<10} {interval:<4} {info['rows']:>10} bars  {info['first']} -> {info['last']}  "
+                  f"{info['gaps']} gaps ({info['missing_bars']} bars missing)  {info['bytes'] / 1e6:.1f} MB")
+        if not series_list:
+            print("No candles stored yet (python candles.py import SYMBOL INTERVAL files...)")
+
+    elif command == 'gaps' and len(sys.argv) >= 4:
+        series = store.series(sys.argv[2].upper(), sys.argv[3])
+        for before, after, missing in series.gaps():
+            print(f"{format_millis(before)} -> {format_millis(after)}: {missing} bars missing")
+        print(f"{len(series.gaps())} gaps")
+
+    else:
+        print("Usage: python candles.py import SYMBOL INTERVAL files... | info [SYMBOL INTERVAL] | gaps SYMBOL INTERVAL")
+        sys.exit(1)
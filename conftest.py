@@ -0,0 +1,33 @@
+"""
+Shared pytest configuration - the unit tests run offline, against exchange_sim where they need Binance
+"""
+
+import pytest
+from binance.client import Client
+
+from exchange_sim import DEFAULT_CONFIG, SimExchange, simulator_client, start_in_thread
+
+# test_webhook.py is a manual script that posts to a running server, not a unit test
+collect_ignore = ['test_webhook.py']
+
+
+@pytest.fixture(scope='session')
+def sim_server():
+    """One simulator for the whole run: (base url, SimExchange)"""
+    return start_in_thread(SimExchange())
+
+
+@pytest.fixture
+def sim(sim_server):
+    """The simulated exchange, back to its default settings, prices and balances"""
+    _, exchange = sim_server
+    exchange.config = dict(DEFAULT_CONFIG)
+    exchange.reset()
+    return exchange
+
+
+@pytest.fixture
+def sim_client(sim_server, sim):
+    """python-binance Client talking to the simulator"""
+    url, _ = sim_server
+    return simulator_client(Client, url)('test-key', 'test-secret')
@@ -0,0 +1,199 @@
+"""
+Alert De-duplication - Idempotency index and opposing-signal coalescing
+TradingView retries and duplicated alerts would otherwise each place another
+market order. Alerts that carry an idempotency key get a fingerprint: their
+client order id, or a hash of their content when they include the bar `time`.
+A repeat within the TTL is answered without touching Binance. Alerts with
+neither (pipe/template/form messages) are only fingerprinted when content
+hashing is forced, since two identical ones can be legitimate orders.
+
+The optional coalescing window holds alerts per symbol for a short time and
+nets buys against sells, so a buy/sell flip turns into one order or none.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Alert fields that carry a caller-chosen idempotency key (first one present wins)
+ID_FIELDS = ('client_order_id', 'clientOrderId', 'alert_id', 'id')
+
+
+# Alert field that makes content unique per bar, so a content hash is a safe key
+TIME_FIELD = 'time'
+
+
+def alert_fingerprint(data, content_hash=False):
+    """
+    Idempotency key of a parsed alert: its client order id, or a hash of its
+    content if it has a bar time (or `content_hash` is set). None if it has no key
+    """
+    for field in ID_FIELDS:
+        value = data.get(field)
+        if value not in (None, ''):
+            return f"id:{value}"
+    if not content_hash and data.get(TIME_FIELD) in (None, ''):
+        return None
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return 'sha1:' + hashlib.sha1(canonical.encode()).hexdigest()
+
+
+class AlertIndex:
+    """
+    Expiring set of alert fingerprints.
+
+    Entries live for `ttl` seconds. With a `path` every new fingerprint is
+    appended to a log file as well, so duplicates are still caught after a
+    restart; the log is compacted to the live entries when it is loaded.
+    """
+
+    def __init__(self, ttl=300.0, path=None, max_entries=100000):
+        self.ttl = ttl
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # fingerprint -> (expires_at, ref), oldest first
+        self._lock = threading.Lock()
+        self._log = None
+        self.duplicates = 0
+
+    def load(self):
+        """Read surviving entries from the log file and start appending to it"""
+        if not self.path:
+            return 0
+        now = time.time()
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry['expires_at'] > now:
+                        self._entries[entry['key']] = (entry['expires_at'], entry.get('ref'))
+                        self._entries.move_to_end(entry['key'])
+        # Rewrite with only the live entries, then keep appending
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for key, (expires_at, ref) in self._entries.items():
+                f.write(json.dumps({'key': key, 'expires_at': expires_at, 'ref': ref}) + '\n')
+        os.replace(tmp_path, self.path)
+        self._log = open(self.path, 'a', buffering=1)
+        logger.info(f"Loaded {len(self._entries)} alert fingerprints from {self.path}")
+        return len(self._entries)
+
+    def _expire(self, now):
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def check(self, key, ref=None):
+        """
+        Record `key` and return None, or return the stored entry if `key` was
+        already seen within the TTL: {'ref': ..., 'age': seconds}
+        """
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            existing = self._entries.get(key)
+            if existing:
+                self.duplicates += 1
+                return {'ref': existing[1], 'age': round(now - (existing[0] - self.ttl), 3)}
+            expires_at = now + self.ttl
+            self._entries[key] = (expires_at, ref)
+            if self._log:
+                try:
+                    self._log.write(json.dumps({'key': key, 'expires_at': expires_at, 'ref': ref}) + '\n')
+                except Exception as e:
+                    logger.error(f"Failed to persist alert fingerprint: {e}")
+            return None
+
+    def set_ref(self, key, ref):
+        """Attach a reference (e.g. the queued job id) to a recorded fingerprint"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries[key] = (entry[0], ref)
+
+    def forget(self, key):
+        """Drop a fingerprint so the alert can be retried (e.g. it was rejected before dispatch)"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'duplicates': self.duplicates, 'ttl': self.ttl}
+
+
+class SignalCoalescer:
+    """
+    Nets opposing signals per symbol within a short window.
+
+    Alerts are netted per symbol and account (the account the router resolved
+    the alert to, so alerts routed to different accounts never net out).
+    The first alert for a symbol opens a window of `window` seconds; every
+    alert in it adds (buy) or subtracts (sell) its order size. When the window
+    closes `dispatch(data)` is called once with the last alert of the winning
+    side, its quantity replaced by the net size, or not at all if they cancel.
+    `size_of(data)` returns an alert's order size in base currency.
+    """
+
+    def __init__(self, window, size_of, dispatch):
+        self.window = window
+        self.size_of = size_of
+        self.dispatch = dispatch
+        self._pending = {}  # (symbol, account name) -> {'net': float, 'alerts': [...]}
+        self._lock = threading.Lock()
+        self.netted = 0
+
+    def add(self, data, account=None):
+        """Fold an alert into the window of its symbol on `account` (opening one if needed)"""
+        key = (data.get('symbol'), account)
+        size = self.size_of(data)
+        signed = size if data.get('signal') == 'buy' else -size
+        with self._lock:
+            bucket = self._pending.get(key)
+            if bucket is None:
+                bucket = self._pending[key] = {'net': 0.0, 'alerts': []}
+                timer = threading.Timer(self.window, self._close, args=(key,))
+                timer.daemon = True
+                timer.start()
+            bucket['net'] += signed
+            bucket['alerts'].append(data)
+            return len(bucket['alerts'])
+
+    def _close(self, key):
+        with self._lock:
+            bucket = self._pending.pop(key, None)
+        if not bucket:
+            return
+        alerts, net = bucket['alerts'], bucket['net']
+        # Sizes are floats: treat dust left by cancelling buys and sells as zero
+        if abs(net) < 1e-12:
+            self.netted += len(alerts)
+            logger.info(f"Coalesced {len(alerts)} alerts on {key[0]} to no order (signals cancelled out)")
+            return
+        side = 'buy' if net > 0 else 'sell'
+        last = next(a for a in reversed(alerts) if a.get('signal') == side)
+        data = dict(last, signal=side, quantity=abs(net), coalesced=len(alerts))
+        self.netted += len(alerts) - 1
+        if len(alerts) > 1:
+            logger.info(f"Coalesced {len(alerts)} alerts on {key[0]} into one {side} of {abs(net)}")
+        try:
+            self.dispatch(data)
+        except Exception as e:
+            logger.error(f"Coalesced order dispatch failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            pending = sum(len(b['alerts']) for b in self._pending.values())
+        return {'window': self.window, 'pending': pending, 'netted': self.netted}
@@ -0,0 +1,138 @@
+"""
+Event Bus - Fan-out of server state changes to dashboard clients
+Each /events connection subscribes once; publishers never talk to Binance on
+behalf of a viewer, so extra browser tabs cost no exchange API weight.
+Thread subscribers (Flask) read a queue.Queue; asyncio subscribers (the async
+server) get an asyncio.Queue fed on their event loop, so an open dashboard
+holds no thread.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSubscriber:
+    """
+    Subscriber queue for an asyncio consumer. publish() runs on any thread, so
+    messages are handed to the subscriber's event loop with call_soon_threadsafe.
+    """
+
+    def __init__(self, bus, loop, max_queue):
+        self.bus = bus
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = False
+
+    def put_nowait(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._deliver, message)
+        except RuntimeError:
+            # Event loop closed: treat like a subscriber that stopped reading
+            raise queue.Full
+
+    def _deliver(self, message):
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("Dropping slow event subscriber")
+            self.dropped = True
+            self.bus.unsubscribe(self)
+            # Wake the reader up so its stream ends instead of waiting for a heartbeat
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class EventBus:
+    """
+    In-process publish/subscribe hub for Server-Sent Events.
+
+    The latest event of every type is remembered and replayed to new
+    subscribers, so a freshly opened dashboard gets the current balance and
+    connection status without a separate request. Subscribers that stop
+    reading are dropped once their queue fills up.
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = []
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def publish(self, event, data):
+        """Send an event to every subscriber"""
+        message = format_sse(event, data)
+        with self._lock:
+            self._latest[event] = message
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                logger.warning("Dropping slow event subscriber")
+                self.unsubscribe(q)
+
+    def subscribe(self, replay=('status', 'balance')):
+        """Register a subscriber queue, pre-loaded with the latest state events"""
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            for event in replay:
+                if event in self._latest:
+                    q.put_nowait(self._latest[event])
+            self._subscribers.append(q)
+        return q
+
+    def subscribe_async(self, replay=('status', 'balance')):
+        """Register an asyncio subscriber (call on the consumer's event loop)"""
+        q = AsyncSubscriber(self, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            for event in replay:
+                if event in self._latest:
+                    q.queue.put_nowait(self._latest[event])
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def stream(self, q, heartbeat=15):
+        """Generator of SSE frames for one subscriber, with keep-alive comments"""
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    yield q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            self.unsubscribe(q)
+
+    async def stream_async(self, q, heartbeat=15):
+        """Async generator of SSE frames for one asyncio subscriber, ending if it was dropped"""
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    message = await asyncio.wait_for(q.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(q)
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,144 @@
+"""
+Exchange Info - Per-symbol metadata from Binance exchangeInfo
+Loaded once at startup (and refreshed periodically) so the bot knows each
+pair's real base/quote assets and trading filters. Quantities are rounded and
+checked against LOT_SIZE and MIN_NOTIONAL locally, so orders the exchange
+would reject never leave the process.
+"""
+
+import logging
+import threading
+import time
+from decimal import Decimal, ROUND_DOWN
+
+logger = logging.getLogger(__name__)
+
+# Used only for symbols missing from exchangeInfo (longest suffix wins)
+KNOWN_QUOTE_ASSETS = ['FDUSD', 'USDT', 'USDC', 'BUSD', 'TUSD', 'USD', 'BTC', 'ETH', 'BNB', 'EUR', 'TRY']
+
+
+class FilterError(ValueError):
+    """Raised when an order violates a symbol's exchange filters"""
+
+
+def _filter_values(filters):
+    """Pick the filters we enforce out of a symbol's exchangeInfo filter list"""
+    by_type = {f['filterType']: f for f in filters}
+    # LOT_SIZE applies to every order; MARKET_LOT_SIZE adds tighter bounds for market orders
+    lots = [by_type[t] for t in ('LOT_SIZE', 'MARKET_LOT_SIZE') if t in by_type]
+    decimals = lambda key: [Decimal(lot.get(key) or '0') for lot in lots]
+    max_qtys = [q for q in decimals('maxQty') if q > 0]
+    notional = by_type.get('NOTIONAL') or by_type.get('MIN_NOTIONAL') or {}
+    apply_min = notional.get('applyMinToMarket', notional.get('applyToMarket', True))
+    apply_max = notional.get('applyMaxToMarket', False)
+    return {
+        'min_qty': max(decimals('minQty'), default=Decimal('0')),
+        'max_qty': min(max_qtys, default=Decimal('0')),
+        'step_size': max(decimals('stepSize'), default=Decimal('0')),
+        'min_notional': Decimal(notional.get('minNotional') or '0') if apply_min else Decimal('0'),
+        'max_notional': Decimal(notional.get('maxNotional') or '0') if apply_max else Decimal('0'),
+    }
+
+
+def _round_down(value, step):
+    if step <= 0:
+        return value
+    return (value / step).to_integral_value(rounding=ROUND_DOWN) * step
+
+
+def guess_assets(symbol):
+    """Split a symbol into (base, quote) by its quote-asset suffix"""
+    symbol = symbol.upper()
+    for quote in sorted(KNOWN_QUOTE_ASSETS, key=len, reverse=True):
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    return symbol, 'USDT'
+
+
+class ExchangeInfo:
+    """Compact per-symbol table built from a get_exchange_info() payload"""
+
+    def __init__(self):
+        self._symbols = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.loaded = False
+        self.loaded_at = 0.0
+
+    def load(self, info):
+        """Rebuild the table from an exchangeInfo payload"""
+        symbols = {}
+        for s in info.get('symbols', []):
+            symbols[s['symbol']] = {
+                'base': s['baseAsset'],
+                'quote': s['quoteAsset'],
+                'status': s.get('status'),
+                'filters': _filter_values(s.get('filters', [])),
+            }
+        with self._lock:
+            self._symbols = symbols
+            self.loaded = True
+            self.loaded_at = time.time()
+        return len(symbols)
+
+    def refresh(self, client):
+        """Fetch exchangeInfo from Binance and reload the table"""
+        count = self.load(client.get_exchange_info())
+        logger.info(f"Loaded exchange info for {count} symbols")
+        return count
+
+    def start(self, get_client, interval=3600):
+        """Refresh the table every `interval` seconds in the background (idempotent)"""
+        if self._thread:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                client = get_client()
+                if not client:
+                    continue
+                try:
+                    self.refresh(client)
+                except Exception as e:
+                    logger.warning(f"Exchange info refresh failed: {e}")
+
+        self._thread = threading.Thread(target=run, name="exchange-info-refresher", daemon=True)
+        self._thread.start()
+
+    def get(self, symbol):
+        """Table entry for a symbol, or None if unknown"""
+        return self._symbols.get(symbol.upper())
+
+    def assets(self, symbol):
+        """(base_asset, quote_asset) for a symbol"""
+        entry = self.get(symbol)
+        if entry:
+            return entry['base'], entry['quote']
+        return guess_assets(symbol)
+
+    def normalize_quantity(self, symbol, quantity, price=0):
+        """
+        Round a quantity down to the symbol's step size and check it against
+        LOT_SIZE and MIN_NOTIONAL. Returns the rounded quantity as a float.
+        Raises FilterError if the order would be rejected. Symbols missing
+        from the table are passed through unchanged.
+        """
+        entry = self.get(symbol)
+        if not entry:
+            return quantity
+        if entry['status'] and entry['status'] != 'TRADING':
+            raise FilterError(f"{symbol} is not trading (status {entry['status']})")
+        f = entry['filters']
+        qty = _round_down(Decimal(str(quantity)), f['step_size'])
+        if qty <= 0 or qty < f['min_qty']:
+            raise FilterError(f"Quantity {quantity} for {symbol} is below LOT_SIZE minQty {f['min_qty']} (step {f['step_size']})")
+        if f['max_qty'] and qty > f['max_qty']:
+            raise FilterError(f"Quantity {quantity} for {symbol} is above LOT_SIZE maxQty {f['max_qty']}")
+        if price and price > 0:
+            notional = qty * Decimal(str(price))
+            if f['min_notional'] and notional < f['min_notional']:
+                raise FilterError(f"Order value {notional} for {symbol} is below MIN_NOTIONAL {f['min_notional']}")
+            if f['max_notional'] and notional > f['max_notional']:
+                raise FilterError(f"Order value {notional} for {symbol} is above max notional {f['max_notional']}")
+        return float(qty)
@@ -0,0 +1,657 @@
+"""
+Exchange Simulator - Local stand-in for the Binance Spot REST API
+Implements the endpoints the bot uses (ping, time, exchangeInfo, account,
+ticker price, klines, order create/query, allOrders, myTrades) with in-memory
+balances and market orders that fill at the simulated price, so the server,
+verify_trade.py and the benchmarks can run without network access. Klines come
+from the candle store (SIM_CANDLE_STORE) when it holds the series, otherwise
+from a deterministic synthetic curve around the simulated price.
+
+Responses mimic Binance: the same JSON shapes, {"code", "msg"} errors,
+X-MBX-USED-WEIGHT-1M / X-MBX-ORDER-COUNT-10S headers, 429 with Retry-After
+when the weight or order limit is exceeded and 418 when a client keeps going.
+Latency, jitter and random error injection are configurable.
+
+Point the bot at it with BINANCE_SIMULATOR_URL=http://127.0.0.1:9000
+
+Usage:
+    python exchange_sim.py              - listen on 127.0.0.1:9000
+    python exchange_sim.py 9100         - listen on another port
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+from decimal import Decimal, ROUND_DOWN
+
+from aiohttp import web
+
+from candles import CandleStore, INTERVAL_MS
+from exchange_info import guess_assets
+
+logger = logging.getLogger(__name__)
+
+
+def parse_pairs(text):
+    """'BTCUSDT=50000,ETHUSDT=3000' -> {'BTCUSDT': 50000.0, 'ETHUSDT': 3000.0}"""
+    pairs = {}
+    for item in text.split(','):
+        name, _, value = item.partition('=')
+        if name.strip():
+            pairs[name.strip().upper()] = float(value)
+    return pairs
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+SIM_HOST = os.getenv('SIM_HOST', '127.0.0.1')
+SIM_PORT = int(os.getenv('SIM_PORT', '9000'))
+
+DEFAULT_CONFIG = {
+    'prices': parse_pairs(os.getenv('SIM_PRICES', 'BTCUSDT=50000,ETHUSDT=3000,BNBUSDT=600')),
+    'balances': parse_pairs(os.getenv('SIM_BALANCES', 'USDT=10000,BTC=1,ETH=10,BNB=10')),
+    'latency_ms': float(os.getenv('SIM_LATENCY_MS', '0')),          # added to every response
+    'jitter_ms': float(os.getenv('SIM_JITTER_MS', '0')),            # plus uniform 0..jitter
+    'error_rate': float(os.getenv('SIM_ERROR_RATE', '0')),          # fraction of requests failing
+    'error_status': int(os.getenv('SIM_ERROR_STATUS', '503')),
+    'weight_limit': int(os.getenv('SIM_WEIGHT_LIMIT', '6000')),     # request weight per minute
+    'order_limit': int(os.getenv('SIM_ORDER_LIMIT', '100')),        # orders per 10 seconds
+    'ban_after': int(os.getenv('SIM_BAN_AFTER', '3')),              # requests ignoring Retry-After before a 418
+    'ban_seconds': float(os.getenv('SIM_BAN_SECONDS', '120')),
+    'fee_rate': float(os.getenv('SIM_FEE_RATE', '0.001')),          # charged in the received asset
+    'slippage_bps': float(os.getenv('SIM_SLIPPAGE_BPS', '0')),
+    'volatility_bps': float(os.getenv('SIM_VOLATILITY_BPS', '0')),  # random-walk step per price read
+    'step_size': os.getenv('SIM_STEP_SIZE', '0.00001'),
+    'tick_size': os.getenv('SIM_TICK_SIZE', '0.01'),
+    'min_notional': os.getenv('SIM_MIN_NOTIONAL', '5'),
+    'candle_store': os.getenv('SIM_CANDLE_STORE', ''),              # serve stored klines from this directory
+}
+
+# Synthetic klines: two slow waves plus per-bar noise around the simulated price,
+# so moving averages and RSI cross now and then (periods in bars, amplitudes as fractions)
+SYNTHETIC_WAVES = ((97, 0.01), (23, 0.004))
+SYNTHETIC_NOISE = 0.001
+
+# Request weight per endpoint (matches the Binance docs for these calls)
+WEIGHTS = {
+    'ping': 1,
+    'time': 1,
+    'exchangeInfo': 20,
+    'account': 20,
+    'ticker/price': 2,
+    'klines': 2,
+    'order': 1,
+    'order/query': 4,
+    'allOrders': 20,
+    'myTrades': 20,
+}
+
+# ============================================================================
+# EXCHANGE STATE
+# ============================================================================
+
+class SimError(Exception):
+    """A Binance-style error response: HTTP status plus {"code", "msg"}"""
+
+    def __init__(self, status, code, msg, retry_after=None):
+        super().__init__(msg)
+        self.status = status
+        self.code = code
+        self.msg = msg
+        self.retry_after = retry_after
+
+
+def fmt(value):
+    return f"{value:.8f}"
+
+
+class SimExchange:
+    """In-memory spot exchange: balances, prices, filled market orders and trades"""
+
+    def __init__(self, **overrides):
+        self.config = dict(DEFAULT_CONFIG, **overrides)
+        self.reset()
+
+    def reset(self):
+        """Back to the configured prices and balances with no orders"""
+        self.prices = dict(self.config['prices'])
+        self.balances = dict(self.config['balances'])
+        self.orders = {}    # symbol -> [order, ...] in id order
+        self.trades = {}    # symbol -> [trade, ...] in id order
+        self.next_order_id = 1
+        self.next_trade_id = 1
+        self.weight_window = self.used_weight = 0
+        self.order_window = self.order_count = 0
+        self.retry_until = self.banned_until = 0.0
+        self.violations = 0
+        self.counters = {'requests': 0, 'orders': 0, 'rejected': 0, 'injected_errors': 0,
+                         'rate_limited': 0, 'banned': 0}
+
+    def configure(self, **changes):
+        """Change latency, error or limit settings at runtime"""
+        unknown = set(changes) - set(self.config)
+        if unknown:
+            raise ValueError(f"Unknown simulator settings: {', '.join(sorted(unknown))}")
+        self.config.update(changes)
+
+    # ------------------------------------------------------------------
+    # Limits and faults
+    # ------------------------------------------------------------------
+
+    def charge(self, weight, order=False):
+        """Count a request against the per-minute weight and per-10s order limits"""
+        now = time.time()
+        self.counters['requests'] += 1
+        if now < self.banned_until:
+            self.counters['banned'] += 1
+            raise SimError(418, -1003, f"Way too much request weight used; IP banned until "
+                                       f"{int(self.banned_until * 1000)}.", self.banned_until - now)
+        if now < self.retry_until:
+            # The client ignored Retry-After: escalate to a ban after a few of these
+            self.violations += 1
+            if self.violations >= self.config['ban_after']:
+                self.banned_until = now + self.config['ban_seconds']
+                self.counters['banned'] += 1
+                raise SimError(418, -1003, f"Way too much request weight used; IP banned until "
+                                           f"{int(self.banned_until * 1000)}.", self.config['ban_seconds'])
+            self.counters['rate_limited'] += 1
+            raise SimError(429, -1003, "Too much request weight used; please use the Retry-After header.",
+                           self.retry_until - now)
+        self.violations = 0
+
+        minute = int(now // 60)
+        if minute != self.weight_window:
+            self.weight_window, self.used_weight = minute, 0
+        self.used_weight += weight
+        if self.used_weight > self.config['weight_limit']:
+            self.retry_until = (minute + 1) * 60
+            self.counters['rate_limited'] += 1
+            raise SimError(429, -1003, f"Too much request weight used; current limit is "
+                                       f"{self.config['weight_limit']} request weight per 1 MINUTE.",
+                           self.retry_until - now)
+        if order:
+            ten_seconds = int(now // 10)
+            if ten_seconds != self.order_window:
+                self.order_window, self.order_count = ten_seconds, 0
+            self.order_count += 1
+            if self.order_count > self.config['order_limit']:
+                self.retry_until = (ten_seconds + 1) * 10
+                self.counters['rate_limited'] += 1
+                raise SimError(429, -1015, f"Too many new orders; current limit is "
+                                           f"{self.config['order_limit']} orders per 10 SECOND.",
+                               self.retry_until - now)
+
+        if self.config['error_rate'] and random.random() < self.config['error_rate']:
+            self.counters['injected_errors'] += 1
+            raise SimError(self.config['error_status'], -1001,
+                           "Internal error; unable to process your request. Please try again.")
+
+    def usage_headers(self, order=False):
+        headers = {'X-MBX-USED-WEIGHT-1M': str(self.used_weight)}
+        if order:
+            headers['X-MBX-ORDER-COUNT-10S'] = str(self.order_count)
+        return headers
+
+    def delay(self):
+        """Seconds this response is held back (latency plus jitter)"""
+        return (self.config['latency_ms'] + random.uniform(0, self.config['jitter_ms'])) / 1000
+
+    # ------------------------------------------------------------------
+    # Market data
+    # ------------------------------------------------------------------
+
+    def price(self, symbol):
+        if symbol not in self.prices:
+            raise SimError(400, -1121, "Invalid symbol.")
+        volatility = self.config['volatility_bps']
+        if volatility:
+            self.prices[symbol] *= math.exp(random.gauss(0, volatility / 10000))
+        return self.prices[symbol]
+
+    def klines(self, params):
+        """Binance kline rows, oldest first; the last one is the bar still open now"""
+        symbol = params.get('symbol', '').upper()
+        if symbol not in self.prices:
+            raise SimError(400, -1121, "Invalid symbol.")
+        interval = params.get('interval', '')
+        step = INTERVAL_MS.get(interval)
+        if not step:
+            raise SimError(400, -1120, "Invalid interval.")
+        limit = min(int(params.get('limit') or 500), 1000)
+        start = int(params['startTime']) if params.get('startTime') else None
+        end = int(params['endTime']) if params.get('endTime') else None
+        if self.config['candle_store']:
+            series = CandleStore(self.config['candle_store']).series(symbol, interval)
+            if series.rows:
+                return self._stored_klines(series, step, start, end, limit)
+        return self._synthetic_klines(symbol, step, start, end, limit)
+
+    @staticmethod
+    def _kline(open_time, step, o, h, l, c, volume):
+        return [open_time, fmt(o), fmt(h), fmt(l), fmt(c), fmt(volume), open_time + step - 1,
+                fmt(volume * c), 1, fmt(volume / 2), fmt(volume * c / 2), '0']
+
+    def _stored_klines(self, series, step, start, end, limit):
+        columns = series.range(start, end + 1 if end is not None else None)
+        rows = list(zip(*(columns[c].tolist() for c in ('time', 'open', 'high', 'low', 'close', 'volume'))))
+        rows = rows[:limit] if start is not None else rows[-limit:]
+        return [self._kline(int(t), step, o, h, l, c, v) for t, o, h, l, c, v in rows]
+
+    def _synthetic_close(self, symbol, open_time, step):
+        bar = open_time // step
+        wave = sum(amplitude * math.sin(2 * math.pi * bar / period) for period, amplitude in SYNTHETIC_WAVES)
+        noise = random.Random(f"{symbol}:{bar}").uniform(-SYNTHETIC_NOISE, SYNTHETIC_NOISE)
+        return self.prices[symbol] * (1 + wave + noise)
+
+    def _synthetic_klines(self, symbol, step, start, end, limit):
+        """Deterministic bars (the same open time always gives the same bar); the open bar closes at the live price"""
+        current = int(time.time() * 1000) // step * step
+        last = min(current, end // step * step) if end is not None else current
+        if start is not None:
+            first = -(-start // step) * step
+            last = min(last, first + (limit - 1) * step)
+        else:
+            first = last - (limit - 1) * step
+        rows = []
+        for open_time in range(first, last + 1, step):
+            close = self.prices[symbol] if open_time == current else self._synthetic_close(symbol, open_time, step)
+            o = self._synthetic_close(symbol, open_time - step, step)
+            rows.append(self._kline(open_time, step, o, max(o, close) * 1.0005, min(o, close) * 0.9995, close,
+                                    10 + (open_time // step) % 7))
+        return rows
+
+    def exchange_info(self):
+        symbols = []
+        for symbol in sorted(self.prices):
+            base, quote = guess_assets(symbol)
+            symbols.append({
+                'symbol': symbol,
+                'status': 'TRADING',
+                'baseAsset': base,
+                'baseAssetPrecision': 8,
+                'quoteAsset': quote,
+                'quotePrecision': 8,
+                'orderTypes': ['MARKET'],
+                'isSpotTradingAllowed': True,
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'minPrice': self.config['tick_size'],
+                     'maxPrice': '1000000.00000000', 'tickSize': self.config['tick_size']},
+                    {'filterType': 'LOT_SIZE', 'minQty': self.config['step_size'],
+                     'maxQty': '9000.00000000', 'stepSize': self.config['step_size']},
+                    {'filterType': 'NOTIONAL', 'minNotional': self.config['min_notional'],
+                     'applyMinToMarket': True, 'maxNotional': '9000000.00000000',
+                     'applyMaxToMarket': False, 'avgPriceMins': 5},
+                ],
+                'permissions': ['SPOT'],
+            })
+        return {
+            'timezone': 'UTC',
+            'serverTime': int(time.time() * 1000),
+            'rateLimits': [
+                {'rateLimitType': 'REQUEST_WEIGHT', 'interval': 'MINUTE', 'intervalNum': 1,
+                 'limit': self.config['weight_limit']},
+                {'rateLimitType': 'ORDERS', 'interval': 'SECOND', 'intervalNum': 10,
+                 'limit': self.config['order_limit']},
+            ],
+            'symbols': symbols,
+        }
+
+    # ------------------------------------------------------------------
+    # Account and orders
+    # ------------------------------------------------------------------
+
+    def account(self):
+        return {
+            'makerCommission': 10,
+            'takerCommission': 10,
+            'canTrade': True,
+            'canWithdraw': False,
+            'canDeposit': False,
+            'updateTime': int(time.time() * 1000),
+            'accountType': 'SPOT',
+            'balances': [{'asset': a, 'free': fmt(v), 'locked': fmt(0)} for a, v in sorted(self.balances.items())],
+            'permissions': ['SPOT'],
+        }
+
+    def create_order(self, params):
+        """Fill a MARKET order in full at the current price (plus slippage)"""
+        symbol = params.get('symbol', '').upper()
+        side = params.get('side', '').upper()
+        order_type = params.get('type', '').upper()
+        for name, value in (('symbol', symbol), ('side', side), ('type', order_type)):
+            if not value:
+                raise SimError(400, -1102, f"Mandatory parameter '{name}' was not sent, was empty/null, or malformed.")
+        if side not in ('BUY', 'SELL'):
+            raise SimError(400, -1117, "Invalid side.")
+        if order_type != 'MARKET':
+            raise SimError(400, -1116, "Invalid orderType.")
+        market = self.price(symbol)
+        price = market * (1 + self.config['slippage_bps'] / 10000 * (1 if side == 'BUY' else -1))
+
+        step = Decimal(self.config['step_size'])
+        if params.get('quantity'):
+            quantity = Decimal(params['quantity'])
+            if quantity % step != 0:
+                raise SimError(400, -1013, "Filter failure: LOT_SIZE")
+        elif params.get('quoteOrderQty'):
+            quantity = (Decimal(params['quoteOrderQty']) / Decimal(repr(price)) / step).to_integral_value(ROUND_DOWN) * step
+        else:
+            raise SimError(400, -1102, "Param 'quantity' or 'quoteOrderQty' must be sent, but both were empty/null!")
+        if quantity < step or quantity > 9000:
+            raise SimError(400, -1013, "Filter failure: LOT_SIZE")
+        qty = float(quantity)
+        notional = qty * price
+        if notional < float(self.config['min_notional']):
+            raise SimError(400, -1013, "Filter failure: NOTIONAL")
+
+        base, quote = guess_assets(symbol)
+        fee_rate = self.config['fee_rate']
+        if side == 'BUY':
+            if self.balances.get(quote, 0.0) < notional:
+                raise SimError(400, -2010, "Account has insufficient balance for requested action.")
+            commission, commission_asset = qty * fee_rate, base
+            self.balances[quote] = self.balances.get(quote, 0.0) - notional
+            self.balances[base] = self.balances.get(base, 0.0) + qty - commission
+        else:
+            if self.balances.get(base, 0.0) < qty:
+                raise SimError(400, -2010, "Account has insufficient balance for requested action.")
+            commission, commission_asset = notional * fee_rate, quote
+            self.balances[base] = self.balances.get(base, 0.0) - qty
+            self.balances[quote] = self.balances.get(quote, 0.0) + notional - commission
+
+        now = int(time.time() * 1000)
+        order_id, trade_id = self.next_order_id, self.next_trade_id
+        self.next_order_id += 1
+        self.next_trade_id += 1
+        order = {
+            'symbol': symbol,
+            'orderId': order_id,
+            'orderListId': -1,
+            'clientOrderId': params.get('newClientOrderId') or f"sim{order_id}",
+            'price': fmt(0),
+            'origQty': fmt(qty),
+            'executedQty': fmt(qty),
+            'cummulativeQuoteQty': fmt(notional),
+            'status': 'FILLED',
+            'timeInForce': 'GTC',
+            'type': 'MARKET',
+            'side': side,
+            'stopPrice': fmt(0),
+            'icebergQty': fmt(0),
+            'time': now,
+            'updateTime': now,
+            'isWorking': True,
+            'workingTime': now,
+            'origQuoteOrderQty': fmt(float(params.get('quoteOrderQty') or 0)),
+            'selfTradePreventionMode': 'EXPIRE_MAKER',
+        }
+        trade = {
+            'symbol': symbol,
+            'id': trade_id,
+            'orderId': order_id,
+            'orderListId': -1,
+            'price': fmt(price),
+            'qty': fmt(qty),
+            'quoteQty': fmt(notional),
+            'commission': fmt(commission),
+            'commissionAsset': commission_asset,
+            'time': now,
+            'isBuyer': side == 'BUY',
+            'isMaker': False,
+            'isBestMatch': True,
+        }
+        self.orders.setdefault(symbol, []).append(order)
+        self.trades.setdefault(symbol, []).append(trade)
+        self.counters['orders'] += 1
+
+        response = {k: order[k] for k in ('symbol', 'orderId', 'orderListId', 'clientOrderId', 'price', 'origQty',
+                                           'executedQty', 'cummulativeQuoteQty', 'status', 'timeInForce', 'type',
+                                           'side', 'workingTime', 'selfTradePreventionMode')}
+        response['transactTime'] = now
+        response['fills'] = [{'price': trade['price'], 'qty': trade['qty'], 'commission': trade['commission'],
+                              'commissionAsset': commission_asset, 'tradeId': trade_id}]
+        return response
+
+    def get_order(self, params):
+        symbol = params.get('symbol', '').upper()
+        order_id = params.get('orderId')
+        client_id = params.get('origClientOrderId')
+        for order in self.orders.get(symbol, []):
+            if (order_id and order['orderId'] == int(order_id)) or (client_id and order['clientOrderId'] == client_id):
+                return order
+        raise SimError(400, -2013, "Order does not exist.")
+
+    @staticmethod
+    def _page(records, params, id_field, from_param):
+        """Binance history paging: from an id (inclusive) or a time range, oldest first"""
+        start = params.get(from_param)
+        start_time, end_time = params.get('startTime'), params.get('endTime')
+        limit = min(int(params.get('limit') or 500), 1000)
+        selected = []
+        for record in records:
+            if start is not None and record[id_field] < int(start):
+                continue
+            if start_time and record['time'] < int(start_time):
+                continue
+            if end_time and record['time'] > int(end_time):
+                continue
+            selected.append(record)
+        # Without a starting point Binance returns the most recent `limit` records
+        return selected[:limit] if start is not None or start_time else selected[-limit:]
+
+    def all_orders(self, params):
+        return self._page(self.orders.get(params.get('symbol', '').upper(), []), params, 'orderId', 'orderId')
+
+    def my_trades(self, params):
+        trades = self.trades.get(params.get('symbol', '').upper(), [])
+        if params.get('orderId'):
+            return [t for t in trades if t['orderId'] == int(params['orderId'])]
+        return self._page(trades, params, 'id', 'fromId')
+
+    def state(self):
+        return {
+            'prices': self.prices,
+            'balances': self.balances,
+            'orders': sum(len(o) for o in self.orders.values()),
+            'used_weight_1m': self.used_weight,
+            'order_count_10s': self.order_count,
+            'retry_after': round(max(0.0, self.retry_until - time.time()), 1),
+            'banned_for': round(max(0.0, self.banned_until - time.time()), 1),
+            'config': self.config,
+            'counters': self.counters,
+        }
+
+# ============================================================================
+# HTTP API
+# ============================================================================
+
+def endpoint(name, signed=False, order=False):
+    """Wrap a handler with Binance request handling: weight, limits, faults, latency, error format"""
+    def decorate(handler):
+        async def wrapper(request):
+            exchange = request.app['exchange']
+            params = dict(request.query)
+            if request.method in ('POST', 'DELETE'):
+                params.update(await request.post())
+            await asyncio.sleep(exchange.delay())
+            try:
+                if signed:
+                    if not request.headers.get('X-MBX-APIKEY'):
+                        raise SimError(401, -2014, "API-key format invalid.")
+                    if 'signature' not in params:
+                        raise SimError(400, -1102, "Mandatory parameter 'signature' was not sent, was empty/null, or malformed.")
+                weight = WEIGHTS[name]
+                if name == 'ticker/price' and 'symbol' not in params:
+                    weight = 4
+                exchange.charge(weight, order=order)
+                body, status = handler(exchange, params), 200
+            except SimError as e:
+                if e.status == 400:
+                    exchange.counters['rejected'] += 1
+                headers = exchange.usage_headers(order)
+                if e.retry_after is not None:
+                    headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+                return web.json_response({'code': e.code, 'msg': e.msg}, status=e.status, headers=headers)
+            return web.json_response(body, status=status, headers=exchange.usage_headers(order))
+        return wrapper
+    return decorate
+
+
+@endpoint('ping')
+def ping(exchange, params):
+    return {}
+
+
+@endpoint('time')
+def server_time(exchange, params):
+    return {'serverTime': int(time.time() * 1000)}
+
+
+@endpoint('exchangeInfo')
+def exchange_info(exchange, params):
+    return exchange.exchange_info()
+
+
+@endpoint('account', signed=True)
+def account(exchange, params):
+    return exchange.account()
+
+
+@endpoint('ticker/price')
+def ticker_price(exchange, params):
+    if 'symbol' in params:
+        symbol = params['symbol'].upper()
+        return {'symbol': symbol, 'price': fmt(exchange.price(symbol))}
+    return [{'symbol': s, 'price': fmt(exchange.price(s))} for s in sorted(exchange.prices)]
+
+
+@endpoint('klines')
+def klines(exchange, params):
+    return exchange.klines(params)
+
+
+@endpoint('order', signed=True, order=True)
+def new_order(exchange, params):
+    return exchange.create_order(params)
+
+
+@endpoint('order/query', signed=True)
+def query_order(exchange, params):
+    return exchange.get_order(params)
+
+
+@endpoint('allOrders', signed=True)
+def all_orders(exchange, params):
+    return exchange.all_orders(params)
+
+
+@endpoint('myTrades', signed=True)
+def my_trades(exchange, params):
+    return exchange.my_trades(params)
+
+
+async def sim_state(request):
+    return web.json_response(request.app['exchange'].state())
+
+
+async def sim_config(request):
+    """POST {"latency_ms": 50, "error_rate": 0.1, ...} to change settings at runtime"""
+    try:
+        request.app['exchange'].configure(**await request.json())
+    except (ValueError, TypeError) as e:
+        return web.json_response({'error': str(e)}, status=400)
+    return web.json_response(request.app['exchange'].config)
+
+
+async def sim_reset(request):
+    request.app['exchange'].reset()
+    return web.json_response({'status': 'reset'})
+
+
+async def sim_price(request):
+    """POST {"symbol": "BTCUSDT", "price": 51000} to move a market"""
+    data = await request.json()
+    request.app['exchange'].prices[data['symbol'].upper()] = float(data['price'])
+    return web.json_response({'symbol': data['symbol'].upper(), 'price': float(data['price'])})
+
+
+def create_app(exchange=None):
+    app = web.Application()
+    app['exchange'] = exchange or SimExchange()
+    # python-binance sends public calls to /api/v1 or /api/v3 depending on the method
+    for version in ('v1', 'v3'):
+        prefix = f"/api/{version}"
+        app.router.add_get(f"{prefix}/ping", ping)
+        app.router.add_get(f"{prefix}/time", server_time)
+        app.router.add_get(f"{prefix}/exchangeInfo", exchange_info)
+        app.router.add_get(f"{prefix}/account", account)
+        app.router.add_get(f"{prefix}/ticker/price", ticker_price)
+        app.router.add_get(f"{prefix}/klines", klines)
+        app.router.add_post(f"{prefix}/order", new_order)
+        app.router.add_get(f"{prefix}/order", query_order)
+        app.router.add_get(f"{prefix}/allOrders", all_orders)
+        app.router.add_get(f"{prefix}/myTrades", my_trades)
+    app.router.add_get('/sim/state', sim_state)
+    app.router.add_post('/sim/config', sim_config)
+    app.router.add_post('/sim/reset', sim_reset)
+    app.router.add_post('/sim/price', sim_price)
+    return app
+
+
+def start_in_thread(exchange=None, host='127.0.0.1', port=0):
+    """Serve the simulator on its own event loop in a daemon thread; returns (base url, exchange)"""
+    exchange = exchange or SimExchange()
+    ready = threading.Event()
+    holder = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(create_app(exchange), access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, host, port)
+        loop.run_until_complete(site.start())
+        holder['url'] = f"http://{host}:{site._server.sockets[0].getsockname()[1]}"
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="exchange-sim", daemon=True).start()
+    ready.wait()
+    return holder['url'], exchange
+
+
+def simulator_client(client_class, url):
+    """Subclass of binance Client / AsyncClient whose REST calls go to the simulator at `url`"""
+    api_url = url.rstrip('/') + '/api'
+    return type(f"Simulated{client_class.__name__}", (client_class,), {'API_URL': api_url, 'API_TESTNET_URL': api_url})
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else SIM_PORT
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    exchange = SimExchange()
+    print("=" * 80)
+    print(f"BINANCE SIMULATOR on http://{SIM_HOST}:{port}")
+    print("=" * 80)
+    print(f"Prices:   {json.dumps(exchange.prices)}")
+    print(f"Balances: {json.dumps(exchange.balances)}")
+    print(f"Latency {exchange.config['latency_ms']} ms (+{exchange.config['jitter_ms']} jitter), "
+          f"error rate {exchange.config['error_rate']}, limits {exchange.config['weight_limit']} weight/min "
+          f"and {exchange.config['order_limit']} orders/10s")
+    print(f"✅ Point the bot at it with BINANCE_SIMULATOR_URL=http://{SIM_HOST}:{port}")
+    web.run_app(create_app(exchange), host=SIM_HOST, port=port, print=None)
@@ -0,0 +1,162 @@
+"""
+Logging Config - Queue-backed, structured logging for the servers
+Log calls only put the record on an in-memory queue; a listener thread formats
+it and does the file/console I/O, so a slow disk never adds latency to order
+placement. Messages are formatted lazily on that thread (use logger.info("%s",
+value) on hot paths), records can be written as JSON lines, the log file
+rotates by size or time, and levels can be set per module.
+
+    LOG_LEVEL=INFO                              - root level
+    LOG_LEVELS=werkzeug=WARNING,rate_limiter=DEBUG
+    LOG_FORMAT=json                             - file format: json or text
+    LOG_ROTATE=size  LOG_MAX_BYTES=10485760  LOG_BACKUP_COUNT=5
+    LOG_ROTATE=time  LOG_ROTATE_WHEN=midnight
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+LOG_FILE = os.getenv('LOG_FILE', 'trading_bot.log')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', 'werkzeug=WARNING')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+LOG_CONSOLE = os.getenv('LOG_CONSOLE', 'true').lower() == 'true'
+LOG_ROTATE = os.getenv('LOG_ROTATE', 'size').lower()              # size, time or none
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else came in through `extra=` and goes into the JSON
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class LazyJson:
+    """Log argument rendered as compact JSON only when the record is formatted"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return json.dumps(self.value, default=str)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields and exception"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a bounded queue without formatting them. When the listener
+    falls behind and the queue is full, records are dropped (and counted)
+    rather than blocking the caller.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The listener runs in this process, so the record can be handed over
+        # as is; getMessage() is called there, not on the request thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec):
+    """'werkzeug=WARNING,rate_limiter=DEBUG' -> {'werkzeug': 'WARNING', 'rate_limiter': 'DEBUG'}"""
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def file_handler(path):
+    if LOG_ROTATE == 'size':
+        return logging.handlers.RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    if LOG_ROTATE == 'time':
+        return logging.handlers.TimedRotatingFileHandler(path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT)
+    return logging.FileHandler(path)
+
+
+_listener = None
+_queue_handler = None
+
+
+def setup_logging(path=LOG_FILE, level=LOG_LEVEL, levels=LOG_LEVELS, console=LOG_CONSOLE):
+    """
+    Route all logging through one queue and a listener thread (idempotent).
+    Returns the queue handler (its `dropped` count is exported on /metrics).
+    """
+    global _listener, _queue_handler
+    if _queue_handler:
+        return _queue_handler
+
+    handlers = []
+    if path:
+        handler = file_handler(path)
+        handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+        handlers.append(handler)
+    if console:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(handler)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    # Skip record fields none of our formats use (see "Optimization" in the logging HOWTO):
+    # the caller's file/line lookup walks the stack on every call
+    logging._srcfile = None
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    for name, module_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(module_level)
+    return _queue_handler
+
+
+def stop_logging():
+    """Write out everything still queued and stop the listener thread"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,280 @@
+"""
+Metrics - In-memory counters and latency histograms for the hot path
+Timers around parsing, Binance calls, balance checks, order placement and the
+journal write are aggregated into fixed-bucket histograms and rendered in the
+Prometheus text format on /metrics. Recording a sample is a bisect and two
+additions under a lock (well under a microsecond); label lookups are cached,
+and hot paths bind their labelled series once at import time.
+
+Usage:
+    python metrics.py              - measure the per-sample and per-request overhead
+"""
+
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# Set METRICS_ENABLED=false to turn every observe/inc into a no-op
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Latency buckets in seconds: 10 us (parsing) up to 10 s (a stuck exchange call)
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _HistogramSeries:
+    """One labelled histogram: per-bucket counts, sum and count"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Decorator recording how long each call took (also when it raises); works on coroutines too"""
+        def decorate(func):
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def timed_async(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe(time.perf_counter() - start)
+                return timed_async
+
+            @wraps(func)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start)
+            return timed
+        return decorate
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class _CounterSeries:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _Metric:
+    """A named metric family with labelled series created on first use"""
+
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._child(())
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def _child(self, key):
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def labels(self, *values, **labels):
+        """The series for these label values (positional in labelnames order, or by name)"""
+        key = values if values else tuple(labels[n] for n in self.labelnames)
+        return self._child(key)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_series(self):
+        return _HistogramSeries(self.bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def render(self):
+        lines = self.header()
+        for key, series in sorted(self._series.items()):
+            counts, total, count = series.snapshot()
+            cumulative = 0
+            for bound, n in zip(self.bounds + (float('inf'),), counts):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_series(self):
+        return _CounterSeries()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def render(self):
+        lines = self.header()
+        for key, series in sorted(self._series.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(series.value)}")
+        return lines
+
+
+class Gauge:
+    """
+    A value read from `fn()` at scrape time (e.g. queue depth, cache age).
+    kind='counter' exposes a running total kept elsewhere as a counter.
+    """
+
+    def __init__(self, name, help, fn, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+
+    def render(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name} {_format_value(value)}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing:
+                # Re-importing a module (e.g. in tests or replays) reuses the same family
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, fn, kind='gauge'):
+        with self._lock:
+            metric = self._metrics[name] = Gauge(name, help, fn, kind)
+            return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+histogram = REGISTRY.histogram
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+render = REGISTRY.render
+
+# Content-Type of the /metrics response
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+if __name__ == '__main__':
+    import json
+
+    iterations = 200000
+    demo = Histogram('demo_seconds', 'demo', ['stage'])
+    series = demo.labels(stage='parse')
+    count = Counter('demo_total', 'demo', ['status']).labels(status='ok')
+
+    def measure(fn):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn()
+        return (time.perf_counter_ns() - start) / iterations
+
+    baseline = measure(lambda: None)
+    timed_noop = series.time()(lambda: None)
+    results = {
+        'observe_ns': round(measure(lambda: series.observe(0.0001)) - baseline, 1),
+        'labels_lookup_ns': round(measure(lambda: demo.labels(stage='parse')) - baseline, 1),
+        'counter_inc_ns': round(measure(count.inc) - baseline, 1),
+        'timed_call_ns': round(measure(timed_noop) - baseline, 1),
+    }
+    # One webhook request records about 6 timed stages, 2 Binance call timings and 2 counters
+    results['per_request_us'] = round((8 * results['timed_call_ns'] + 2 * results['counter_inc_ns']) / 1000, 2)
+
+    print("=" * 80)
+    print(f"METRICS OVERHEAD ({iterations} iterations)")
+    print("=" * 80)
+    for name, value in results.items():
+        print(f"{name:<20} {value:>10}")
+    print("-" * 80)
+    print(json.dumps(results))
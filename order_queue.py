@@ -0,0 +1,140 @@
+"""
+Order Queue - In-process job queue and worker pool for order execution
+Lets the webhook return immediately while orders are sent to Binance in the background
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be accepted because its worker lane is full"""
+
+
+class OrderQueue:
+    """
+    Bounded worker pool that preserves ordering per symbol.
+
+    Every symbol is pinned to one worker lane (by a stable hash of the symbol),
+    so signals for the same pair are executed strictly in arrival order while
+    different pairs run in parallel on the other lanes.
+    """
+
+    def __init__(self, handler, num_workers=4, max_pending=100, max_jobs=1000):
+        self.handler = handler
+        self.num_workers = max(1, int(num_workers))
+        self.max_jobs = max_jobs
+        self._lanes = [queue.Queue(maxsize=max_pending) for _ in range(self.num_workers)]
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._threads = []
+        self._started = False
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        if self._started:
+            return
+        self._started = True
+        for i, lane in enumerate(self._lanes):
+            t = threading.Thread(target=self._worker, args=(lane,), name=f"order-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info(f"Order queue started with {self.num_workers} workers")
+
+    def stop(self, timeout=5):
+        """Ask workers to finish the queued jobs and exit"""
+        for lane in self._lanes:
+            lane.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        self._started = False
+
+    def lane_for(self, symbol):
+        """Worker lane index used for a symbol"""
+        return zlib.crc32((symbol or '').upper().encode()) % self.num_workers
+
+    def submit(self, symbol, data):
+        """Queue a signal for execution and return its job record"""
+        job = {
+            'id': uuid.uuid4().hex,
+            'seq': next(self._seq),
+            'symbol': symbol,
+            'signal': data.get('signal'),
+            'status': 'queued',
+            'queued_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'http_status': None,
+        }
+        lane = self._lanes[self.lane_for(symbol)]
+        with self._lock:
+            self._jobs[job['id']] = job
+            self._trim_jobs()
+        try:
+            lane.put_nowait((job, data))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job['id'], None)
+            raise QueueFullError(f"Order queue is full for {symbol}")
+        return job
+
+    def get_job(self, job_id):
+        """Return a copy of a job record, or None if unknown/expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self):
+        """Queue depth per lane and number of tracked jobs"""
+        return {
+            'workers': self.num_workers,
+            'pending': [lane.qsize() for lane in self._lanes],
+            'tracked_jobs': len(self._jobs),
+        }
+
+    def _trim_jobs(self):
+        """Forget the oldest finished jobs once max_jobs is exceeded"""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id]['status'] in ('done', 'failed'):
+                del self._jobs[job_id]
+                excess -= 1
+
+    def _worker(self, lane):
+        """Drain one lane, running the handler for each job in order"""
+        while True:
+            item = lane.get()
+            if item is None:
+                lane.task_done()
+                return
+            job, data = item
+            with self._lock:
+                job['status'] = 'running'
+                job['started_at'] = datetime.now().isoformat()
+            try:
+                result, http_status = self.handler(data)
+                status = 'done' if http_status < 400 else 'failed'
+            except Exception as e:
+                logger.error(f"Order job {job['id']} crashed: {e}")
+                result, http_status, status = {'error': str(e)}, 500, 'failed'
+            with self._lock:
+                job['result'] = result
+                job['http_status'] = http_status
+                job['status'] = status
+                job['finished_at'] = datetime.now().isoformat()
+            lane.task_done()
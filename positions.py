@@ -0,0 +1,267 @@
+"""
+Positions - Local position and PnL ledger built from order fills
+Every filled order updates a per-(account, symbol) position in memory from the
+executedQty / cummulativeQuoteQty / fills in the create_order response, so
+positions, average entry and realized PnL are known without asking Binance.
+Unrealized PnL is marked from a cached price when the book is read, and the
+book is snapshotted to a JSON file in the background so it survives restarts.
+
+The ledger only knows about orders the bot placed: a sell larger than the
+tracked position (e.g. of coins held before the bot started) closes the
+position and the excess is counted as `untracked_sold`, not as a short.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Position:
+    """Average-cost position in one symbol on one account (quantities in base, money in quote)"""
+
+    __slots__ = ('account', 'symbol', 'base_asset', 'quote_asset', 'quantity', 'avg_price', 'realized_pnl',
+                 'fees', 'buys', 'sells', 'bought', 'sold', 'untracked_sold', 'last_fill_price', 'updated_at')
+
+    def __init__(self, account, symbol, base_asset, quote_asset):
+        self.account = account
+        self.symbol = symbol
+        self.base_asset = base_asset
+        self.quote_asset = quote_asset
+        self.quantity = 0.0
+        self.avg_price = 0.0
+        self.realized_pnl = 0.0
+        self.fees = {}              # commission paid per asset
+        self.buys = 0
+        self.sells = 0
+        self.bought = 0.0
+        self.sold = 0.0
+        self.untracked_sold = 0.0
+        self.last_fill_price = None
+        self.updated_at = None
+
+    def apply(self, side, executed, quote_qty, commissions):
+        """Apply one fill: side 'BUY'/'SELL', base executed, quote spent/received, {asset: commission}"""
+        for asset, amount in commissions.items():
+            self.fees[asset] = self.fees.get(asset, 0.0) + amount
+        base_fee = commissions.get(self.base_asset, 0.0)
+        quote_fee = commissions.get(self.quote_asset, 0.0)
+        self.last_fill_price = quote_qty / executed
+        self.updated_at = time.time()
+
+        if side == 'BUY':
+            # Commission taken in base arrives as less coin; in quote it adds to the cost
+            received = executed - base_fee
+            cost = self.quantity * self.avg_price + quote_qty + quote_fee
+            self.quantity += received
+            self.avg_price = cost / self.quantity if self.quantity > 0 else 0.0
+            self.buys += 1
+            self.bought += received
+            return
+
+        self.sells += 1
+        self.sold += executed
+        closed = min(executed, self.quantity)
+        if closed > 0:
+            # Proceeds (net of quote commission) attributed to the tracked part of the sale
+            proceeds = (quote_qty - quote_fee) * closed / executed
+            self.realized_pnl += proceeds - closed * self.avg_price
+        self.untracked_sold += executed - closed
+        self.quantity -= closed + min(base_fee, self.quantity - closed)
+        if self.quantity <= 1e-12:
+            self.quantity = 0.0
+            self.avg_price = 0.0
+
+    def to_dict(self):
+        """Position as a dict (mark_price/unrealized_pnl are filled in by the book)"""
+        return {
+            'account': self.account,
+            'symbol': self.symbol,
+            'base_asset': self.base_asset,
+            'quote_asset': self.quote_asset,
+            'quantity': self.quantity,
+            'avg_price': self.avg_price,
+            'mark_price': None,
+            'unrealized_pnl': None,
+            'realized_pnl': self.realized_pnl,
+            'fees': dict(self.fees),
+            'buys': self.buys,
+            'sells': self.sells,
+            'bought': self.bought,
+            'sold': self.sold,
+            'untracked_sold': self.untracked_sold,
+            'last_fill_price': self.last_fill_price,
+            'updated_at': self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        position = cls(data['account'], data['symbol'], data['base_asset'], data['quote_asset'])
+        for name in cls.__slots__[4:]:
+            if name in data:
+                setattr(position, name, dict(data[name]) if name == 'fees' else data[name])
+        return position
+
+
+class PositionBook:
+    """
+    Positions indexed by (account, symbol).
+
+    `mark_price(symbol)` supplies the cached price used for unrealized PnL
+    (normally PriceBook.get); it must not call the exchange. With a `path` the
+    book is loaded at start() and written there every `snapshot_interval`
+    seconds while it has changed, and once more at exit.
+    """
+
+    def __init__(self, path=None, snapshot_interval=30.0, mark_price=None):
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.mark_price = mark_price
+        self._positions = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._thread = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def apply_order(self, account, symbol, order, base_asset, quote_asset):
+        """Update the position from a create_order response; returns the position dict (None if unfilled)"""
+        try:
+            executed = float(order.get('executedQty') or 0)
+            quote_qty = float(order.get('cummulativeQuoteQty') or 0)
+            commissions = {}
+            for fill in order.get('fills') or []:
+                amount = float(fill.get('commission') or 0)
+                if amount:
+                    asset = fill.get('commissionAsset')
+                    commissions[asset] = commissions.get(asset, 0.0) + amount
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not read fill of order {order.get('orderId')} for the position book: {e}")
+            return None
+        if executed <= 0:
+            return None
+        key = (account, symbol)
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._positions[key] = Position(account, symbol, base_asset, quote_asset)
+            position.apply(order.get('side'), executed, quote_qty, commissions)
+            self._dirty = True
+            return position.to_dict()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _mark(self, symbol):
+        if not self.mark_price:
+            return None
+        try:
+            return self.mark_price(symbol)
+        except Exception:
+            return None
+
+    def get(self, account, symbol):
+        """One position marked to the cached price, or None if the bot never traded it"""
+        with self._lock:
+            position = self._positions.get((account, symbol))
+            data = position.to_dict() if position else None
+        if data:
+            self._add_mark(data)
+        return data
+
+    def _add_mark(self, data):
+        mark = self._mark(data['symbol'])
+        if mark is not None:
+            data['mark_price'] = mark
+            data['unrealized_pnl'] = data['quantity'] * (mark - data['avg_price'])
+
+    def all(self, account=None, symbol=None):
+        """Every position (optionally filtered), marked to the cached prices"""
+        with self._lock:
+            positions = [p.to_dict() for p in self._positions.values()
+                         if (account is None or p.account == account) and (symbol is None or p.symbol == symbol)]
+        for data in positions:
+            self._add_mark(data)
+        return positions
+
+    def totals(self, positions):
+        """Realized/unrealized PnL summed per quote asset"""
+        totals = {}
+        for p in positions:
+            entry = totals.setdefault(p['quote_asset'], {'realized_pnl': 0.0, 'unrealized_pnl': 0.0})
+            entry['realized_pnl'] += p['realized_pnl']
+            entry['unrealized_pnl'] += p['unrealized_pnl'] or 0.0
+        return totals
+
+    def __len__(self):
+        return len(self._positions)
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """Read the last snapshot from disk (no-op without a path or file)"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        positions = {}
+        for entry in data.get('positions', []):
+            position = Position.from_dict(entry)
+            positions[(position.account, position.symbol)] = position
+        with self._lock:
+            self._positions = positions
+            self._dirty = False
+        logger.info(f"Loaded {len(positions)} positions from {self.path}")
+        return len(positions)
+
+    def save(self):
+        """Write the book to disk atomically if it changed since the last save"""
+        if not self.path:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+            data = {'saved_at': time.time(), 'positions': [p.to_dict() for p in self._positions.values()]}
+            self._dirty = False
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._dirty = True
+            logger.error(f"Failed to write position snapshot to {self.path}: {e}")
+            return False
+        return True
+
+    def start(self):
+        """Load the last snapshot and start the background snapshot thread (idempotent)"""
+        if self._thread or not self.path:
+            return
+        try:
+            self.load()
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not load position snapshot {self.path}: {e}")
+        self._thread = threading.Thread(target=self._run, name="position-snapshots", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Position snapshots enabled ({self.path}, every {self.snapshot_interval}s)")
+
+    def stop(self):
+        """Stop the snapshot thread and write a final snapshot"""
+        self._stop.set()
+        self.save()
+
+    def _run(self):
+        while not self._stop.wait(self.snapshot_interval):
+            self.save()
@@ -0,0 +1,132 @@
+"""
+Price Cache - In-memory last-price book fed by the Binance market-data stream
+Lets the webhook size orders without a blocking get_symbol_ticker REST call
+"""
+
+import json
+import logging
+import threading
+import time
+
+from websockets.sync.client import connect
+
+logger = logging.getLogger(__name__)
+
+# Public market-data stream for Binance Spot Testnet
+DEFAULT_STREAM_URL = 'wss://stream.testnet.binance.vision'
+
+
+class PriceBook:
+    """Last known price per symbol with the time it was received"""
+
+    def __init__(self):
+        self._prices = {}
+        self._lock = threading.Lock()
+
+    def update(self, symbol, price, ts=None):
+        """Record a new price for a symbol"""
+        with self._lock:
+            self._prices[symbol.upper()] = (float(price), ts or time.time())
+
+    def get(self, symbol, max_age=None):
+        """Latest price for a symbol, or None if unknown or older than max_age seconds"""
+        entry = self._prices.get(symbol.upper())
+        if entry is None:
+            return None
+        price, ts = entry
+        if max_age is not None and time.time() - ts > max_age:
+            return None
+        return price
+
+    def snapshot(self):
+        """Copy of the book: {symbol: {'price': float, 'age': seconds}}"""
+        now = time.time()
+        with self._lock:
+            return {s: {'price': p, 'age': round(now - ts, 3)} for s, (p, ts) in self._prices.items()}
+
+
+def parse_stream_message(message):
+    """
+    Extract (symbol, price) from a bookTicker, miniTicker or trade stream message.
+
+    Accepts both raw and combined-stream ({"stream": ..., "data": {...}}) frames.
+    bookTicker prices are the bid/ask mid, miniTicker prices the last close and
+    trade/aggTrade prices the trade price. Returns None for frames that carry no price.
+    """
+    payload = json.loads(message)
+    data = payload.get('data', payload)
+    symbol = data.get('s')
+    if not symbol:
+        return None
+    # Trade frames also carry 'b'/'a' (order/trade ids), so tell them apart by event type
+    if data.get('e') in ('trade', 'aggTrade'):
+        return symbol, float(data['p'])
+    if 'b' in data and 'a' in data:
+        return symbol, (float(data['b']) + float(data['a'])) / 2
+    if 'c' in data:
+        return symbol, float(data['c'])
+    return None
+
+
+class PriceStream:
+    """
+    Background subscriber that keeps a PriceBook current from a Binance
+    combined market-data stream, reconnecting on errors after `backoff`
+    seconds, doubled per failed attempt up to 30.
+    """
+
+    def __init__(self, book, symbols, url=DEFAULT_STREAM_URL, stream_type='bookTicker', backoff=1):
+        self.book = book
+        self.symbols = [s.upper() for s in symbols]
+        self.url = url.rstrip('/')
+        self.stream_type = stream_type
+        self.backoff = backoff
+        self.connected = False
+        self.connects = 0
+        self.messages = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def stream_url(self):
+        """Combined-stream URL for all configured symbols"""
+        streams = '/'.join(f"{s.lower()}@{self.stream_type}" for s in self.symbols)
+        return f"{self.url}/stream?streams={streams}"
+
+    def start(self):
+        """Start the subscriber thread (idempotent)"""
+        if self._thread or not self.symbols:
+            return
+        self._thread = threading.Thread(target=self._run, name="price-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the subscriber thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+
+    def _run(self):
+        backoff = self.backoff
+        while not self._stop.is_set():
+            try:
+                with connect(self.stream_url(), open_timeout=10) as ws:
+                    self.connected = True
+                    self.connects += 1
+                    backoff = self.backoff
+                    logger.info(f"Price stream connected: {', '.join(self.symbols)} ({self.stream_type})")
+                    while not self._stop.is_set():
+                        try:
+                            message = ws.recv(timeout=1)
+                        except TimeoutError:
+                            continue
+                        parsed = parse_stream_message(message)
+                        if parsed:
+                            self.book.update(*parsed)
+                            self.messages += 1
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning(f"Price stream error: {e}. Reconnecting in {backoff}s")
+            self.connected = False
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30)
@@ -0,0 +1,423 @@
+"""
+Rate Limiter - Client-side Binance request-weight and order-rate budget
+Every Binance call goes through a token bucket sized to the exchange's limits
+and re-synced from the X-MBX-USED-WEIGHT / X-MBX-ORDER-COUNT response headers,
+so bursts of alerts plus dashboard polling can't trip 429/418 bans.
+
+Calls are scheduled by priority:
+    PRIORITY_ORDER      - order placement; may spend the whole budget and waits for tokens
+    PRIORITY_TRADE      - reads on the trade path (balances, prices); waits, but leaves
+                          a reserve for orders
+    PRIORITY_DASHBOARD  - dashboard reads (/balance, /health); identical calls in flight
+                          are coalesced and they are shed when the budget runs low
+
+LimitedClient wraps the blocking python-binance Client; AsyncLimitedClient wraps
+AsyncClient (async_server.py) and is charged to the same budget.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+BINANCE_REQUEST_SECONDS = metrics.histogram(
+    'binance_request_seconds', 'Binance API call duration by client method', ['method'])
+BINANCE_ERRORS = metrics.counter('binance_errors_total', 'Binance API calls that raised, by client method', ['method'])
+
+PRIORITY_ORDER = 0
+PRIORITY_TRADE = 1
+PRIORITY_DASHBOARD = 2
+
+# Request weight of the python-binance methods the bot uses (unknown methods cost 1;
+# the used-weight header corrects any drift)
+METHOD_WEIGHTS = {
+    'ping': 1,
+    'get_server_time': 1,
+    'get_account': 20,
+    'get_symbol_ticker': 2,
+    'get_orderbook_ticker': 2,
+    'get_exchange_info': 20,
+    'get_klines': 2,
+    'create_order': 1,
+    'get_order': 4,
+    'get_open_orders': 6,
+    'get_all_orders': 20,
+    'get_my_trades': 20,
+}
+
+ORDER_METHODS = {'create_order', 'order_market_buy', 'order_market_sell', 'order_limit_buy', 'order_limit_sell'}
+
+# HTTP statuses Binance uses for "slow down" (429) and "IP banned" (418)
+BACKOFF_STATUSES = (429, 418)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call is shed or can't get budget in time"""
+
+
+class TokenBucket:
+    """Continuously refilling bucket: `capacity` tokens per `period` seconds"""
+
+    def __init__(self, capacity, period):
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self._stamp = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        return self.tokens
+
+    def sync_used(self, used):
+        """Lower the available tokens to match usage reported by the exchange"""
+        self.refill()
+        self.tokens = min(self.tokens, self.capacity - used)
+
+    def time_until(self, tokens):
+        """Seconds until `tokens` are available"""
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """
+    Shared request-weight budget (Binance counts weight per IP) plus one
+    order-count bucket per account.
+
+    weight_per_minute  - REQUEST_WEIGHT limit (Binance default 6000/min)
+    orders_per_10s     - ORDERS limit per account (Binance default 100/10s)
+    trade_reserve      - fraction of the weight budget trade-path reads leave for orders
+    dashboard_reserve  - fraction of the weight budget dashboard reads leave for trading
+    max_wait           - longest an order or trade read waits for budget before failing
+    """
+
+    def __init__(self, weight_per_minute=6000, orders_per_10s=100, trade_reserve=0.05,
+                 dashboard_reserve=0.3, max_wait=5.0):
+        self.weight = TokenBucket(weight_per_minute, 60.0)
+        self.orders_per_10s = orders_per_10s
+        self.max_wait = max_wait
+        self.reserves = {
+            PRIORITY_ORDER: 0.0,
+            PRIORITY_TRADE: trade_reserve * weight_per_minute,
+            PRIORITY_DASHBOARD: dashboard_reserve * weight_per_minute,
+        }
+        self._orders = {}
+        self._waiting = {PRIORITY_ORDER: 0, PRIORITY_TRADE: 0, PRIORITY_DASHBOARD: 0}
+        self._cond = threading.Condition()
+        # A ContextVar follows the caller into both threads and asyncio tasks
+        self._priority = contextvars.ContextVar('rate_limit_priority', default=None)
+        self._blocked_until = 0.0
+        self.used_weight_1m = None
+        self.counters = {'calls': 0, 'waits': 0, 'shed': 0, 'coalesced': 0, 'backoffs': 0}
+
+    # ------------------------------------------------------------------
+    # Priority context
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def priority(self, level):
+        """Run the calls made inside the block (on this thread or task) at `level`"""
+        token = self._priority.set(level)
+        try:
+            yield
+        finally:
+            self._priority.reset(token)
+
+    def current_priority(self, default):
+        level = self._priority.get()
+        return default if level is None else level
+
+    def count(self, name):
+        """Bump one of the /health counters"""
+        with self._cond:
+            self.counters[name] += 1
+
+    # ------------------------------------------------------------------
+    # Budget
+    # ------------------------------------------------------------------
+
+    def _order_bucket(self, account):
+        bucket = self._orders.get(account)
+        if bucket is None:
+            bucket = self._orders[account] = TokenBucket(self.orders_per_10s, 10.0)
+        return bucket
+
+    def _higher_priority_waiting(self, level):
+        return any(self._waiting[p] for p in self._waiting if p < level)
+
+    def _take(self, weight, level, orders, account):
+        """Take the tokens if the budget allows it right now (caller holds the lock)"""
+        self.weight.refill()
+        order_bucket = self._order_bucket(account) if orders else None
+        if order_bucket:
+            order_bucket.refill()
+        weight_ok = self.weight.tokens - weight >= self.reserves[level]
+        orders_ok = not order_bucket or order_bucket.tokens >= orders
+        if not (weight_ok and orders_ok) or self._higher_priority_waiting(level):
+            return False
+        self.weight.tokens -= weight
+        if order_bucket:
+            order_bucket.tokens -= orders
+        return True
+
+    def acquire(self, weight, level=PRIORITY_TRADE, orders=0, account='main'):
+        """Take `weight` (and `orders`) from the budget, waiting or shedding per priority"""
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            self.counters['calls'] += 1
+            waited = False
+            self._waiting[level] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now < self._blocked_until:
+                        self.counters['shed'] += 1
+                        raise RateLimitExceeded(f"Binance rate limit backoff for {self._blocked_until - now:.1f}s")
+
+                    if self._take(weight, level, orders, account):
+                        return
+
+                    if level == PRIORITY_DASHBOARD:
+                        self.counters['shed'] += 1
+                        raise RateLimitExceeded("Request weight budget reserved for trading")
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.counters['shed'] += 1
+                        raise RateLimitExceeded(f"No request budget after waiting {self.max_wait}s")
+
+                    if not waited:
+                        self.counters['waits'] += 1
+                        waited = True
+                    delay = self.weight.time_until(weight + self.reserves[level])
+                    if orders:
+                        delay = max(delay, self._order_bucket(account).time_until(orders))
+                    self._cond.wait(min(remaining, max(delay, 0.01)))
+            finally:
+                self._waiting[level] -= 1
+                self._cond.notify_all()
+
+    async def acquire_async(self, weight, level=PRIORITY_TRADE, orders=0, account='main'):
+        """acquire() for coroutines: budget that is there is taken inline, waits happen on an executor thread"""
+        with self._cond:
+            if time.monotonic() >= self._blocked_until and self._take(weight, level, orders, account):
+                self.counters['calls'] += 1
+                return
+        if level == PRIORITY_DASHBOARD or time.monotonic() < self._blocked_until:
+            # acquire() sheds these without waiting
+            return self.acquire(weight, level, orders, account)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(self.acquire, weight, level, orders, account))
+
+    def observe(self, response, account='main'):
+        """Re-sync the buckets from a Binance response's usage headers"""
+        headers = getattr(response, 'headers', None)
+        if not headers:
+            return
+        with self._cond:
+            used = headers.get('x-mbx-used-weight-1m')
+            if used is not None:
+                self.used_weight_1m = int(used)
+                self.weight.sync_used(self.used_weight_1m)
+            order_count = headers.get('x-mbx-order-count-10s')
+            if order_count is not None:
+                self._order_bucket(account).sync_used(int(order_count))
+
+    def backoff(self, response, status_code):
+        """Stop all calls after a 429/418 until the exchange's Retry-After has passed"""
+        headers = getattr(response, 'headers', None) or {}
+        try:
+            retry_after = float(headers.get('Retry-After', 60))
+        except (TypeError, ValueError):
+            retry_after = 60.0
+        with self._cond:
+            self.counters['backoffs'] += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            self.weight.tokens = 0.0
+        logger.warning(f"Binance answered HTTP {status_code}; pausing API calls for {retry_after:.0f}s")
+
+    def stats(self):
+        """Current budget for /health"""
+        with self._cond:
+            self.weight.refill()
+            orders = {}
+            for account, bucket in self._orders.items():
+                orders[account] = int(bucket.refill())
+            return {
+                'weight_limit': int(self.weight.capacity),
+                'weight_available': int(self.weight.tokens),
+                'used_weight_1m': self.used_weight_1m,
+                'orders_available': orders,
+                'backoff_seconds': round(max(0.0, self._blocked_until - time.monotonic()), 1),
+                **self.counters,
+            }
+
+
+def _weight(name, kwargs):
+    """Request weight of a client method call"""
+    if name == 'get_symbol_ticker' and 'symbol' not in kwargs:
+        return 4
+    return METHOD_WEIGHTS.get(name, 1)
+
+
+class _Flight:
+    """One in-flight dashboard call that identical calls can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class LimitedClient:
+    """
+    Wraps a Binance client so every public method call is charged to a RateLimiter.
+    Everything else (attributes, constants) is passed through to the wrapped client.
+    """
+
+    def __init__(self, client, limiter, account='main'):
+        self._client = client
+        self._limiter = limiter
+        self._account = account
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+    @property
+    def wrapped(self):
+        return self._client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        return lambda *args, **kwargs: self._call(name, attr, args, kwargs)
+
+    def _call(self, name, method, args, kwargs):
+        is_order = name in ORDER_METHODS
+        level = PRIORITY_ORDER if is_order else self._limiter.current_priority(PRIORITY_TRADE)
+        if level == PRIORITY_DASHBOARD:
+            return self._coalesced(name, method, args, kwargs)
+        return self._invoke(name, method, args, kwargs, level, is_order)
+
+    def _invoke(self, name, method, args, kwargs, level, is_order=False):
+        self._limiter.acquire(_weight(name, kwargs), level, orders=1 if is_order else 0, account=self._account)
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            BINANCE_REQUEST_SECONDS.labels(name).observe(time.perf_counter() - start)
+            BINANCE_ERRORS.labels(name).inc()
+            response = getattr(e, 'response', None)
+            if getattr(e, 'status_code', None) in BACKOFF_STATUSES:
+                self._limiter.backoff(response, e.status_code)
+            self._limiter.observe(response, self._account)
+            raise
+        BINANCE_REQUEST_SECONDS.labels(name).observe(time.perf_counter() - start)
+        # Best effort: the wrapped client keeps only its latest response
+        self._limiter.observe(getattr(self._client, 'response', None), self._account)
+        return result
+
+    def _coalesced(self, name, method, args, kwargs):
+        """Share one exchange call between identical dashboard calls made concurrently"""
+        key = (name, args, tuple(sorted(kwargs.items())))
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._limiter.count('coalesced')
+        if not owner:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self._invoke(name, method, args, kwargs, PRIORITY_DASHBOARD)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+class AsyncLimitedClient:
+    """
+    LimitedClient for python-binance's AsyncClient: every public coroutine method is
+    charged to the (shared) RateLimiter, and identical dashboard calls awaited
+    concurrently share one request.
+    """
+
+    def __init__(self, client, limiter, account='main'):
+        self._client = client
+        self._limiter = limiter
+        self._account = account
+        self._flights = {}
+
+    @property
+    def wrapped(self):
+        return self._client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        return lambda *args, **kwargs: self._call(name, attr, args, kwargs)
+
+    async def _call(self, name, method, args, kwargs):
+        is_order = name in ORDER_METHODS
+        level = PRIORITY_ORDER if is_order else self._limiter.current_priority(PRIORITY_TRADE)
+        if level == PRIORITY_DASHBOARD:
+            return await self._coalesced(name, method, args, kwargs)
+        return await self._invoke(name, method, args, kwargs, level, is_order)
+
+    async def _invoke(self, name, method, args, kwargs, level, is_order=False):
+        await self._limiter.acquire_async(_weight(name, kwargs), level, orders=1 if is_order else 0,
+                                          account=self._account)
+        start = time.perf_counter()
+        try:
+            result = await method(*args, **kwargs)
+        except Exception as e:
+            BINANCE_REQUEST_SECONDS.labels(name).observe(time.perf_counter() - start)
+            BINANCE_ERRORS.labels(name).inc()
+            response = getattr(e, 'response', None)
+            if getattr(e, 'status_code', None) in BACKOFF_STATUSES:
+                self._limiter.backoff(response, e.status_code)
+            self._limiter.observe(response, self._account)
+            raise
+        BINANCE_REQUEST_SECONDS.labels(name).observe(time.perf_counter() - start)
+        self._limiter.observe(getattr(self._client, 'response', None), self._account)
+        return result
+
+    async def _coalesced(self, name, method, args, kwargs):
+        """Share one exchange call between identical dashboard calls awaited concurrently"""
+        key = (name, args, tuple(sorted(kwargs.items())))
+        flight = self._flights.get(key)
+        if flight is not None:
+            self._limiter.count('coalesced')
+            return await asyncio.shield(flight)
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await self._invoke(name, method, args, kwargs, PRIORITY_DASHBOARD)
+            flight.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # Retrieved here so an unawaited flight doesn't log "exception never retrieved"
+            flight.exception()
+            raise
+        finally:
+            self._flights.pop(key, None)
@@ -0,0 +1,281 @@
+"""
+Fill Reconciler - Background check of the trade journal against Binance
+Instead of verifying orders one at a time (verify_trade.py), the reconciler
+pages allOrders/myTrades per symbol from high-water marks kept in the journal's
+meta table, so each pass only downloads what is new. Orders are matched against
+the journal in bulk, their real execution price, quantity and commission are
+stored in the fills table (and shown by /history as exec_price), and problems
+are flagged:
+
+    mismatch     - the journal and the exchange disagree on side or quantity
+    unjournaled  - the exchange has an order the journal doesn't know about
+    missing      - the journal has a successful order the exchange never returned
+
+A pass requests at most RECONCILE_MAX_PAGES pages per endpoint, account and
+symbol, at dashboard priority (shed first when the rate-limit budget is low),
+so the API weight it spends is bounded however long the history is; a large
+backlog is worked off over several passes.
+
+Usage:
+    python reconciler.py        - run one pass against the configured account and print the report
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+from rate_limiter import PRIORITY_DASHBOARD, RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+# Binance caps allOrders/myTrades pages at 1000 rows
+MAX_PAGE_LIMIT = 1000
+
+
+def aggregate_trades(trades):
+    """myTrades rows -> {order_id: {'qty', 'quote_qty', 'commission': {asset: amount}, 'count', 'side'}}"""
+    orders = {}
+    for trade in trades:
+        entry = orders.setdefault(trade['orderId'], {
+            'qty': 0.0, 'quote_qty': 0.0, 'commission': {}, 'count': 0,
+            'side': 'BUY' if trade.get('isBuyer') else 'SELL'
+        })
+        entry['qty'] += float(trade['qty'])
+        entry['quote_qty'] += float(trade['quoteQty'])
+        entry['count'] += 1
+        commission = float(trade.get('commission') or 0)
+        if commission:
+            asset = trade.get('commissionAsset')
+            entry['commission'][asset] = entry['commission'].get(asset, 0.0) + commission
+    return orders
+
+
+class FillReconciler:
+    """
+    Periodically reconciles the journal with each account's order and trade history.
+
+    `accounts()` returns [(name, client)] for the accounts to check; `symbols()`
+    optionally adds symbols beyond those already in the journal. With a
+    `limiter` the Binance calls run at PRIORITY_DASHBOARD.
+    """
+
+    def __init__(self, journal, accounts, symbols=None, limiter=None, interval=60.0,
+                 page_limit=MAX_PAGE_LIMIT, max_pages=5, tolerance=1e-8):
+        self.journal = journal
+        self.accounts = accounts
+        self.symbols = symbols
+        self.limiter = limiter
+        self.interval = interval
+        self.page_limit = min(page_limit, MAX_PAGE_LIMIT)
+        self.max_pages = max_pages
+        self.tolerance = tolerance
+        self.last_report = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Paging
+    # ------------------------------------------------------------------
+
+    def _page(self, method, from_param, id_field, start, symbol, report):
+        """Up to max_pages pages from `start`; returns (rows, next start, caught up)"""
+        rows = []
+        for _ in range(self.max_pages):
+            page = method(symbol=symbol, limit=self.page_limit, **{from_param: start})
+            report['requests'] += 1
+            rows.extend(page)
+            if page:
+                start = page[-1][id_field] + 1
+            if len(page) < self.page_limit:
+                return rows, start, True
+        return rows, start, False
+
+    # ------------------------------------------------------------------
+    # Matching
+    # ------------------------------------------------------------------
+
+    def _check(self, fill, trade):
+        """Compare a fill with its journaled trade; returns (check_status, note)"""
+        if fill['order_status'] is None:
+            return 'pending', 'trades seen before the order'
+        if trade is None:
+            return 'unjournaled', None
+        problems = []
+        side = str(trade.get('signal') or '').upper()
+        if side and side != fill['side']:
+            problems.append(f"side: journal {side}, exchange {fill['side']}")
+        try:
+            journal_qty = float(trade['quantity']) if trade.get('quantity') not in (None, '') else None
+        except ValueError:
+            journal_qty = None
+        if journal_qty is None or abs(journal_qty - fill['executed_qty']) > self.tolerance:
+            problems.append(f"quantity: journal {trade.get('quantity')}, exchange {fill['executed_qty']}")
+        return ('mismatch', '; '.join(problems)) if problems else ('matched', None)
+
+    def _merge(self, symbol, orders, trades, now):
+        """Merge newly paged orders and trades into fill rows (accumulating onto stored ones)"""
+        aggregates = aggregate_trades(trades)
+        order_ids = set(orders) | set(aggregates)
+        fills = self.journal.get_fills(symbol, order_ids)
+        for order_id in order_ids:
+            fill = fills.get(order_id)
+            if fill is None:
+                fill = fills[order_id] = {
+                    'symbol': symbol, 'order_id': order_id, 'side': None, 'order_status': None,
+                    'executed_qty': 0.0, 'quote_qty': 0.0, 'commission': '{}', 'trade_count': 0, 'order_time': None
+                }
+            aggregate = aggregates.get(order_id)
+            if aggregate:
+                commission = json.loads(fill['commission'] or '{}')
+                for asset, amount in aggregate['commission'].items():
+                    commission[asset] = commission.get(asset, 0.0) + amount
+                fill['commission'] = json.dumps(commission)
+                fill['trade_count'] = (fill['trade_count'] or 0) + aggregate['count']
+                fill['side'] = fill['side'] or aggregate['side']
+                if fill['order_status'] is None:
+                    # Until the order itself is seen, the quantities come from the trades
+                    fill['executed_qty'] += aggregate['qty']
+                    fill['quote_qty'] += aggregate['quote_qty']
+            order = orders.get(order_id)
+            if order:
+                fill['side'] = order['side']
+                fill['order_status'] = order['status']
+                fill['order_time'] = order.get('time')
+                fill['executed_qty'] = float(order['executedQty'])
+                fill['quote_qty'] = float(order['cummulativeQuoteQty'])
+            fill['avg_price'] = fill['quote_qty'] / fill['executed_qty'] if fill['executed_qty'] else None
+            fill['updated_at'] = now
+        return fills
+
+    # ------------------------------------------------------------------
+    # Passes
+    # ------------------------------------------------------------------
+
+    def run_once(self):
+        """One reconciliation pass over every account and symbol; returns the report"""
+        with self._lock:
+            start = time.perf_counter()
+            report = {'requests': 0, 'orders': 0, 'trades': 0, 'caught_up': True, 'errors': [],
+                      'matched': 0, 'mismatch': 0, 'unjournaled': 0, 'missing': 0, 'pending': 0}
+            symbols = set(self.journal.order_symbols()) | set(self.symbols() if self.symbols else [])
+            accounts = [(name, client) for name, client in self.accounts() if client]
+            for symbol in sorted(symbols):
+                # The exchange has returned every order below this id on every account that has
+                # traded the symbol (an account with no orders on it has nothing to page past)
+                order_floor = None
+                for name, client in accounts:
+                    try:
+                        next_order = self._reconcile(name, client, symbol, report)
+                    except RateLimitExceeded as e:
+                        report['errors'].append(f"{name} {symbol}: {e}")
+                        report['caught_up'] = False
+                        next_order = None
+                    except Exception as e:
+                        logger.warning(f"Fill reconciliation failed for {symbol} ({name}): {e}")
+                        report['errors'].append(f"{name} {symbol}: {e}")
+                        next_order = None
+                    if next_order is None:
+                        order_floor = 0
+                    elif next_order == 0:
+                        continue
+                    elif order_floor is None or next_order < order_floor:
+                        order_floor = next_order
+                if order_floor:
+                    self._flag_missing(symbol, order_floor, report)
+            report['seconds'] = round(time.perf_counter() - start, 3)
+            report['finished_at'] = datetime.now().isoformat()
+            self.last_report = report
+            return report
+
+    def _reconcile(self, name, client, symbol, report):
+        """Page one account's new orders/trades for a symbol and store the fills; returns the next order id"""
+        key = f"reconcile:{name}:{symbol}"
+        order_from = int(self.journal.get_meta(f"{key}:order") or 0)
+        trade_from = int(self.journal.get_meta(f"{key}:trade") or 0)
+        priority = self.limiter.priority(PRIORITY_DASHBOARD) if self.limiter else nullcontext()
+        with priority:
+            orders, order_next, orders_done = self._page(client.get_all_orders, 'orderId', 'orderId',
+                                                         order_from, symbol, report)
+            trades, trade_next, trades_done = self._page(client.get_my_trades, 'fromId', 'id',
+                                                         trade_from, symbol, report)
+        report['orders'] += len(orders)
+        report['trades'] += len(trades)
+        report['caught_up'] = report['caught_up'] and orders_done and trades_done
+
+        now = datetime.now().isoformat()
+        fills = self._merge(symbol, {o['orderId']: o for o in orders}, trades, now)
+        journaled = self.journal.trades_for_orders(symbol, fills)
+        for order_id, fill in fills.items():
+            fill['check_status'], fill['note'] = self._check(fill, journaled.get(order_id))
+            report[fill['check_status']] += 1
+            if fill['check_status'] in ('mismatch', 'unjournaled'):
+                logger.warning("Fill check %s for %s order %s: %s", fill['check_status'], symbol, order_id,
+                               fill['note'] or 'not in the journal')
+        self.journal.save_fills(list(fills.values()), {f"{key}:order": order_next, f"{key}:trade": trade_next})
+        return order_next
+
+    def _flag_missing(self, symbol, below_order_id, report):
+        """Journaled successful orders the exchange has paged past without returning"""
+        now = datetime.now().isoformat()
+        missing = [{
+            'symbol': symbol, 'order_id': trade['order_id'], 'side': str(trade.get('signal') or '').upper(),
+            'check_status': 'missing', 'note': 'order not returned by allOrders', 'updated_at': now
+        } for trade in self.journal.unreconciled_orders(symbol, below_order_id)]
+        if missing:
+            for fill in missing:
+                logger.warning("Fill check missing for %s order %s", symbol, fill['order_id'])
+            self.journal.save_fills(missing)
+            report['missing'] += len(missing)
+
+    # ------------------------------------------------------------------
+    # Background thread
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Run a pass every `interval` seconds in a daemon thread (idempotent)"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="fill-reconciler", daemon=True)
+        self._thread.start()
+        logger.info(f"Fill reconciler started (every {self.interval}s, up to {self.max_pages} pages per symbol)")
+
+    def _run(self):
+        while True:
+            try:
+                report = self.run_once()
+                if report['orders'] or report['trades'] or report['missing']:
+                    logger.info("Fill reconciliation: %s orders, %s trades, %s requests, %s mismatch, "
+                                "%s unjournaled, %s missing", report['orders'], report['trades'],
+                                report['requests'], report['mismatch'], report['unjournaled'], report['missing'])
+            except Exception as e:
+                logger.error(f"Fill reconciliation pass failed: {e}")
+            time.sleep(self.interval)
+
+    def stats(self):
+        """Last pass report plus fill counts per check status (for /health)"""
+        return {'last_pass': self.last_report, 'fills': self.journal.fill_summary()}
+
+
+if __name__ == '__main__':
+    import webhook_server as ws
+
+    ws.init_trade_history()
+    ws.init_routing()
+    report = ws.fill_reconciler.run_once()
+    print("=" * 80)
+    print("FILL RECONCILIATION")
+    print("=" * 80)
+    print(f"{report['requests']} requests, {report['orders']} orders, {report['trades']} trades "
+          f"in {report['seconds']}s ({'caught up' if report['caught_up'] else 'more to page next pass'})")
+    print(f"✅ matched {report['matched']}   ⚠️  mismatch {report['mismatch']}   "
+          f"⚠️  unjournaled {report['unjournaled']}   ❌ missing {report['missing']}   pending {report['pending']}")
+    for error in report['errors']:
+        print(f"❌ {error}")
+    flagged = ws.trade_journal.flagged_fills(limit=20)
+    if flagged:
+        print("-" * 80)
+        for fill in flagged:
+            print(f"{fill['check_status']:<12} {fill['symbol']:<10} order {fill['order_id']:<10} {fill['note'] or ''}")
@@ -0,0 +1,351 @@
+"""
+Replay / Backtest Engine
+Feeds recorded alerts, or signals generated from local OHLCV candles, through
+the bot's own parse -> route/size -> execute path (signal_parser.parse_payload
+and trading_core.process_signal, as run by webhook_server.py) against an
+in-process simulated exchange. Nothing touches the network or the server's
+log file. Runs as fast as the CPU allows and reports fills, PnL and per-stage timings.
+
+Usage:
+    python replay.py --alerts alerts.jsonl                 - Replay a recorded alert log
+    python replay.py --alerts trading_bot.log              - Replay the alerts the server logged
+    python replay.py --ohlcv BTCUSDT-1m.csv                - Backtest on candles (CSV or Parquet)
+    python replay.py --ohlcv store:BTCUSDT/1m              - Backtest on the local candle store
+    python replay.py --ohlcv BTCUSDT-1m.csv --json out.json --quantity 0.01
+
+Alert logs are JSON lines: either the alert object itself ({"signal": ...}) or
+{"content_type": ..., "body": ...} for raw payloads. Server logs work too: the
+"alert" field of JSON log records, or text lines of the form
+"Received webhook (json): {...}".
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+# Replays keep their trades out of the real journal
+os.environ.setdefault('TRADE_JOURNAL_FILE', os.path.join(tempfile.mkdtemp(), 'replay_journal.db'))
+
+import trading_core
+from candles import load_ohlcv, to_millis
+from routing import Router
+from signal_parser import parse_payload
+from strategy import StrategyParams, generate_signals, signal_list
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+def load_alerts(path):
+    """Recorded alerts as (content_type, body) pairs, in file order"""
+    alerts = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if 'Received webhook (' in line and not line.startswith('{'):
+                line = line.split('): ', 1)[1] if '): ' in line else ''
+            if not line.startswith('{'):
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if 'level' in record and 'msg' in record:
+                # JSON log line: only webhook receipts carry the parsed alert
+                if 'alert' not in record:
+                    continue
+                record = record['alert']
+            if 'body' in record and 'signal' not in record:
+                alerts.append((record.get('content_type', 'text/plain'), record['body']))
+            else:
+                alerts.append(('application/json', json.dumps(record)))
+    return alerts
+
+# ============================================================================
+# SIMULATED EXCHANGE
+# ============================================================================
+
+class FillModel:
+    """Market orders fill in full at the last price moved against us by `slippage_bps`"""
+
+    def __init__(self, slippage_bps=5.0, fee_rate=0.001):
+        self.slippage_bps = slippage_bps
+        self.fee_rate = fee_rate
+
+    def fill_price(self, side, price):
+        slip = price * self.slippage_bps / 10000
+        return price + slip if side == 'BUY' else price - slip
+
+
+class SimClient:
+    """
+    In-process stand-in for binance.Client used by replays: balances live in a
+    dict, prices are set by the replay clock, orders fill through a FillModel.
+    Commission is charged in the received asset, as on Binance.
+    """
+
+    def __init__(self, balances, fill_model):
+        self.balances = dict(balances)
+        self.fill_model = fill_model
+        self.prices = {}
+        self.clock = 0
+        self.fills = []
+        self.order_ns = 0
+
+    def set_price(self, symbol, price, when):
+        self.prices[symbol] = price
+        self.clock = when
+
+    def ping(self):
+        return {}
+
+    def get_account(self):
+        return {'balances': [{'asset': a, 'free': repr(v), 'locked': '0'} for a, v in self.balances.items()]}
+
+    def get_symbol_ticker(self, symbol):
+        return {'symbol': symbol, 'price': repr(self.prices[symbol])}
+
+    def create_order(self, symbol, side, type, quantity, **params):
+        start = time.perf_counter_ns()
+        base, quote = trading_core.exchange_info.assets(symbol)
+        quantity = float(quantity)
+        price = self.fill_model.fill_price(side, self.prices[symbol])
+        notional = quantity * price
+        if side == 'BUY':
+            if self.balances.get(quote, 0.0) < notional:
+                raise Exception(f"Account has insufficient balance for requested action ({quote})")
+            commission, commission_asset = quantity * self.fill_model.fee_rate, base
+            self.balances[quote] = self.balances.get(quote, 0.0) - notional
+            self.balances[base] = self.balances.get(base, 0.0) + quantity - commission
+        else:
+            if self.balances.get(base, 0.0) < quantity:
+                raise Exception(f"Account has insufficient balance for requested action ({base})")
+            commission, commission_asset = notional * self.fill_model.fee_rate, quote
+            self.balances[base] = self.balances.get(base, 0.0) - quantity
+            self.balances[quote] = self.balances.get(quote, 0.0) + notional - commission
+        order = {
+            'orderId': len(self.fills) + 1,
+            'symbol': symbol,
+            'side': side,
+            'type': type,
+            'status': 'FILLED',
+            'transactTime': self.clock,
+            'executedQty': repr(quantity),
+            'cummulativeQuoteQty': repr(notional),
+            'fills': [{'price': repr(price), 'qty': repr(quantity),
+                       'commission': repr(commission), 'commissionAsset': commission_asset}],
+        }
+        self.fills.append(order)
+        self.order_ns += time.perf_counter_ns() - start
+        return order
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def stage_summary(samples_ns):
+    if not samples_ns:
+        return None
+    return {
+        'count': len(samples_ns),
+        'mean_us': round(sum(samples_ns) / len(samples_ns) / 1000, 2),
+        'p50_us': round(percentile(samples_ns, 0.50) / 1000, 2),
+        'p99_us': round(percentile(samples_ns, 0.99) / 1000, 2),
+    }
+
+
+class Replay:
+    """Drives (content_type, body, price, time) events through the bot's execution path"""
+
+    def __init__(self, symbol, balances=None, fill_model=None, quantity=None):
+        self.symbol = symbol.upper()
+        self.sim = SimClient(balances or {'USDT': 10000.0}, fill_model or FillModel())
+        self.start_balances = dict(self.sim.balances)
+        if quantity:
+            trading_core.TRADE_AMOUNT = quantity
+        # One account on the simulated client; its order queue is never started
+        account = trading_core.build_account('main', self.sim, self.process, fetch=self.sim.get_account)
+        self.router = Router({'main': account}, [], 'main')
+        self.parse_ns, self.process_ns = [], []
+        self.results = {'success': 0, 'error': 0, 'unparsed': 0}
+        self.equity = []
+        self.last_price = None
+        self.first_time = self.last_time = None
+
+    def mark(self, symbol, price, when):
+        """Advance the replay clock and the simulated market to `price`"""
+        self.sim.set_price(symbol, price, when)
+        trading_core.price_book.update(symbol, price)
+        self.last_price = price
+        if self.first_time is None:
+            self.first_time = when
+        self.last_time = when
+
+    def feed(self, content_type, body):
+        """One alert through parse -> process_signal"""
+        start = time.perf_counter_ns()
+        parsed = parse_payload(content_type, body, default_symbol=self.symbol)
+        parsed_at = time.perf_counter_ns()
+        self.parse_ns.append(parsed_at - start)
+        if parsed is None:
+            self.results['unparsed'] += 1
+            return None
+        data = parsed.to_dict()
+        if data.get('price') and data['symbol'] not in self.sim.prices:
+            self.mark(data['symbol'], float(data['price']), to_millis(data.get('time', 0) or 0))
+        response, status = self.process(data)
+        self.process_ns.append(time.perf_counter_ns() - parsed_at)
+        self.results['success' if status == 200 else 'error'] += 1
+        return response
+
+    def process(self, data):
+        return trading_core.process_signal(data, self.router)
+
+    def record_equity(self):
+        base, quote = trading_core.exchange_info.assets(self.symbol)
+        value = self.sim.balances.get(quote, 0.0) + self.sim.balances.get(base, 0.0) * (self.last_price or 0.0)
+        self.equity.append(value)
+
+    def run_alerts(self, alerts):
+        for content_type, body in alerts:
+            try:
+                record = json.loads(body) if 'json' in content_type else {}
+            except ValueError:
+                record = {}
+            price = float(record.get('price') or 0)
+            if price > 0:
+                self.mark(record.get('symbol', self.symbol).upper(), price, to_millis(record.get('time') or 0))
+            self.feed(content_type, body)
+            self.record_equity()
+
+    def run_candles(self, candles, signals):
+        """Signals are (candle index, 'buy'|'sell'); each fires at its candle's close like a Pine alert"""
+        by_index = dict(signals)
+        for i, candle in enumerate(candles):
+            self.mark(self.symbol, candle['close'], candle['time'])
+            signal = by_index.get(i)
+            if signal:
+                body = json.dumps({'signal': signal, 'symbol': self.symbol, 'price': candle['close'], 'time': str(candle['time'])})
+                self.feed('application/json', body)
+            self.record_equity()
+
+    def report(self, wall_seconds):
+        base, quote = trading_core.exchange_info.assets(self.symbol)
+        price = self.last_price or 0.0
+        start_equity = self.start_balances.get(quote, 0.0) + self.start_balances.get(base, 0.0) * price
+        end_equity = self.equity[-1] if self.equity else start_equity
+        peak, max_drawdown = 0.0, 0.0
+        for value in self.equity:
+            peak = max(peak, value)
+            if peak > 0:
+                max_drawdown = max(max_drawdown, (peak - value) / peak)
+        fees = sum(
+            float(f['commission']) * (float(f['price']) if f['commissionAsset'] == base else 1.0)
+            for order in self.sim.fills for f in order['fills']
+        )
+        events = len(self.process_ns)
+        fill_count = len(self.sim.fills)
+        span = ((self.last_time or 0) - (self.first_time or 0)) / 1000
+        return {
+            'symbol': self.symbol,
+            'alerts': events + self.results['unparsed'],
+            'results': self.results,
+            'fills': fill_count,
+            'start_equity': round(start_equity, 2),
+            'end_equity': round(end_equity, 2),
+            'pnl': round(end_equity - start_equity, 2),
+            'return_pct': round((end_equity / start_equity - 1) * 100, 3) if start_equity else None,
+            'max_drawdown_pct': round(max_drawdown * 100, 3),
+            'fees': round(fees, 4),
+            'final_balances': {a: round(v, 8) for a, v in self.sim.balances.items() if v},
+            'wall_seconds': round(wall_seconds, 3),
+            'speedup_vs_realtime': round(span / wall_seconds, 1) if wall_seconds and span else None,
+            'stages': {
+                'parse': stage_summary(self.parse_ns),
+                'process_signal': stage_summary(self.process_ns),
+                'exchange_fill': {'count': fill_count, 'mean_us': round(self.sim.order_ns / fill_count / 1000, 2)} if fill_count else None,
+            },
+        }
+
+
+def run(symbol, alerts_path=None, ohlcv_path=None, balances=None, fill_model=None, quantity=None,
+        params=None, rules='full'):
+    """Run one replay and return its report (candle signals come from strategy.py)"""
+    trading_core.trade_journal.start()
+    replay = Replay(symbol, balances, fill_model, quantity)
+    start = time.perf_counter()
+    if ohlcv_path:
+        candles = load_ohlcv(ohlcv_path)
+        buy, sell = generate_signals([c['close'] for c in candles], params, rules)
+        replay.run_candles(candles, signal_list(buy, sell))
+    if alerts_path:
+        replay.run_alerts(load_alerts(alerts_path))
+    wall = time.perf_counter() - start
+    trading_core.trade_journal.flush()
+    return replay.report(wall)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay alerts or backtest OHLCV candles through the bot')
+    parser.add_argument('--alerts', help='recorded alert log (JSON lines or trading_bot.log)')
+    parser.add_argument('--ohlcv', help='candles as CSV, Parquet or store:SYMBOL/INTERVAL (see candles.py)')
+    parser.add_argument('--symbol', default=trading_core.TRADING_PAIR)
+    parser.add_argument('--quantity', type=float, help='order size in base currency (default TRADE_AMOUNT)')
+    parser.add_argument('--balance', type=float, default=10000.0, help='starting quote balance')
+    parser.add_argument('--slippage-bps', type=float, default=5.0)
+    parser.add_argument('--fee', type=float, default=0.001, help='commission rate per fill')
+    parser.add_argument('--rules', default='full', choices=['full', 'simple'],
+                        help='candle signals from trading_strategy.pine (full) or trading_strategy_simple.pine (simple)')
+    parser.add_argument('--fast', type=int, default=12, help='fast EMA length for candle signals')
+    parser.add_argument('--slow', type=int, default=26, help='slow EMA length for candle signals')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+    if not args.alerts and not args.ohlcv:
+        parser.error('give --alerts and/or --ohlcv')
+
+    # Per-trade INFO logs would dominate the runtime, and failed trades are counted in the
+    # report: keep the rest off stderr (nothing is written to the server's log file)
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger().addHandler(logging.NullHandler())
+
+    base, quote = trading_core.exchange_info.assets(args.symbol)
+    result = run(
+        args.symbol,
+        alerts_path=args.alerts,
+        ohlcv_path=args.ohlcv,
+        balances={quote: args.balance},
+        fill_model=FillModel(args.slippage_bps, args.fee),
+        quantity=args.quantity,
+        params=StrategyParams(ema_fast=args.fast, ema_slow=args.slow),
+        rules=args.rules
+    )
+
+    print("=" * 80)
+    print(f"REPLAY: {result['symbol']} - {result['alerts']} alerts, {result['fills']} fills in {result['wall_seconds']}s")
+    print("=" * 80)
+    print(f"Equity:   {result['start_equity']} -> {result['end_equity']} {quote}  (PnL {result['pnl']}, {result['return_pct']}%)")
+    print(f"Drawdown: {result['max_drawdown_pct']}%   Fees: {result['fees']} {quote}")
+    print(f"Results:  {result['results']}")
+    if result['speedup_vs_realtime']:
+        print(f"Speed:    {result['speedup_vs_realtime']}x real time")
+    print("-" * 80)
+    print(f"{'Stage':<16} {'count':>8} {'mean us':>10} {'p50 us':>10} {'p99 us':>10}")
+    for name, stage in result['stages'].items():
+        if stage:
+            print(f"{name:<16} {stage['count']:>8} {stage['mean_us']:>10} {stage.get('p50_us', ''):>10} {stage.get('p99_us', ''):>10}")
+    print("-" * 80)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Report written to {args.json}")
+    print(json.dumps(result))
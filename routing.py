@@ -0,0 +1,158 @@
+"""
+Routing - Maps incoming alerts to an account and per-symbol sizing rules
+Lets one server trade many pairs across several Binance (sub-)accounts,
+configured from a JSON file loaded at startup (see routes.example.json)
+"""
+
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+WILDCARD = '*'
+
+
+class Account:
+    """A Binance account: its client, balance cache, its own order worker lanes and its config entry"""
+
+    def __init__(self, name, client, balance_cache, order_queue=None, settings=None):
+        self.name = name
+        self.client = client
+        self.balance_cache = balance_cache
+        self.order_queue = order_queue
+        self.settings = settings or {}
+
+
+class Route:
+    """
+    One routing rule. symbol/strategy/account_tag may be '*' to match anything.
+
+    Sizing (in order of precedence):
+        alert quantity      - when use_alert_quantity is true and the alert has one
+        quote_amount        - spend this much quote currency (quantity = quote_amount / price)
+        quantity            - fixed base-currency quantity
+    max_quantity caps whatever was chosen.
+    """
+
+    def __init__(self, account, symbol=WILDCARD, strategy=WILDCARD, account_tag=WILDCARD, quantity=None,
+                 quote_amount=None, max_quantity=None, use_alert_quantity=True):
+        self.account = account
+        self.symbol = symbol.upper() if symbol != WILDCARD else WILDCARD
+        self.strategy = strategy
+        self.account_tag = account_tag
+        self.quantity = quantity
+        self.quote_amount = quote_amount
+        self.max_quantity = max_quantity
+        self.use_alert_quantity = use_alert_quantity
+
+    def matches(self, symbol, strategy, account_tag):
+        return (self.symbol in (WILDCARD, symbol)
+                and self.strategy in (WILDCARD, strategy)
+                and self.account_tag in (WILDCARD, account_tag))
+
+    def specificity(self):
+        """More exact fields win when several routes match"""
+        return sum(field != WILDCARD for field in (self.symbol, self.strategy, self.account_tag))
+
+    def size(self, alert_quantity, price, default_quantity, netted=False):
+        """
+        Order quantity for an alert on this route. `netted` marks a quantity the
+        coalescing window already sized and netted: it is used as is, but still capped
+        """
+        if netted:
+            quantity = float(alert_quantity)
+        elif alert_quantity and self.use_alert_quantity:
+            quantity = float(alert_quantity)
+        elif self.quote_amount and price and price > 0:
+            quantity = self.quote_amount / price
+        elif self.quantity:
+            quantity = self.quantity
+        else:
+            quantity = default_quantity
+        if self.max_quantity:
+            quantity = min(quantity, self.max_quantity)
+        return quantity
+
+
+class Router:
+    """Resolves (symbol, strategy id, account tag) to an Account and a Route"""
+
+    def __init__(self, accounts, routes, default_account):
+        self.accounts = accounts
+        self.routes = sorted(routes, key=lambda r: r.specificity(), reverse=True)
+        self.default_account = default_account
+        # An alert's account tag must name an account or a tag a route matches on
+        self.account_tags = set(accounts) | {r.account_tag for r in routes if r.account_tag != WILDCARD}
+
+    def resolve(self, symbol, strategy=None, account_tag=None):
+        """
+        Return (account, route) for an alert. Raises ValueError for an unknown
+        account tag, before any route is matched, so a mistyped tag can't fall
+        through to a wildcard route.
+
+        The most specific matching route wins. If that route doesn't pin an
+        account tag and the alert's tag names a configured account, the order
+        goes to that account with the route's sizing.
+        """
+        symbol = (symbol or '').upper()
+        strategy = strategy or WILDCARD
+        account_tag = account_tag or WILDCARD
+        if account_tag != WILDCARD and account_tag not in self.account_tags:
+            raise ValueError(f"Unknown account: {account_tag}")
+        for route in self.routes:
+            if route.matches(symbol, strategy, account_tag):
+                name = route.account
+                if route.account_tag == WILDCARD and account_tag in self.accounts:
+                    name = account_tag
+                return self.accounts[name], route
+        # No rule: an explicit account tag selects that account, otherwise the default
+        name = account_tag if account_tag in self.accounts else self.default_account
+        return self.accounts[name], Route(name)
+
+    def all_accounts(self):
+        return list(self.accounts.values())
+
+    def symbols(self):
+        """Symbols the routes name explicitly (wildcard routes match any)"""
+        return sorted({route.symbol for route in self.routes if route.symbol != WILDCARD})
+
+
+def load_routing_config(path, make_account, default_account):
+    """
+    Build a Router from a JSON config file.
+
+    make_account(name, settings) creates an Account for each entry under
+    "accounts"; default_account is the already-built account used when the
+    file doesn't name one (normally the server's own client).
+    """
+    with open(path, 'r') as f:
+        config = json.load(f)
+
+    accounts = {default_account.name: default_account}
+    for name, settings in config.get('accounts', {}).items():
+        if name == default_account.name:
+            continue
+        accounts[name] = make_account(name, settings)
+
+    routes = []
+    for rule in config.get('routes', []):
+        account = rule.get('account', default_account.name)
+        if account not in accounts:
+            raise ValueError(f"Route {rule} refers to unknown account '{account}'")
+        routes.append(Route(
+            account,
+            symbol=rule.get('symbol', WILDCARD),
+            strategy=rule.get('strategy', WILDCARD),
+            account_tag=rule.get('account_tag', WILDCARD),
+            quantity=rule.get('quantity'),
+            quote_amount=rule.get('quote_amount'),
+            max_quantity=rule.get('max_quantity'),
+            use_alert_quantity=rule.get('use_alert_quantity', True)
+        ))
+
+    default_name = config.get('default_account', default_account.name)
+    if default_name not in accounts:
+        raise ValueError(f"default_account '{default_name}' is not defined")
+    logger.info(f"Loaded routing config {os.path.basename(path)}: {len(accounts)} account(s), {len(routes)} route(s)")
+    return Router(accounts, routes, default_name)
@@ -0,0 +1,308 @@
+"""
+Signal Engine - In-process strategy signals from streamed candles
+Subscribes to the Binance kline stream, feeds every closed candle to a
+StreamingStrategy (by default the trading_strategy_simple.pine rules: EMA
+crossover OR RSI cross, with its same-bar tie-breaking) and hands buy/sell
+signals to the same alert path /webhook uses (de-duplication, coalescing,
+routing, queue or direct execution). This removes the TradingView -> ngrok ->
+webhook hop from the trade path.
+
+Indicators are warmed up from recent REST klines at start, bars missed while
+the stream was down are back-filled, and each signal carries an alert_id
+(symbol, interval, bar open time) so a replayed bar can't trade twice.
+Decision-to-order latency (signal computed -> order acknowledged, or queued
+in queued mode) is recorded on /metrics and summarised on /health.
+
+Usage:
+    python signal_engine.py candles.csv [full|simple]   - feed candles through the engine against an
+                                                          in-process exchange simulator and report latency
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from websockets.sync.client import connect
+
+import metrics
+from candles import INTERVAL_MS
+from strategy import StrategyParams, StreamingStrategy
+
+logger = logging.getLogger(__name__)
+
+DECISION_TO_ORDER_SECONDS = metrics.histogram(
+    'signal_engine_decision_to_order_seconds', 'Time from an engine signal to the order being acknowledged (or queued)')
+STREAM_DELAY_SECONDS = metrics.histogram(
+    'signal_engine_stream_delay_seconds', 'Time from a candle closing on the exchange to the engine receiving it')
+ENGINE_SIGNALS_TOTAL = metrics.counter(
+    'signal_engine_signals_total', 'Signals generated by the engine, by symbol and signal', ['symbol', 'signal'])
+
+# Recent latency samples kept for the /health summary
+LATENCY_WINDOW = 1000
+
+
+def parse_kline_message(message):
+    """
+    Extract a closed candle from a kline stream frame (raw or combined stream).
+    Returns (symbol, open_time_ms, close, close_time_ms) or None while the bar is still open.
+    """
+    payload = json.loads(message)
+    data = payload.get('data', payload)
+    kline = data.get('k')
+    if not kline or not kline.get('x'):
+        return None
+    return data.get('s') or kline['s'], int(kline['t']), float(kline['c']), int(kline['T'])
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+
+class SignalEngine:
+    """
+    Runs one StreamingStrategy per symbol on closed candles and submits its signals.
+
+    dispatch(alert)      - the alert path (webhook_server.handle_alert); returns (response, http_status)
+    fetch_klines(**kw)   - Binance get_klines, used for warm-up and gap back-fill (optional)
+    synchronous          - submit signals on the calling thread (offline runs) instead of the order pool
+    """
+
+    def __init__(self, symbols, dispatch, interval='1m', rules='simple', params=None, fetch_klines=None,
+                 warmup=500, url=None, strategy_id='engine', synchronous=False):
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"Unknown interval '{interval}' (expected one of {', '.join(INTERVAL_MS)})")
+        self.symbols = [s.upper() for s in symbols]
+        self.dispatch = dispatch
+        self.interval = interval
+        self.step = INTERVAL_MS[interval]
+        self.rules = rules
+        self.params = params or StrategyParams()
+        self.fetch_klines = fetch_klines
+        self.warmup = warmup
+        self.url = (url or '').rstrip('/')
+        self.strategy_id = strategy_id
+        self.synchronous = synchronous
+        self.strategies = {s: StreamingStrategy(self.params, rules) for s in self.symbols}
+        self.last_open = {}
+        self.connected = False
+        self.bars = 0
+        self.signals = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.last_signal = None
+        # Orders go out on their own threads so a slow order never delays the next candle
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.symbols)), thread_name_prefix='engine-order')
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Candles
+    # ------------------------------------------------------------------
+
+    def _klines(self, symbol, start_time=None, limit=1000):
+        """Closed candles from REST as (open_time, close, close_time)"""
+        params = {'symbol': symbol, 'interval': self.interval, 'limit': limit}
+        if start_time is not None:
+            params['startTime'] = start_time
+        now = time.time() * 1000
+        return [(int(k[0]), float(k[4]), int(k[6])) for k in self.fetch_klines(**params) if int(k[6]) < now]
+
+    def warm_up(self):
+        """Prime the indicators with recent closed candles (no orders are placed for them)"""
+        if not self.fetch_klines or not self.warmup:
+            return
+        for symbol in self.symbols:
+            try:
+                candles = self._klines(symbol, limit=min(self.warmup, 1000))
+            except Exception as e:
+                logger.warning(f"Signal engine warm-up failed for {symbol}, starting cold: {e}")
+                continue
+            for open_time, close, close_time in candles:
+                self.on_candle(symbol, open_time, close, close_time, trade=False)
+            logger.info(f"Signal engine warmed up {symbol} with {len(candles)} {self.interval} candles")
+
+    def _backfill(self, symbol, open_time):
+        """Feed bars missed between the last one seen and `open_time` (e.g. after a reconnect)"""
+        last = self.last_open.get(symbol)
+        if last is None or open_time <= last + self.step or not self.fetch_klines:
+            return
+        try:
+            missed = [c for c in self._klines(symbol, start_time=last + self.step) if c[0] < open_time]
+        except Exception as e:
+            logger.warning(f"Signal engine back-fill failed for {symbol}: {e}")
+            return
+        for candle in missed:
+            self.on_candle(symbol, *candle, trade=False)
+        if missed:
+            logger.info(f"Signal engine back-filled {len(missed)} missed {symbol} candles")
+
+    def on_candle(self, symbol, open_time, close, close_time=None, trade=True):
+        """
+        Process one closed candle. Bars at or before the last one seen are
+        ignored; a signal on a live bar is submitted. Returns 'buy', 'sell' or None.
+        """
+        strategy = self.strategies.get(symbol)
+        if strategy is None:
+            return None
+        last = self.last_open.get(symbol)
+        if last is not None and open_time <= last:
+            return None
+        if trade:
+            self._backfill(symbol, open_time)
+        buy, sell = strategy.update(close)
+        decided = time.perf_counter()
+        self.last_open[symbol] = open_time
+        self.bars += 1
+        signal = 'buy' if buy else 'sell' if sell else None
+        if signal and trade:
+            if self.synchronous:
+                self._submit(symbol, signal, open_time, close, decided)
+            else:
+                self._executor.submit(self._submit, symbol, signal, open_time, close, decided)
+        return signal
+
+    def _submit(self, symbol, signal, open_time, close, decided):
+        alert = {
+            'signal': signal,
+            'symbol': symbol,
+            'price': close,
+            'strategy': self.strategy_id,
+            'alert_id': f"{self.strategy_id}:{symbol}:{self.interval}:{open_time}",
+            'time': datetime.fromtimestamp(open_time / 1000, timezone.utc).isoformat(),
+            'source': 'engine',
+        }
+        try:
+            body, status = self.dispatch(alert)
+        except Exception as e:
+            body, status = {'error': str(e)}, 500
+        latency = time.perf_counter() - decided
+        DECISION_TO_ORDER_SECONDS.observe(latency)
+        ENGINE_SIGNALS_TOTAL.labels(symbol, signal).inc()
+        with self._lock:
+            self.signals += 1
+            self.latencies.append(latency)
+            self.last_signal = {'signal': signal, 'symbol': symbol, 'price': close, 'status': status,
+                                'result': body.get('status') or body.get('error'),
+                                'latency_ms': round(latency * 1000, 3), 'at': datetime.now().isoformat()}
+        logger.info("Engine %s %s @ %s -> %s (%s) in %.2f ms", signal, symbol, close, status,
+                    body.get('status') or body.get('error'), latency * 1000)
+
+    # ------------------------------------------------------------------
+    # Stream
+    # ------------------------------------------------------------------
+
+    def stream_url(self):
+        """Combined kline stream URL for all configured symbols"""
+        streams = '/'.join(f"{s.lower()}@kline_{self.interval}" for s in self.symbols)
+        return f"{self.url}/stream?streams={streams}"
+
+    def on_message(self, message):
+        candle = parse_kline_message(message)
+        if candle:
+            symbol, open_time, close, close_time = candle
+            STREAM_DELAY_SECONDS.observe(max(0.0, time.time() - (close_time + 1) / 1000))
+            self.on_candle(symbol, open_time, close, close_time)
+
+    def start(self):
+        """Warm up and start the stream thread (idempotent)"""
+        if self._thread or not self.symbols:
+            return
+        self._thread = threading.Thread(target=self._run, name="signal-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+        self._executor.shutdown(wait=True)
+
+    def _run(self):
+        self.warm_up()
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                with connect(self.stream_url(), open_timeout=10) as ws:
+                    self.connected = True
+                    backoff = 1
+                    logger.info(f"Signal engine connected: {', '.join(self.symbols)} {self.interval} ({self.rules} rules)")
+                    while not self._stop.is_set():
+                        try:
+                            message = ws.recv(timeout=1)
+                        except TimeoutError:
+                            continue
+                        self.on_message(message)
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning(f"Signal engine stream error: {e}. Reconnecting in {backoff}s")
+            self.connected = False
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def stats(self):
+        """Engine state and decision-to-order latency summary (for /health)"""
+        with self._lock:
+            samples = list(self.latencies)
+        return {
+            'symbols': self.symbols,
+            'interval': self.interval,
+            'rules': self.rules,
+            'connected': self.connected,
+            'bars': self.bars,
+            'signals': self.signals,
+            'decision_to_order_ms': {
+                'p50': round(percentile(samples, 0.5) * 1000, 3) if samples else None,
+                'p99': round(percentile(samples, 0.99) * 1000, 3) if samples else None,
+                'max': round(max(samples) * 1000, 3) if samples else None,
+            },
+            'last_signal': self.last_signal,
+        }
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+    import tempfile
+
+    from candles import load_ohlcv
+    from exchange_sim import SimExchange, start_in_thread
+
+    if len(sys.argv) < 2:
+        print("Usage: python signal_engine.py <candles.csv|.parquet|store:SYMBOL/INTERVAL> [full|simple]")
+        sys.exit(1)
+    rules = sys.argv[2] if len(sys.argv) > 2 else 'simple'
+    candles = load_ohlcv(sys.argv[1])
+
+    # Trade against an in-process simulator: point the server module at it before importing it
+    # Candles arrive back to back here, so the exchange and client order-rate limits are lifted
+    sim_url, _ = start_in_thread(SimExchange(min_notional=1, balances={'USDT': 1e9, 'BTC': 1e6, 'ETH': 1e6},
+                                             order_limit=10**9, weight_limit=10**9))
+    os.environ['BINANCE_SIMULATOR_URL'] = sim_url
+    os.environ['RATE_LIMIT_ORDERS_PER_10S'] = str(10**9)
+    os.environ['RATE_LIMIT_WEIGHT_PER_MINUTE'] = str(10**9)
+    os.environ['TRADE_JOURNAL_FILE'] = os.path.join(tempfile.mkdtemp(prefix='engine-'), 'journal.db')
+    os.environ['POSITIONS_FILE'] = ''
+    os.environ.setdefault('LOG_CONSOLE', 'false')
+    import webhook_server as ws
+
+    ws.init_routing()
+    symbol = ws.TRADING_PAIR
+    engine = SignalEngine([symbol], ws.handle_alert, rules=rules, synchronous=True)
+    start = time.perf_counter()
+    for candle in candles:
+        engine.on_candle(symbol, candle['time'], candle['close'])
+    wall = time.perf_counter() - start
+    stats = engine.stats()
+
+    print("=" * 80)
+    print(f"SIGNAL ENGINE ({rules} rules): {len(candles)} candles, {stats['signals']} signals")
+    print("=" * 80)
+    print(f"{wall:.2f}s total, {wall / max(len(candles), 1) * 1e6:.1f} us per candle")
+    print(f"decision -> order: p50 {stats['decision_to_order_ms']['p50']} ms, "
+          f"p99 {stats['decision_to_order_ms']['p99']} ms, max {stats['decision_to_order_ms']['max']} ms")
+    print(json.dumps(stats))
@@ -0,0 +1,310 @@
+"""
+Signal Parser - Single-pass webhook payload parser
+Turns a TradingView webhook body into a TradeSignal. Each payload format is
+registered with the Content-Types it is sent as, the first characters its body
+can start with and a cheap sniff test; a request is dispatched with one dict
+lookup on its Content-Type (or on the first byte of a text/plain body) instead
+of trying every format in turn. Parse time per detected format is exported on
+/metrics as webhook_payload_parse_seconds (its _count is the hits per format).
+
+Registered formats:
+    json      {"signal": "buy", "symbol": "BTCUSDT", "price": 90104.49}
+    form      signal=buy&symbol=BTCUSDT&price=90104.49&quantity=0.001
+    pipe      buy|BTCUSDT|90104.49[|0.001]
+    template  order buy @ 0.001 filled on BTCUSDT
+
+Query-string parameters (?signal=buy&symbol=BTCUSDT) are not a body format;
+they are used when the body has nothing usable.
+"""
+
+import json
+import re
+import string
+import time
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl
+
+import metrics
+
+# TradingView template message: "order buy @ 0.001 filled on BTCUSDT"
+# ("order {{strategy.order.action}} @ {{strategy.order.contracts}} filled on {{ticker}}")
+SIGNAL_PATTERN = re.compile(r'order\s+(buy|sell)', re.IGNORECASE)
+SYMBOL_PATTERN = re.compile(r'filled\s+on\s+(\w+)', re.IGNORECASE)
+QUANTITY_PATTERN = re.compile(r'@\s+([\d.]+)')
+
+
+# Signals the server executes
+SIGNALS = ('buy', 'sell')
+
+# Alert fields the server sets internally (the coalescing window's marker); never taken from a payload
+RESERVED_FIELDS = ('coalesced',)
+
+
+@dataclass(slots=True)
+class TradeSignal:
+    """A parsed alert. price 0 means "use the market price"."""
+    signal: str
+    symbol: str
+    price: float = 0.0
+    quantity: float = None
+    format: str = 'json'
+    extra: dict = field(default_factory=dict)
+
+    def to_dict(self):
+        """Dict form used by the execution path and the logs"""
+        data = dict(self.extra)
+        data.update({'signal': self.signal, 'symbol': self.symbol, 'price': self.price})
+        if self.quantity is not None:
+            data['quantity'] = self.quantity
+        return data
+
+
+def _to_float(value, default=0.0):
+    try:
+        return float(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        return default
+
+
+def signal_from_dict(data, default_symbol, fmt='json'):
+    """Build a TradeSignal from a JSON object (unknown keys are kept in extra, reserved ones dropped)"""
+    if not isinstance(data, dict) or not data:
+        return None
+    extra = {k: v for k, v in data.items()
+             if k not in ('signal', 'symbol', 'price', 'quantity') and k not in RESERVED_FIELDS}
+    quantity = data.get('quantity')
+    return TradeSignal(
+        signal=str(data.get('signal', '')).lower(),
+        symbol=str(data.get('symbol') or default_symbol).upper(),
+        price=_to_float(data.get('price')),
+        quantity=_to_float(quantity, None) if quantity is not None else None,
+        format=fmt,
+        extra=extra
+    )
+
+
+def parse_template_message(message, default_symbol=None):
+    """Parse the TradingView template text format. Returns None if it doesn't match"""
+    signal_match = SIGNAL_PATTERN.search(message)
+    if not signal_match:
+        return None
+    symbol_match = SYMBOL_PATTERN.search(message)
+    if not symbol_match:
+        return None
+    quantity_match = QUANTITY_PATTERN.search(message)
+    return TradeSignal(
+        signal=signal_match.group(1).lower(),
+        symbol=symbol_match.group(1).upper(),
+        price=0.0,  # Price is not in the message; it's looked up from the market
+        quantity=float(quantity_match.group(1)) if quantity_match else 0,
+        format='template'
+    )
+
+
+def parse_json(text, default_symbol, form=None):
+    """A JSON object body"""
+    try:
+        return signal_from_dict(json.loads(text), default_symbol, fmt='json')
+    except ValueError:
+        return None
+
+
+def parse_pipe(text, default_symbol, form=None):
+    """Pipe-delimited alert: signal|symbol|price with an optional |quantity (only buy/sell count as one)"""
+    fields = [part.strip() for part in text.strip().split('|')]
+    if len(fields) < 2 or fields[0].lower() not in SIGNALS:
+        return None
+    quantity = fields[3] if len(fields) > 3 else None
+    return TradeSignal(
+        signal=fields[0].lower(),
+        symbol=(fields[1] or default_symbol).upper(),
+        price=_to_float(fields[2] if len(fields) > 2 else None),
+        quantity=_to_float(quantity, None),
+        format='pipe'
+    )
+
+
+def parse_form(form, default_symbol):
+    """Form fields: explicit signal/symbol/price/quantity, or a message/text field holding another format"""
+    signal = (form.get('signal') or form.get('{{strategy.order.action}}') or '').lower()
+    if signal:
+        return TradeSignal(
+            signal=signal,
+            symbol=(form.get('symbol') or form.get('{{ticker}}') or default_symbol).upper(),
+            price=_to_float(form.get('price') or form.get('{{close}}')),
+            quantity=_to_float(form.get('quantity') or form.get('{{strategy.order.contracts}}'), None),
+            format='form'
+        )
+    message = form.get('message') or form.get('text')
+    if message:
+        return parse_text(message, default_symbol)
+    return None
+
+
+def parse_form_body(text, default_symbol, form=None):
+    """URL-encoded body, or the fields Werkzeug/aiohttp already decoded from a multipart body"""
+    return parse_form(form if form is not None else dict(parse_qsl(text)), default_symbol)
+
+
+def parse_template(text, default_symbol, form=None):
+    """TradingView template text anywhere in the body"""
+    return parse_template_message(text, default_symbol)
+
+
+def parse_query(args, default_symbol):
+    """Query-string parameters (?signal=buy&symbol=BTCUSDT&price=...&quantity=...)"""
+    signal = (args.get('signal') or '').lower()
+    if not signal:
+        return None
+    return TradeSignal(
+        signal=signal,
+        symbol=(args.get('symbol') or default_symbol).upper(),
+        price=_to_float(args.get('price')),
+        quantity=_to_float(args.get('quantity'), None),
+        format='query'
+    )
+
+
+def signal_error(signal, price):
+    """
+    Why a signal can't be executed, or None if it can. `price` is the price
+    after a 0 ("use the market price") was looked up, so it must be positive
+    """
+    if signal not in SIGNALS:
+        return f"Invalid signal: {signal}. Must be 'buy' or 'sell'"
+    if price is None or price < 0:
+        return f"Invalid price: {price}. Must be positive, or 0 for the market price"
+    if price == 0:
+        return "No price: the market price could not be fetched"
+    return None
+
+
+# ============================================================================
+# FORMAT REGISTRY
+# ============================================================================
+
+FORMAT_SECONDS = metrics.histogram('webhook_payload_parse_seconds', 'Time to parse a webhook payload, by format',
+                                   ['format'])
+
+
+@dataclass(slots=True)
+class PayloadFormat:
+    """
+    A registered payload format.
+
+    parse(text, default_symbol, form) returns a TradeSignal or None.
+    content_types - Content-Types (without parameters) that select this format directly
+    first_bytes   - first non-blank characters a text/plain body in this format can start with;
+                    None means any (tried after the formats claiming that character)
+    sniff(text)   - cheap check run before parse when the format was picked by first byte
+    """
+    name: str
+    parse: object
+    content_types: tuple = ()
+    first_bytes: str = None
+    sniff: object = None
+    seconds: object = None
+
+
+FORMATS = {}
+_by_content_type = {}
+_by_first_byte = {}
+_any_first_byte = ()
+
+# Multipart bodies are decoded by the web framework; sniffing the raw body is pointless
+_NO_SNIFF_FALLBACK = {'multipart/form-data'}
+
+
+def _rebuild_tables():
+    global _by_content_type, _by_first_byte, _any_first_byte
+    by_content_type, by_first_byte, anywhere = {}, {}, []
+    for fmt in FORMATS.values():
+        for content_type in fmt.content_types:
+            by_content_type[content_type] = fmt
+        if fmt.first_bytes is None:
+            anywhere.append(fmt)
+        else:
+            for char in fmt.first_bytes:
+                by_first_byte.setdefault(char, []).append(fmt)
+    _any_first_byte = tuple(anywhere)
+    _by_first_byte = {char: tuple(formats) + _any_first_byte for char, formats in by_first_byte.items()}
+    _by_content_type = by_content_type
+
+
+def register_format(name, parse, content_types=(), first_bytes='', sniff=None):
+    """Add (or replace) a payload format; formats sharing a first byte are tried in registration order"""
+    FORMATS[name] = PayloadFormat(
+        name=name, parse=parse, content_types=tuple(content_types), first_bytes=first_bytes, sniff=sniff,
+        seconds=FORMAT_SECONDS.labels(format=name)
+    )
+    _rebuild_tables()
+    return FORMATS[name]
+
+
+_LETTERS = string.ascii_letters
+
+register_format('json', parse_json, content_types=('application/json', 'text/json'), first_bytes='{')
+register_format('pipe', parse_pipe, first_bytes=_LETTERS, sniff=lambda text: '|' in text)
+register_format('form', parse_form_body,
+                content_types=('application/x-www-form-urlencoded', 'multipart/form-data'),
+                first_bytes=_LETTERS + '{', sniff=lambda text: '=' in text and ' ' not in text.strip())
+register_format('template', parse_template, first_bytes=None)
+
+# Query-string alerts come from the URL, not the body, so they are not a registered body format
+_QUERY_SECONDS = FORMAT_SECONDS.labels(format='query')
+_UNPARSED_SECONDS = FORMAT_SECONDS.labels(format='none')
+
+
+def _sniff(text, default_symbol, skip=None):
+    """Pick candidates by the first non-blank character and return the first format that parses"""
+    stripped = text.lstrip()
+    if not stripped:
+        return None
+    for fmt in _by_first_byte.get(stripped[0], _any_first_byte):
+        if fmt is skip or (fmt.sniff and not fmt.sniff(stripped)):
+            continue
+        parsed = fmt.parse(stripped, default_symbol)
+        if parsed is not None:
+            return parsed
+    return None
+
+
+def parse_text(text, default_symbol):
+    """Raw body text in any registered format, chosen by its first byte"""
+    return _sniff(text, default_symbol)
+
+
+def parse_payload(content_type, body, args=None, form=None, default_symbol='BTCUSDT'):
+    """
+    Parse a webhook request in one pass.
+
+    content_type - request Content-Type header ('' if missing)
+    body         - raw request body (bytes or str)
+    args         - query-string parameters (mapping), used as the last resort
+    form         - already-decoded form fields (mapping), only needed for multipart bodies
+
+    Returns a TradeSignal, or None if nothing usable was found.
+    """
+    start = time.perf_counter()
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    mime = (content_type or '').partition(';')[0].strip().lower()
+    declared = _by_content_type.get(mime)
+    parsed = None
+
+    if declared is not None:
+        parsed = declared.parse(body, default_symbol, form)
+    if parsed is None and body and mime not in _NO_SNIFF_FALLBACK:
+        parsed = _sniff(body, default_symbol, skip=declared)
+    if parsed is None and args:
+        parsed = parse_query(args, default_symbol)
+
+    elapsed = time.perf_counter() - start
+    if parsed is None:
+        series = _UNPARSED_SECONDS
+    elif parsed.format in FORMATS:
+        series = FORMATS[parsed.format].seconds
+    else:
+        series = _QUERY_SECONDS if parsed.format == 'query' else FORMAT_SECONDS.labels(format=parsed.format)
+    series.observe(elapsed)
+    return parsed
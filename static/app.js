@@ -3,11 +3,13 @@
 // ============================================================================
 
 const API_BASE_URL = window.location.origin; // Use same origin as frontend
-const AUTO_REFRESH_INTERVAL = 5000; // 5 seconds
 let autoRefreshEnabled = false;
-let autoRefreshInterval = null;
+let eventSource = null;     // Server-Sent Events connection to /events
 let lastTradeCount = 0;
 let webhookActivity = [];
+let tradeCache = [];        // All trades loaded so far (oldest first)
+let historyCursor = null;   // Cursor returned by /history for incremental loads ("<trade id>.<fills mark>")
+let gapFetch = null;        // In-flight /history call catching up on missed trade events
 
 // ============================================================================
 // Utility Functions
@@ -67,58 +69,70 @@ async function apiCall(endpoint, options = {}) {
     }
 }
 
+function renderServerStatus(data) {
+    const statusBadge = document.getElementById('server-status');
+    
+    if (data.binance_connected && data.binance_status !== 'error') {
+        statusBadge.className = 'status-badge online';
+        statusBadge.innerHTML = '<i class="fas fa-circle"></i> Online';
+    } else {
+        statusBadge.className = 'status-badge offline';
+        statusBadge.innerHTML = '<i class="fas fa-circle"></i> Offline (Binance not connected)';
+    }
+}
+
+function renderServerOffline() {
+    const statusBadge = document.getElementById('server-status');
+    statusBadge.className = 'status-badge offline';
+    statusBadge.innerHTML = '<i class="fas fa-circle"></i> Offline';
+}
+
 async function checkServerStatus() {
     try {
         const data = await apiCall('/health');
-        const statusBadge = document.getElementById('server-status');
-        
-        if (data.binance_connected) {
-            statusBadge.className = 'status-badge online';
-            statusBadge.innerHTML = '<i class="fas fa-circle"></i> Online';
-        } else {
-            statusBadge.className = 'status-badge offline';
-            statusBadge.innerHTML = '<i class="fas fa-circle"></i> Offline (Binance not connected)';
-        }
+        renderServerStatus(data);
         return true;
     } catch (error) {
-        const statusBadge = document.getElementById('server-status');
-        statusBadge.className = 'status-badge offline';
-        statusBadge.innerHTML = '<i class="fas fa-circle"></i> Offline';
+        renderServerOffline();
         return false;
     }
 }
 
+function renderBalances(data) {
+    const balanceGrid = document.getElementById('balance-grid');
+    
+    if (!data.balances || Object.keys(data.balances).length === 0) {
+        balanceGrid.innerHTML = '<div class="balance-loading">No balances found</div>';
+        return;
+    }
+    
+    // Show only top 5 trading assets (USDT, BTC, ETH, BNB, BUSD)
+    const tradingAssets = ['USDT', 'BTC', 'ETH', 'BNB', 'BUSD'];
+    const sortedBalances = Object.entries(data.balances).filter(([asset]) => 
+        tradingAssets.includes(asset)
+    ).sort(([a], [b]) => {
+        // Sort by trading priority order
+        return tradingAssets.indexOf(a) - tradingAssets.indexOf(b);
+    });
+    
+    balanceGrid.innerHTML = sortedBalances
+        .map(([asset, balance]) => `
+            <div class="balance-item">
+                <div class="asset">${asset}</div>
+                <div class="amount">${formatNumber(balance.free)}</div>
+            </div>
+        `).join('');
+    
+    // Show message if no trading assets found
+    if (sortedBalances.length === 0) {
+        balanceGrid.innerHTML = '<div class="balance-loading">No trading assets found. Check your Binance Testnet account.</div>';
+    }
+}
+
 async function loadBalance() {
     try {
         const data = await apiCall('/balance');
-        const balanceGrid = document.getElementById('balance-grid');
-        
-        if (!data.balances || Object.keys(data.balances).length === 0) {
-            balanceGrid.innerHTML = '<div class="balance-loading">No balances found</div>';
-            return;
-        }
-        
-        // Show only top 5 trading assets (USDT, BTC, ETH, BNB, BUSD)
-        const tradingAssets = ['USDT', 'BTC', 'ETH', 'BNB', 'BUSD'];
-        const sortedBalances = Object.entries(data.balances).filter(([asset]) => 
-            tradingAssets.includes(asset)
-        ).sort(([a], [b]) => {
-            // Sort by trading priority order
-            return tradingAssets.indexOf(a) - tradingAssets.indexOf(b);
-        });
-        
-        balanceGrid.innerHTML = sortedBalances
-            .map(([asset, balance]) => `
-                <div class="balance-item">
-                    <div class="asset">${asset}</div>
-                    <div class="amount">${formatNumber(balance.free)}</div>
-                </div>
-            `).join('');
-        
-        // Show message if no trading assets found
-        if (sortedBalances.length === 0) {
-            balanceGrid.innerHTML = '<div class="balance-loading">No trading assets found. Check your Binance Testnet account.</div>';
-        }
+        renderBalances(data);
     } catch (error) {
         showToast('Failed to load balance: ' + error.message, 'error');
         document.getElementById('balance-grid').innerHTML = 
@@ -126,36 +140,90 @@ async function loadBalance() {
     }
 }
 
+async function fetchNewTrades() {
+    // Only ask for trades newer than the last cursor; 304 means nothing changed
+    let endpoint = '/history';
+    if (historyCursor !== null) {
+        endpoint += `?cursor=${encodeURIComponent(historyCursor)}&limit=500`;
+    }
+    
+    const response = await fetch(`${API_BASE_URL}${endpoint}`, { cache: 'no-store' });
+    if (response.status === 304) {
+        return false;
+    }
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    
+    const data = await response.json();
+    mergeTrades(data.trades || []);
+    historyCursor = data.cursor;
+    if (data.has_more) {
+        await fetchNewTrades();
+    }
+    return true;
+}
+
+function mergeTrades(trades) {
+    // Trades re-sent because their reconciled fill changed replace the cached copy
+    const index = new Map(tradeCache.map((trade, i) => [trade.id, i]));
+    trades.forEach(trade => {
+        if (index.has(trade.id)) {
+            tradeCache[index.get(trade.id)] = trade;
+        } else {
+            index.set(trade.id, tradeCache.length);
+            tradeCache.push(trade);
+        }
+    });
+}
+
+function cursorTradeId() {
+    return historyCursor === null ? null : parseInt(historyCursor, 10);
+}
+
+function advanceCursor(tradeId) {
+    // Keep the fills mark so fill updates since the last /history call are still fetched
+    const dot = historyCursor === null ? -1 : historyCursor.indexOf('.');
+    historyCursor = String(tradeId) + (dot >= 0 ? historyCursor.slice(dot) : '');
+}
+
+function renderTradeHistory() {
+    const tbody = document.getElementById('trade-history-body');
+    
+    if (tradeCache.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="8" class="loading">No trades yet</td></tr>';
+        updateStats([]);
+        return;
+    }
+    
+    // Sort by timestamp (newest first)
+    const trades = tradeCache.slice().sort((a, b) => 
+        new Date(b.timestamp) - new Date(a.timestamp)
+    );
+    
+    tbody.innerHTML = trades.map(trade => `
+        <tr>
+            <td>${formatDate(trade.timestamp)}</td>
+            <td class="signal-${trade.signal}">${(trade.signal || '').toUpperCase()}</td>
+            <td>${trade.symbol || 'N/A'}</td>
+            <td>${formatNumber(trade.price)}</td>
+            <td>${trade.quantity || 'N/A'}</td>
+            <td>${trade.order_id || 'N/A'}</td>
+            <td class="status-${trade.status}">${trade.status}</td>
+            <td>${trade.error || '-'}</td>
+        </tr>
+    `).join('');
+    
+    updateStats(trades);
+}
+
 async function loadTradeHistory() {
     try {
-        const data = await apiCall('/history');
-        const tbody = document.getElementById('trade-history-body');
-        
-        if (!data.trades || data.trades.length === 0) {
-            tbody.innerHTML = '<tr><td colspan="8" class="loading">No trades yet</td></tr>';
-            updateStats([]);
+        const changed = await fetchNewTrades();
+        if (!changed && lastTradeCount > 0) {
             return;
         }
-        
-        // Sort by timestamp (newest first)
-        const trades = data.trades.sort((a, b) => 
-            new Date(b.timestamp) - new Date(a.timestamp)
-        );
-        
-        tbody.innerHTML = trades.map(trade => `
-            <tr>
-                <td>${formatDate(trade.timestamp)}</td>
-                <td class="signal-${trade.signal}">${trade.signal.toUpperCase()}</td>
-                <td>${trade.symbol || 'N/A'}</td>
-                <td>${formatNumber(trade.price)}</td>
-                <td>${trade.quantity || 'N/A'}</td>
-                <td>${trade.order_id || 'N/A'}</td>
-                <td class="status-${trade.status}">${trade.status}</td>
-                <td>${trade.error || '-'}</td>
-            </tr>
-        `).join('');
-        
-        updateStats(trades);
+        renderTradeHistory();
     } catch (error) {
         showToast('Failed to load trade history: ' + error.message, 'error');
         document.getElementById('trade-history-body').innerHTML = 
@@ -341,6 +409,55 @@ function refreshHistory() {
     });
 }
 
+// ============================================================================
+// Live Updates (Server-Sent Events)
+// ============================================================================
+
+async function handleTradeEvent(event) {
+    if (!autoRefreshEnabled) return;
+    const trade = JSON.parse(event.data);
+    const cursorId = cursorTradeId();
+    // Ignore trades we already fetched through /history
+    if (cursorId !== null && Number(trade.id) <= cursorId) return;
+    if (gapFetch || (cursorId !== null && Number(trade.id) > cursorId + 1)) {
+        // Events were missed (reconnect or dropped frames): load them from /history
+        // before moving the cursor, or the trades in between would never be shown
+        try {
+            // Share one request between events; fetch again if it ended before this trade
+            while (cursorTradeId() < Number(trade.id)) {
+                gapFetch = gapFetch || fetchNewTrades().finally(() => { gapFetch = null; });
+                if (!(await gapFetch)) break;
+            }
+        } catch (error) {
+            return;  // Cursor unchanged: the next event or refresh retries
+        }
+    } else {
+        mergeTrades([trade]);
+        advanceCursor(trade.id);
+    }
+    renderTradeHistory();
+    updateLastUpdateTime();
+}
+
+function handleBalanceEvent(event) {
+    if (!autoRefreshEnabled) return;
+    renderBalances(JSON.parse(event.data));
+    updateLastUpdateTime();
+}
+
+function connectEventStream() {
+    // One stream per tab; the server pushes status, balance and trade changes
+    if (eventSource || !window.EventSource) return;
+    eventSource = new EventSource(`${API_BASE_URL}/events`);
+    eventSource.addEventListener('status', event => renderServerStatus(JSON.parse(event.data)));
+    eventSource.addEventListener('balance', handleBalanceEvent);
+    eventSource.addEventListener('trade', handleTradeEvent);
+    eventSource.onerror = () => {
+        // EventSource reconnects by itself; show the server as offline meanwhile
+        renderServerOffline();
+    };
+}
+
 function toggleAutoRefresh() {
     autoRefreshEnabled = !autoRefreshEnabled;
     const icon = document.getElementById('auto-refresh-icon');
@@ -349,22 +466,14 @@ function toggleAutoRefresh() {
     if (autoRefreshEnabled) {
         icon.className = 'fas fa-pause';
         text.textContent = 'Auto-refresh: ON';
-        autoRefreshInterval = setInterval(() => {
-            loadTradeHistory();
-            loadBalance();
-            checkServerStatus();
-        }, AUTO_REFRESH_INTERVAL);
         
-        // Also check for new trades immediately
+        // Catch up on anything missed while live updates were off
         loadTradeHistory();
+        loadBalance();
         showToast('Auto-refresh enabled', 'success');
     } else {
         icon.className = 'fas fa-play';
         text.textContent = 'Auto-refresh: OFF';
-        if (autoRefreshInterval) {
-            clearInterval(autoRefreshInterval);
-            autoRefreshInterval = null;
-        }
         showToast('Auto-refresh disabled', 'info');
     }
 }
@@ -449,8 +558,11 @@ async function initialize() {
     // Update timestamp
     updateLastUpdateTime();
     
-    // Set up periodic status check
-    setInterval(checkServerStatus, 30000); // Every 30 seconds
+    // Live status/balance/trade updates pushed by the server
+    connectEventStream();
+    if (!window.EventSource) {
+        setInterval(checkServerStatus, 30000); // Fallback for browsers without SSE
+    }
     
     showToast('Dashboard loaded successfully', 'success');
 }
@@ -0,0 +1,432 @@
+"""
+Strategy - NumPy port of the Pine Script strategies
+Reproduces buy_signal / sell_signal of trading_strategy.pine ('full' rules:
+EMA cross + MACD cross + RSI + Bollinger Bands) and trading_strategy_simple.pine
+('simple' rules: EMA cross OR RSI cross) on closed candles.
+
+Two modes:
+    generate_signals(close)   - vectorized over a whole price array (years of candles in seconds)
+    StreamingStrategy         - O(1) per bar with rolling state, for live candles and for
+                                cross-checking TradingView alerts as they arrive
+
+Indicators follow Pine's definitions: ta.ema / ta.rma are seeded with the SMA
+of their first `length` values, ta.rsi uses RMA-smoothed gains/losses, ta.bb
+uses the population standard deviation, and comparisons against na are false.
+
+Usage:
+    python strategy.py candles.csv              - Signal counts, timings and a vectorized/streaming cross-check
+    python strategy.py candles.csv simple       - Same for the simple strategy
+"""
+
+import math
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+RULES = ('full', 'simple')
+
+# Bars per block in the vectorized EMA/RMA recursion
+BLOCK = 64
+
+
+@dataclass(frozen=True, slots=True)
+class StrategyParams:
+    """The Pine inputs (defaults match both .pine files)"""
+    rsi_length: int = 14
+    rsi_overbought: float = 70
+    rsi_oversold: float = 30
+    ema_fast: int = 12
+    ema_slow: int = 26
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+    bb_length: int = 20
+    bb_mult: float = 2.0
+
+# ============================================================================
+# VECTORIZED INDICATORS
+# ============================================================================
+
+def _smooth(x, alpha, seed):
+    """
+    y[t] = alpha * x[t] + (1 - alpha) * y[t-1] with y[-1] = seed.
+
+    The recursion is solved BLOCK bars at a time with one matrix product
+    (the zero-state response of every block), then each block's start value
+    is carried over from the previous block's last value.
+    """
+    n = len(x)
+    if n == 0:
+        return np.empty(0)
+    if alpha >= 1:
+        return np.array(x, dtype=float)
+    beta = 1.0 - alpha
+    blocks = -(-n // BLOCK)
+    padded = np.zeros(blocks * BLOCK)
+    padded[:n] = x
+    k = np.arange(BLOCK)
+    lag = k[:, None] - k[None, :]
+    weights = np.where(lag >= 0, alpha * beta ** np.maximum(lag, 0), 0.0)
+    y = padded.reshape(blocks, BLOCK) @ weights.T
+    decay = beta ** (k + 1)
+    carries = np.empty(blocks)
+    carry = seed
+    block_decay = decay[-1]
+    for i, last in enumerate(y[:, -1].tolist()):
+        carries[i] = carry
+        carry = last + block_decay * carry
+    y += carries[:, None] * decay[None, :]
+    return y.ravel()[:n]
+
+
+def _seeded_smooth(src, length, alpha):
+    """Pine-style EMA/RMA: na until `length` valid values, seeded with their SMA"""
+    src = np.asarray(src, dtype=float)
+    out = np.full(len(src), np.nan)
+    valid = np.flatnonzero(~np.isnan(src))
+    if len(valid) == 0:
+        return out
+    start = valid[0]
+    values = src[start:]
+    if len(values) < length:
+        return out
+    seed = values[:length].mean()
+    out[start + length - 1] = seed
+    out[start + length:] = _smooth(values[length:], alpha, seed)
+    return out
+
+
+def ema(src, length):
+    """ta.ema"""
+    return _seeded_smooth(src, length, 2.0 / (length + 1))
+
+
+def rma(src, length):
+    """ta.rma (Wilder's smoothing, used by ta.rsi)"""
+    return _seeded_smooth(src, length, 1.0 / length)
+
+
+def _rolling(src, length):
+    src = np.asarray(src, dtype=float)
+    return np.lib.stride_tricks.sliding_window_view(src, length) if len(src) >= length else None
+
+
+def sma(src, length):
+    """ta.sma"""
+    out = np.full(len(src), np.nan)
+    windows = _rolling(src, length)
+    if windows is not None:
+        out[length - 1:] = windows.mean(axis=1)
+    return out
+
+
+def stdev(src, length):
+    """ta.stdev (biased / population)"""
+    out = np.full(len(src), np.nan)
+    windows = _rolling(src, length)
+    if windows is not None:
+        out[length - 1:] = windows.std(axis=1)
+    return out
+
+
+def rsi(src, length):
+    """ta.rsi"""
+    src = np.asarray(src, dtype=float)
+    change = np.concatenate(([np.nan], np.diff(src)))
+    up = rma(np.where(np.isnan(change), np.nan, np.maximum(change, 0)), length)
+    down = rma(np.where(np.isnan(change), np.nan, np.maximum(-change, 0)), length)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = 100 - 100 / (1 + up / down)
+    return np.where(down == 0, 100.0, np.where(up == 0, 0.0, value))
+
+
+def macd(src, fast, slow, signal):
+    """ta.macd -> (macd_line, signal_line, histogram)"""
+    line = ema(src, fast) - ema(src, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(src, length, mult):
+    """ta.bb -> (upper, basis, lower)"""
+    basis = sma(src, length)
+    dev = mult * stdev(src, length)
+    return basis + dev, basis, basis - dev
+
+
+def _previous(a):
+    return np.concatenate(([np.nan], a[:-1]))
+
+
+def crossover(a, b):
+    """ta.crossover: a > b now and a <= b on the previous bar"""
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    return (a > b) & (_previous(a) <= _previous(b))
+
+
+def crossunder(a, b):
+    """ta.crossunder: a < b now and a >= b on the previous bar"""
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    return (a < b) & (_previous(a) >= _previous(b))
+
+# ============================================================================
+# VECTORIZED SIGNALS
+# ============================================================================
+
+def compute_indicators(close, params=None, rules='full'):
+    """Every indicator series the rules need, keyed by its Pine variable name"""
+    p = params or StrategyParams()
+    close = np.asarray(close, dtype=float)
+    ind = {
+        'close': close,
+        'rsi': rsi(close, p.rsi_length),
+        'ema_fast_line': ema(close, p.ema_fast),
+        'ema_slow_line': ema(close, p.ema_slow),
+    }
+    if rules == 'full':
+        ind['macd_line'], ind['signal_line'], _ = macd(close, p.macd_fast, p.macd_slow, p.macd_signal)
+        ind['bb_upper'], ind['bb_middle'], ind['bb_lower'] = bollinger(close, p.bb_length, p.bb_mult)
+    return ind
+
+
+def signals_from_indicators(ind, params=None, rules='full'):
+    """(buy_signal, sell_signal) boolean arrays from precomputed indicator series"""
+    p = params or StrategyParams()
+    close, r = ind['close'], ind['rsi']
+    fast, slow = ind['ema_fast_line'], ind['ema_slow_line']
+
+    if rules == 'simple':
+        ema_buy = crossover(fast, slow)
+        ema_sell = crossunder(fast, slow)
+        rsi_buy = crossunder(r, p.rsi_oversold)
+        rsi_sell = crossover(r, p.rsi_overbought)
+        buy_condition = ema_buy | rsi_buy
+        sell_condition = ema_sell | rsi_sell
+        # Both on one bar: EMA cross wins, then RSI oversold (buy) over overbought
+        both = buy_condition & sell_condition
+        buy = np.where(both, ema_buy | (~ema_sell & rsi_buy), buy_condition)
+        sell = np.where(both, ~ema_buy & ema_sell, sell_condition)
+        return buy, sell
+
+    line, signal_line = ind['macd_line'], ind['signal_line']
+    upper, middle, lower = ind['bb_upper'], ind['bb_middle'], ind['bb_lower']
+    buy = (
+        crossover(fast, slow)
+        & crossover(line, signal_line)
+        & ((r < p.rsi_oversold) | ((r > p.rsi_oversold) & (r < 50)))
+        & ((close <= lower) | ((close < middle) & (close > lower)))
+    )
+    sell = (
+        crossunder(fast, slow)
+        & crossunder(line, signal_line)
+        & ((r > p.rsi_overbought) | ((r < p.rsi_overbought) & (r > 50)))
+        & ((close >= upper) | ((close > middle) & (close < upper)))
+    )
+    return buy, sell
+
+
+def generate_signals(close, params=None, rules='full'):
+    """(buy_signal, sell_signal) boolean arrays over a whole close-price array"""
+    if rules not in RULES:
+        raise ValueError(f"Unknown rules '{rules}' (expected one of {RULES})")
+    return signals_from_indicators(compute_indicators(close, params, rules), params, rules)
+
+
+def signal_list(buy, sell):
+    """[(bar index, 'buy'|'sell'), ...] in bar order"""
+    events = [(int(i), 'buy') for i in np.flatnonzero(buy)]
+    events += [(int(i), 'sell') for i in np.flatnonzero(sell)]
+    return sorted(events)
+
+# ============================================================================
+# STREAMING MODE
+# ============================================================================
+
+class _Smoother:
+    """Incremental Pine EMA/RMA: SMA of the first `length` values, then exponential"""
+
+    __slots__ = ('length', 'alpha', 'count', 'total', 'value')
+
+    def __init__(self, length, alpha):
+        self.length = length
+        self.alpha = alpha
+        self.count = 0
+        self.total = 0.0
+        self.value = math.nan
+
+    def update(self, x):
+        if math.isnan(x):
+            return self.value
+        if self.count < self.length:
+            self.count += 1
+            self.total += x
+            if self.count == self.length:
+                self.value = self.total / self.length
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class _RollingStats:
+    """Mean and population stdev over the last `length` values (sliding Welford update)"""
+
+    __slots__ = ('length', 'window', 'mean', 'm2')
+
+    def __init__(self, length):
+        self.length = length
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        window = self.window
+        if len(window) < self.length:
+            window.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(window)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = window.popleft()
+            window.append(x)
+            new_mean = self.mean + (x - old) / self.length
+            self.m2 += (x - old) * (x - new_mean + old - self.mean)
+            self.mean = new_mean
+        if len(window) < self.length:
+            return math.nan, math.nan
+        return self.mean, math.sqrt(max(self.m2, 0.0) / self.length)
+
+
+class StreamingStrategy:
+    """
+    Bar-by-bar version of generate_signals with O(1) work and state per bar.
+    Feed closed candles to update(); it returns (buy_signal, sell_signal) for that bar.
+    """
+
+    def __init__(self, params=None, rules='full'):
+        if rules not in RULES:
+            raise ValueError(f"Unknown rules '{rules}' (expected one of {RULES})")
+        self.params = p = params or StrategyParams()
+        self.rules = rules
+        self.ema_fast = _Smoother(p.ema_fast, 2.0 / (p.ema_fast + 1))
+        self.ema_slow = _Smoother(p.ema_slow, 2.0 / (p.ema_slow + 1))
+        self.macd_fast = _Smoother(p.macd_fast, 2.0 / (p.macd_fast + 1))
+        self.macd_slow = _Smoother(p.macd_slow, 2.0 / (p.macd_slow + 1))
+        self.macd_signal = _Smoother(p.macd_signal, 2.0 / (p.macd_signal + 1))
+        self.rsi_up = _Smoother(p.rsi_length, 1.0 / p.rsi_length)
+        self.rsi_down = _Smoother(p.rsi_length, 1.0 / p.rsi_length)
+        self.bb = _RollingStats(p.bb_length)
+        self.prev_close = math.nan
+        self.bars = 0
+        # Latest indicator values (same names as the Pine variables) and the previous bar's
+        self.values = {}
+        self._prev = {}
+
+    def _rsi(self, close):
+        change = close - self.prev_close
+        up = self.rsi_up.update(max(change, 0.0) if not math.isnan(change) else math.nan)
+        down = self.rsi_down.update(max(-change, 0.0) if not math.isnan(change) else math.nan)
+        if down == 0:
+            return 100.0
+        if up == 0:
+            return 0.0
+        return 100 - 100 / (1 + up / down)
+
+    def update(self, close):
+        p = self.params
+        close = float(close)
+        v = {
+            'close': close,
+            'rsi': self._rsi(close),
+            'ema_fast_line': self.ema_fast.update(close),
+            'ema_slow_line': self.ema_slow.update(close),
+        }
+        self.prev_close = close
+        if self.rules == 'full':
+            line = self.macd_fast.update(close) - self.macd_slow.update(close)
+            v['macd_line'] = line
+            v['signal_line'] = self.macd_signal.update(line)
+            basis, dev = self.bb.update(close)
+            v['bb_middle'] = basis
+            v['bb_upper'] = basis + p.bb_mult * dev
+            v['bb_lower'] = basis - p.bb_mult * dev
+        prev = self._prev
+        self._prev = self.values = v
+        self.bars += 1
+        if not prev:
+            return False, False
+
+        def over(key_a, key_b=None, level=None):
+            b_now = v[key_b] if key_b else level
+            b_prev = prev[key_b] if key_b else level
+            return v[key_a] > b_now and prev[key_a] <= b_prev
+
+        def under(key_a, key_b=None, level=None):
+            b_now = v[key_b] if key_b else level
+            b_prev = prev[key_b] if key_b else level
+            return v[key_a] < b_now and prev[key_a] >= b_prev
+
+        r = v['rsi']
+        if self.rules == 'simple':
+            ema_buy = over('ema_fast_line', 'ema_slow_line')
+            ema_sell = under('ema_fast_line', 'ema_slow_line')
+            rsi_buy = under('rsi', level=p.rsi_oversold)
+            rsi_sell = over('rsi', level=p.rsi_overbought)
+            buy_condition = ema_buy or rsi_buy
+            sell_condition = ema_sell or rsi_sell
+            if buy_condition and sell_condition:
+                if ema_buy:
+                    return True, False
+                if ema_sell:
+                    return False, True
+                return rsi_buy, False
+            return buy_condition, sell_condition
+
+        upper, middle, lower = v['bb_upper'], v['bb_middle'], v['bb_lower']
+        buy = (
+            over('ema_fast_line', 'ema_slow_line')
+            and over('macd_line', 'signal_line')
+            and (r < p.rsi_oversold or (p.rsi_oversold < r < 50))
+            and (close <= lower or (lower < close < middle))
+        )
+        sell = (
+            under('ema_fast_line', 'ema_slow_line')
+            and under('macd_line', 'signal_line')
+            and (r > p.rsi_overbought or (50 < r < p.rsi_overbought))
+            and (close >= upper or (middle < close < upper))
+        )
+        return buy, sell
+
+
+if __name__ == '__main__':
+    from candles import load_ohlcv
+
+    if len(sys.argv) < 2:
+        print("Usage: python strategy.py <candles.csv|.parquet|store:SYMBOL/INTERVAL> [full|simple]")
+        sys.exit(1)
+    rules = sys.argv[2] if len(sys.argv) > 2 else 'full'
+    candles = load_ohlcv(sys.argv[1])
+    close = np.array([c['close'] for c in candles])
+
+    start = time.perf_counter()
+    buy, sell = generate_signals(close, rules=rules)
+    vectorized = time.perf_counter() - start
+
+    stream = StreamingStrategy(rules=rules)
+    start = time.perf_counter()
+    streamed = [stream.update(x) for x in close.tolist()]
+    streaming = time.perf_counter() - start
+    stream_buy = np.array([b for b, _ in streamed], dtype=bool)
+    stream_sell = np.array([s for _, s in streamed], dtype=bool)
+    mismatches = int(np.count_nonzero(stream_buy != buy) + np.count_nonzero(stream_sell != sell))
+
+    print("=" * 80)
+    print(f"STRATEGY SIGNALS ({rules}): {len(close)} candles from {sys.argv[1]}")
+    print("=" * 80)
+    print(f"Buy signals:  {int(buy.sum())}")
+    print(f"Sell signals: {int(sell.sum())}")
+    print(f"Vectorized:   {vectorized * 1000:.1f} ms ({len(close) / vectorized:,.0f} bars/s)")
+    print(f"Streaming:    {streaming * 1000:.1f} ms ({streaming / max(len(close), 1) * 1e6:.2f} us/bar)")
+    print(f"{'✅' if mismatches == 0 else '❌'} Vectorized vs streaming mismatches: {mismatches}")
@@ -0,0 +1,271 @@
+"""
+Parameter Sweep - Parallel search over the Pine strategy inputs
+Evaluates parameter grids or random samples of the strategy inputs on local
+candles across a process pool and writes a ranked results table.
+
+The close prices are written once to a memory-mapped .npy file that every
+worker maps read-only (nothing is pickled per task). Each worker keeps a cache
+of indicator series keyed by their own inputs (e.g. ('ema', 12)), and tasks
+are handed out in sorted batches so neighbouring combinations reuse them.
+
+Each combination is scored with a vectorized long-only backtest (enter on
+buy_signal, exit on sell_signal at the signal bar's close, fee per side),
+which is much faster than replay.py's full execution path and is meant for
+ranking. Re-check the winners with replay.py.
+
+Usage:
+    python sweep.py BTCUSDT-1m.csv --grid ema_fast=5:20:5 ema_slow=20:50:10
+    python sweep.py BTCUSDT-1m.csv --rules simple --random 500 --grid rsi_length=7:28 rsi_oversold=20:35
+    python sweep.py BTCUSDT-1m.csv --grid bb_mult=1.5,2,2.5 --metric sharpe --out results.csv
+    python sweep.py store:BTCUSDT/1m --start 2023-01-01 --end 2024-01-01 --grid ema_fast=5:20:5
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields, replace
+
+import numpy as np
+
+from candles import load_close
+from strategy import RULES, StrategyParams, ema, rsi, sma, stdev, signals_from_indicators
+
+PARAM_NAMES = [f.name for f in fields(StrategyParams)]
+METRICS = ('return_pct', 'sharpe', 'max_drawdown_pct', 'trades')
+
+# Per-worker indicator cache budget
+INDICATOR_CACHE_MB = int(os.getenv('INDICATOR_CACHE_MB', '256'))
+
+# ============================================================================
+# PARAMETER SPACE
+# ============================================================================
+
+def parse_range(spec):
+    """'5:20:5' -> [5, 10, 15, 20] (inclusive), '1.5,2,2.5' -> [1.5, 2.0, 2.5], '14' -> [14]"""
+    def number(text):
+        value = float(text)
+        return int(value) if value.is_integer() and '.' not in text else value
+
+    if ':' in spec:
+        parts = [number(p) for p in spec.split(':')]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        values, value = [], start
+        while value <= stop + 1e-9:
+            values.append(round(value, 10) if isinstance(step, float) else value)
+            value += step
+        return values
+    return [number(p) for p in spec.split(',')]
+
+
+def parse_grid(specs):
+    """['ema_fast=5:20:5', ...] -> {'ema_fast': [5, 10, 15, 20], ...}"""
+    grid = {}
+    for spec in specs or []:
+        name, _, values = spec.partition('=')
+        if name not in PARAM_NAMES:
+            raise ValueError(f"Unknown parameter '{name}' (expected one of {', '.join(PARAM_NAMES)})")
+        grid[name] = parse_range(values)
+    return grid
+
+
+def is_valid(p):
+    return p.ema_fast < p.ema_slow and p.macd_fast < p.macd_slow and p.rsi_oversold < p.rsi_overbought
+
+
+def combinations(grid, samples=None, seed=0, base=None):
+    """Every grid point, or `samples` random points from it, as StrategyParams"""
+    base = base or StrategyParams()
+    names = list(grid)
+    if samples:
+        rng = random.Random(seed)
+        points = {tuple(rng.choice(grid[n]) for n in names) for _ in range(samples)}
+    else:
+        points = itertools.product(*(grid[n] for n in names))
+    combos = [replace(base, **dict(zip(names, point))) for point in points]
+    # Sorted so neighbouring tasks share indicator inputs (and worker cache entries)
+    return sorted((p for p in combos if is_valid(p)), key=lambda p: [getattr(p, n) for n in PARAM_NAMES])
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+_close = None
+_cache = {}
+_cache_limit = 0
+_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def _init_worker(path):
+    """Map the shared close-price array once per worker process"""
+    global _close, _cache_limit
+    _close = np.load(path, mmap_mode='r')
+    _cache_limit = max(8, INDICATOR_CACHE_MB * 1024 * 1024 // max(_close.nbytes, 1))
+
+
+def _cached(key, compute):
+    value = _cache.get(key)
+    if value is not None:
+        _cache_stats['hits'] += 1
+        return value
+    _cache_stats['misses'] += 1
+    value = compute()
+    if len(_cache) >= _cache_limit:
+        _cache.pop(next(iter(_cache)))
+    _cache[key] = value
+    return value
+
+
+def _indicators(p, rules):
+    close = _close
+    ind = {
+        'close': close,
+        'rsi': _cached(('rsi', p.rsi_length), lambda: rsi(close, p.rsi_length)),
+        'ema_fast_line': _cached(('ema', p.ema_fast), lambda: ema(close, p.ema_fast)),
+        'ema_slow_line': _cached(('ema', p.ema_slow), lambda: ema(close, p.ema_slow)),
+    }
+    if rules == 'full':
+        line = _cached(('macd', p.macd_fast, p.macd_slow), lambda: (
+            _cached(('ema', p.macd_fast), lambda: ema(close, p.macd_fast))
+            - _cached(('ema', p.macd_slow), lambda: ema(close, p.macd_slow))
+        ))
+        ind['macd_line'] = line
+        ind['signal_line'] = _cached(('macd_signal', p.macd_fast, p.macd_slow, p.macd_signal),
+                                     lambda: ema(line, p.macd_signal))
+        basis = _cached(('sma', p.bb_length), lambda: sma(close, p.bb_length))
+        dev = p.bb_mult * _cached(('stdev', p.bb_length), lambda: stdev(close, p.bb_length))
+        ind['bb_middle'], ind['bb_upper'], ind['bb_lower'] = basis, basis + dev, basis - dev
+    return ind
+
+
+def backtest(close, buy, sell, fee_rate):
+    """Long-only equity curve metrics: in the market from a buy signal until the next sell signal"""
+    n = len(close)
+    state = np.full(n, np.nan)
+    state[sell] = 0.0
+    state[buy] = 1.0
+    last_event = np.where(np.isnan(state), 0, np.arange(n))
+    np.maximum.accumulate(last_event, out=last_event)
+    position = np.nan_to_num(state[last_event])
+    changes = np.abs(np.diff(position, prepend=0.0))
+    returns = np.zeros(n)
+    returns[1:] = position[:-1] * (close[1:] / close[:-1] - 1)
+    returns -= changes * fee_rate
+    equity = np.cumprod(1 + returns)
+    drawdown = 1 - equity / np.maximum.accumulate(equity)
+    std = returns.std()
+    return {
+        'return_pct': round((equity[-1] - 1) * 100, 4) if n else 0.0,
+        'max_drawdown_pct': round(float(drawdown.max()) * 100, 4) if n else 0.0,
+        'sharpe': round(float(returns.mean() / std * np.sqrt(n)), 4) if std > 0 else 0.0,
+        'trades': int(np.count_nonzero(np.diff(position, prepend=0.0) > 0)),
+        'exposure_pct': round(float(position.mean()) * 100, 2) if n else 0.0,
+    }
+
+
+def _evaluate_batch(batch, rules, fee_rate):
+    """Score a batch of parameter sets; returns (rows, cache hits, cache misses)"""
+    hits, misses = _cache_stats['hits'], _cache_stats['misses']
+    rows = []
+    for params in batch:
+        buy, sell = signals_from_indicators(_indicators(params, rules), params, rules)
+        rows.append({**asdict(params), 'buys': int(buy.sum()), 'sells': int(sell.sum()),
+                     **backtest(_close, buy, sell, fee_rate)})
+    return rows, _cache_stats['hits'] - hits, _cache_stats['misses'] - misses
+
+# ============================================================================
+# SWEEP
+# ============================================================================
+
+def sweep(close, combos, rules='full', workers=None, batch_size=16, fee_rate=0.001, metric='return_pct'):
+    """Evaluate `combos` over a process pool; returns (ranked rows, stats)"""
+    workdir = tempfile.mkdtemp(prefix='sweep-')
+    path = os.path.join(workdir, 'close.npy')
+    np.save(path, np.ascontiguousarray(close, dtype=np.float64))
+    workers = workers or os.cpu_count() or 1
+    batches = [combos[i:i + batch_size] for i in range(0, len(combos), batch_size)]
+    rows, hits, misses = [], 0, 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool:
+            futures = [pool.submit(_evaluate_batch, batch, rules, fee_rate) for batch in batches]
+            for future in futures:
+                batch_rows, batch_hits, batch_misses = future.result()
+                rows.extend(batch_rows)
+                hits += batch_hits
+                misses += batch_misses
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+    # Lower is better only for drawdown
+    rows.sort(key=lambda r: r[metric], reverse=metric != 'max_drawdown_pct')
+    for rank, row in enumerate(rows, 1):
+        row['rank'] = rank
+    stats = {
+        'combinations': len(rows),
+        'bars': len(close),
+        'workers': workers,
+        'seconds': round(elapsed, 3),
+        'combos_per_sec': round(len(rows) / elapsed, 1) if elapsed else None,
+        'indicator_cache_hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+    }
+    return rows, stats
+
+
+def write_table(rows, path):
+    columns = ['rank', *PARAM_NAMES, 'buys', 'sells', 'trades', 'return_pct', 'max_drawdown_pct', 'sharpe', 'exposure_pct']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({c: row[c] for c in columns})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parallel parameter sweep over the Pine strategy inputs')
+    parser.add_argument('candles', help='candles as CSV, Parquet or store:SYMBOL/INTERVAL (see candles.py)')
+    parser.add_argument('--start', help='first bar time (ISO date or epoch), inclusive')
+    parser.add_argument('--end', help='last bar time (ISO date or epoch), exclusive')
+    parser.add_argument('--grid', nargs='*', default=[], help="name=start:stop[:step] or name=a,b,c")
+    parser.add_argument('--random', type=int, help='evaluate this many random points from the grid instead of all of it')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rules', default='full', choices=RULES)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--fee', type=float, default=0.001, help='commission rate per side')
+    parser.add_argument('--metric', default='return_pct', choices=METRICS)
+    parser.add_argument('--top', type=int, default=10, help='rows to print')
+    parser.add_argument('--out', default='sweep_results.csv', help='ranked results table (CSV)')
+    args = parser.parse_args()
+
+    close = load_close(args.candles, args.start, args.end)
+    combos = combinations(parse_grid(args.grid), samples=args.random, seed=args.seed)
+    if not combos:
+        print("❌ No valid parameter combinations (check that fast < slow and oversold < overbought)")
+        raise SystemExit(1)
+
+    rows, stats = sweep(close, combos, rules=args.rules, workers=args.workers,
+                        batch_size=args.batch_size, fee_rate=args.fee, metric=args.metric)
+    write_table(rows, args.out)
+
+    varied = [name for name in PARAM_NAMES if len({row[name] for row in rows}) > 1] or PARAM_NAMES[:3]
+    print("=" * 80)
+    print(f"PARAMETER SWEEP ({args.rules}): {stats['combinations']} combinations x {stats['bars']} candles")
+    print("=" * 80)
+    print(f"{stats['seconds']}s on {stats['workers']} workers ({stats['combos_per_sec']} combos/s), "
+          f"indicator cache hit rate {stats['indicator_cache_hit_rate']}")
+    print("-" * 80)
+    print(f"{'rank':>4} " + ' '.join(f"{n:>14}" for n in varied) + f" {'trades':>7} {'return %':>10} {'max dd %':>9} {'sharpe':>8}")
+    for row in rows[:args.top]:
+        print(f"{row['rank']:>4} " + ' '.join(f"{row[n]:>14}" for n in varied)
+              + f" {row['trades']:>7} {row['return_pct']:>10} {row['max_drawdown_pct']:>9} {row['sharpe']:>8}")
+    print("-" * 80)
+    print(f"✅ Ranked table written to {args.out}")
+    print(json.dumps(stats))
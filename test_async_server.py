@@ -0,0 +1,101 @@
+"""
+Tests for async_server.py - the shared alert path (dedup, coalescing, order queue) against the simulator
+"""
+
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import async_server
+import trading_core as core
+
+
+@pytest.fixture
+def serve(monkeypatch, tmp_path, sim_server, sim):
+    """Run `scenario(client, app)` against an async app connected to the simulator"""
+    url, _ = sim_server
+    monkeypatch.setattr(core, 'BINANCE_SIMULATOR_URL', url)
+    monkeypatch.setattr(core, 'PRICE_STREAM_ENABLED', False)
+    monkeypatch.setattr(core, 'RECONCILE_ENABLED', False)
+    monkeypatch.setattr(core.trade_journal, 'path', str(tmp_path / 'journal.db'))
+    monkeypatch.setattr(core.position_book, 'path', None)
+    monkeypatch.setattr(core.alert_index, '_entries', type(core.alert_index._entries)())
+
+    def run(scenario):
+        async def main():
+            app = async_server.create_app()
+            async with TestClient(TestServer(app)) as client:
+                return await scenario(client, app)
+        return asyncio.run(main())
+    return run
+
+
+async def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    return predicate()
+
+
+def test_import_has_no_side_effects(tmp_path):
+    code = ("import logging, sys, async_server; "
+            "assert 'webhook_server' not in sys.modules; assert not logging.getLogger().handlers")
+    subprocess.run([sys.executable, '-c', code], cwd=tmp_path, check=True,
+                   env={'PYTHONPATH': str(Path(async_server.__file__).parent)})
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_alerts_are_deduplicated_and_executed(serve, sim):
+    async def scenario(client, app):
+        alert = {'signal': 'buy', 'symbol': 'BTCUSDT', 'quantity': 0.002, 'id': 'once'}
+        first = await client.post('/webhook', json=alert)
+        again = await client.post('/webhook', json=alert)
+        return first.status, (await again.json())['status']
+
+    assert serve(scenario) == (200, 'duplicate')
+    assert [o['side'] for o in sim.orders['BTCUSDT']] == ['BUY']
+
+
+def test_coalescing_window_nets_alerts_into_one_order(serve, sim, monkeypatch):
+    monkeypatch.setattr(core, 'COALESCE_WINDOW', 0.1)
+
+    async def scenario(client, app):
+        for signal, quantity in (('buy', 0.005), ('sell', 0.002)):
+            response = await client.post('/webhook', json={'signal': signal, 'symbol': 'BTCUSDT', 'quantity': quantity})
+            assert response.status == 202
+        await wait_for(lambda: sim.orders.get('BTCUSDT'))
+
+    serve(scenario)
+    assert [(o['side'], float(o['origQty'])) for o in sim.orders['BTCUSDT']] == [('BUY', 0.003)]
+
+
+def test_queued_alerts_run_on_the_account_workers(serve, sim, monkeypatch):
+    monkeypatch.setattr(core, 'ORDER_QUEUE_ENABLED', True)
+
+    async def scenario(client, app):
+        response = await client.post('/webhook', json={'signal': 'sell', 'symbol': 'BTCUSDT', 'quantity': 0.01})
+        body = await response.json()
+        assert response.status == 202
+        await wait_for(lambda: app['pipeline'].find_job(body['job_id'])['status'] in ('done', 'failed'))
+        status = await client.get(body['status_url'])
+        return (await status.json())['status']
+
+    assert serve(scenario) == 'done'
+    assert [o['side'] for o in sim.orders['BTCUSDT']] == ['SELL']
+
+
+def test_health_reports_the_background_ping_without_calling_binance(serve, monkeypatch):
+    monkeypatch.setattr(core, 'HEALTH_CHECK_INTERVAL', 60)
+
+    async def scenario(client, app):
+        await wait_for(lambda: app['binance_status'].state['binance_status'] == 'connected')
+        calls = core.rate_limiter.counters['calls']
+        health = await (await client.get('/health')).json()
+        return health['binance_status'], health['binance_connected'], core.rate_limiter.counters['calls'] - calls
+
+    assert serve(scenario) == ('connected', True, 0)
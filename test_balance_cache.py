@@ -0,0 +1,63 @@
+"""
+Tests for balance_cache.py - snapshot freshness, local order fills and change callbacks
+"""
+
+import pytest
+
+from balance_cache import BalanceCache
+
+
+def account(**free):
+    return {'balances': [{'asset': a, 'free': str(v), 'locked': '0'} for a, v in free.items()]}
+
+
+def test_reads_are_served_from_the_snapshot_until_it_is_stale():
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return account(USDT=1000, BTC=0.5)
+
+    cache = BalanceCache(fetch, max_age=60)
+    assert cache.get_free('USDT') == 1000.0
+    assert cache.get_free('BTC') == 0.5
+    assert cache.get_free('ETH') == 0.0
+    assert len(fetches) == 1
+
+    cache.invalidate()
+    cache.snapshot()
+    assert len(fetches) == 2
+
+
+def test_fills_patch_the_snapshot_without_a_refetch(sim_client):
+    changes = []
+    cache = BalanceCache(sim_client.get_account, max_age=60, on_change=changes.append)
+    before = cache.snapshot()
+    order = sim_client.create_order(symbol='BTCUSDT', side='BUY', type='MARKET', quantity='0.01')
+    cache.apply_order(order, 'BTC', 'USDT')
+
+    local = cache.snapshot()
+    exchange = {b['asset']: float(b['free']) for b in sim_client.get_account()['balances']}
+    assert local['BTC']['free'] > before['BTC']['free']
+    assert abs(local['USDT']['free'] - exchange['USDT']) < 1e-6
+    assert abs(local['BTC']['free'] - exchange['BTC']) < 1e-9
+    assert len(changes) == 2 and changes[-1] == local
+
+
+def test_failed_refresh_is_raised_and_recorded():
+    def fetch():
+        raise ConnectionError('exchange unreachable')
+
+    cache = BalanceCache(fetch)
+    with pytest.raises(ConnectionError):
+        cache.get_free('USDT')
+    assert cache.last_error == 'exchange unreachable'
+
+
+def test_owner_loaded_snapshots_are_never_refetched():
+    cache = BalanceCache(None, max_age=0)
+    cache.load(account(USDT=5))
+    assert cache.get_free('USDT') == 5.0
+    # An unparseable fill marks the snapshot stale instead of guessing
+    cache.apply_order({'side': 'BUY', 'executedQty': 'n/a'}, 'BTC', 'USDT')
+    assert cache.age() > 1000
@@ -0,0 +1,67 @@
+"""
+Tests for candles.py - kline CSV loading and the append-only candle store
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from candles import KLINE_COLUMNS, CandleStore, load_ohlcv, open_series
+
+START = 1704067200000   # 2024-01-01T00:00:00Z
+MINUTE = 60000
+
+
+def bars(minutes):
+    times = [START + m * MINUTE for m in minutes]
+    return {column: times if column == 'time' else [float(m) for m in minutes] for column in KLINE_COLUMNS}
+
+
+def test_store_grows_incrementally_and_skips_bars_it_already_has(tmp_path):
+    store = CandleStore(str(tmp_path))
+    assert store.append('btcusdt', '1m', bars(range(0, 5))) == (5, 0)
+    # Overlapping dump: only bars newer than the last stored one are appended
+    assert store.append('BTCUSDT', '1m', bars(range(3, 8))) == (3, 2)
+    assert store.append('BTCUSDT', '1m', bars(range(0, 8))) == (0, 8)
+
+    series = store.series('BTCUSDT', '1m')
+    assert len(series) == 8 and series.last() == START + 7 * MINUTE
+    assert series.columns['close'].tolist() == [float(m) for m in range(8)]
+    assert isinstance(series.columns['time'], np.memmap)
+    assert store.list() == [('BTCUSDT', '1m')]
+
+
+def test_gaps_and_ranges(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append('ETHUSDT', '1m', bars([0, 1, 2, 5, 6, 10]))
+    series = store.series('ETHUSDT', '1m')
+    assert series.gaps() == [(START + 2 * MINUTE, START + 5 * MINUTE, 2), (START + 6 * MINUTE, START + 10 * MINUTE, 3)]
+    assert series.info()['missing_bars'] == 5
+    # Ranges are [start, end) by bar time, in any to_millis format
+    assert [c['time'] for c in series.candles('2024-01-01T00:01:00', START + 6 * MINUTE)] == \
+        [START + m * MINUTE for m in (1, 2, 5)]
+    assert series.gaps(start=START + 5 * MINUTE) == [(START + 6 * MINUTE, START + 10 * MINUTE, 3)]
+
+
+def test_interrupted_append_leaves_the_previous_bars(tmp_path):
+    store = CandleStore(str(tmp_path))
+    store.append('BTCUSDT', '1m', bars(range(3)))
+    # Simulate a crash after the other columns were written but before the time column committed
+    with open(os.path.join(store.path('BTCUSDT', '1m'), 'close.npy'), 'ab') as f:
+        f.write(np.float64(99).tobytes())
+    assert len(store.series('BTCUSDT', '1m')) == 3
+    assert store.append('BTCUSDT', '1m', bars([3])) == (1, 0)
+    assert store.series('BTCUSDT', '1m').columns['close'].tolist() == [0.0, 1.0, 2.0, 3.0]
+
+
+def test_kline_csv_import_and_store_specs(tmp_path):
+    dump = tmp_path / 'BTCUSDT-1m.csv'
+    dump.write_text(''.join(f'{START + m * MINUTE},{m},{m},{m},{m},1,{START + m * MINUTE + 59999},0,0,0,0,0\n'
+                            for m in range(4)))
+    assert [c['close'] for c in load_ohlcv(str(dump))] == [0.0, 1.0, 2.0, 3.0]
+    store = CandleStore(str(tmp_path / 'store'))
+    assert store.import_csv(str(dump), 'BTCUSDT', '1m') == (4, 0)
+    assert len(open_series('store:BTCUSDT/1m', root=store.root)) == 4
+    with pytest.raises(ValueError, match='No candles'):
+        open_series('store:ETHUSDT/1m', root=store.root)
@@ -0,0 +1,109 @@
+"""
+Tests for dedup.py - alert fingerprints, the expiring index and signal coalescing
+"""
+
+import threading
+import time
+
+from dedup import AlertIndex, SignalCoalescer, alert_fingerprint
+
+
+def test_fingerprint_prefers_the_idempotency_key():
+    assert alert_fingerprint({'signal': 'buy', 'client_order_id': 'abc', 'time': 1}) == 'id:abc'
+    assert alert_fingerprint({'signal': 'buy', 'alert_id': 7}) == 'id:7'
+
+
+def test_fingerprint_hashes_content_only_with_a_bar_time():
+    alert = {'signal': 'buy', 'symbol': 'BTCUSDT', 'time': '2024-01-01T12:00:00'}
+    assert alert_fingerprint(alert).startswith('sha1:')
+    assert alert_fingerprint(dict(reversed(list(alert.items())))) == alert_fingerprint(alert)
+    assert alert_fingerprint(dict(alert, time='2024-01-01T12:01:00')) != alert_fingerprint(alert)
+
+    untimed = {'signal': 'buy', 'symbol': 'BTCUSDT'}
+    assert alert_fingerprint(untimed) is None
+    assert alert_fingerprint(untimed, content_hash=True).startswith('sha1:')
+
+
+def test_index_reports_repeats_until_forgotten():
+    index = AlertIndex(ttl=60)
+    assert index.check('id:1') is None
+    index.set_ref('id:1', 'job-1')
+    assert index.check('id:1')['ref'] == 'job-1'
+    assert index.duplicates == 1
+
+    index.forget('id:1')
+    assert index.check('id:1') is None
+
+
+def test_index_entries_expire():
+    index = AlertIndex(ttl=0.05)
+    assert index.check('id:1') is None
+    time.sleep(0.1)
+    assert index.check('id:1') is None
+
+
+def test_index_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'alerts.log')
+    index = AlertIndex(ttl=60, path=path)
+    index.load()
+    index.check('id:1', ref='job-1')
+
+    restarted = AlertIndex(ttl=60, path=path)
+    assert restarted.load() == 1
+    assert restarted.check('id:1')['ref'] == 'job-1'
+
+
+def collect(window=0.05):
+    dispatched = []
+    closed = threading.Event()
+
+    def dispatch(data):
+        dispatched.append(data)
+        closed.set()
+
+    coalescer = SignalCoalescer(window, lambda data: data['quantity'], dispatch)
+    return coalescer, dispatched, closed
+
+
+def wait_until_closed(coalescer):
+    deadline = time.time() + 2
+    while coalescer.stats()['pending'] and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.01)
+
+
+def test_coalescer_nets_opposing_signals():
+    coalescer, dispatched, closed = collect()
+    coalescer.add({'signal': 'buy', 'symbol': 'BTCUSDT', 'quantity': 1.0, 'n': 1})
+    coalescer.add({'signal': 'sell', 'symbol': 'BTCUSDT', 'quantity': 0.25, 'n': 2})
+    coalescer.add({'signal': 'buy', 'symbol': 'BTCUSDT', 'quantity': 0.5, 'n': 3})
+    assert closed.wait(2)
+
+    assert len(dispatched) == 1
+    order = dispatched[0]
+    assert order['signal'] == 'buy'
+    assert order['quantity'] == 1.25
+    assert order['coalesced'] == 3
+    assert order['n'] == 3
+    assert coalescer.netted == 2
+
+
+def test_coalescer_drops_signals_that_cancel_out():
+    coalescer, dispatched, _ = collect()
+    coalescer.add({'signal': 'buy', 'symbol': 'BTCUSDT', 'quantity': 0.1})
+    coalescer.add({'signal': 'sell', 'symbol': 'BTCUSDT', 'quantity': 0.1})
+    wait_until_closed(coalescer)
+
+    assert dispatched == []
+    assert coalescer.netted == 2
+
+
+def test_coalescer_keeps_symbols_and_accounts_apart():
+    coalescer, dispatched, _ = collect()
+    coalescer.add({'signal': 'buy', 'symbol': 'BTCUSDT', 'quantity': 1.0}, 'main')
+    coalescer.add({'signal': 'sell', 'symbol': 'BTCUSDT', 'quantity': 1.0}, 'swing')
+    coalescer.add({'signal': 'sell', 'symbol': 'ETHUSDT', 'quantity': 2.0}, 'main')
+    wait_until_closed(coalescer)
+
+    sides = sorted((d['symbol'], d['signal'], d['quantity']) for d in dispatched)
+    assert sides == [('BTCUSDT', 'buy', 1.0), ('BTCUSDT', 'sell', 1.0), ('ETHUSDT', 'sell', 2.0)]
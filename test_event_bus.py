@@ -0,0 +1,50 @@
+"""
+Tests for event_bus.py - fan-out to thread and asyncio subscribers, state replay and slow-subscriber drops
+"""
+
+import asyncio
+import threading
+
+from event_bus import EventBus, format_sse
+
+
+def test_every_subscriber_gets_every_event_and_new_ones_get_the_latest_state():
+    bus = EventBus()
+    first, second = bus.subscribe(), bus.subscribe()
+    bus.publish('status', {'binance_status': 'connected'})
+    bus.publish('trade', {'id': 1})
+    bus.publish('status', {'binance_status': 'disconnected'})
+
+    expected = [format_sse('status', {'binance_status': 'connected'}), format_sse('trade', {'id': 1}),
+                format_sse('status', {'binance_status': 'disconnected'})]
+    for q in (first, second):
+        assert [q.get_nowait() for _ in range(3)] == expected
+    # Late subscribers start from the current status only; trades are not replayed
+    late = bus.subscribe()
+    assert late.get_nowait() == expected[-1] and late.empty()
+
+
+def test_slow_subscribers_are_dropped_without_blocking_publishers():
+    bus = EventBus(max_queue=2)
+    slow, fast = bus.subscribe(), bus.subscribe()
+    for n in range(3):
+        bus.publish('trade', {'id': n})
+        fast.get_nowait()
+    assert slow.full()
+    assert bus._subscribers == [fast]
+
+
+def test_async_subscribers_are_fed_from_other_threads():
+    bus = EventBus(max_queue=10)
+
+    async def run():
+        q = bus.subscribe_async()
+        frames = bus.stream_async(q, heartbeat=1)
+        assert await anext(frames) == 'retry: 3000\n\n'
+        threading.Thread(target=bus.publish, args=('balance', {'USDT': 1})).start()
+        frame = await asyncio.wait_for(anext(frames), 2)
+        await frames.aclose()
+        return frame
+
+    assert asyncio.run(run()) == format_sse('balance', {'USDT': 1})
+    assert bus._subscribers == []
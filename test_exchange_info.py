@@ -0,0 +1,61 @@
+"""
+Tests for exchange_info.py - filter parsing and quantity/price rounding
+"""
+
+import pytest
+
+from exchange_info import ExchangeInfo, FilterError, guess_assets
+
+
+@pytest.fixture
+def info():
+    table = ExchangeInfo()
+    table.load({'symbols': [
+        {'symbol': 'BTCUSDT', 'status': 'TRADING', 'baseAsset': 'BTC', 'quoteAsset': 'USDT', 'filters': [
+            {'filterType': 'PRICE_FILTER', 'minPrice': '0.01', 'maxPrice': '1000000', 'tickSize': '0.01'},
+            {'filterType': 'LOT_SIZE', 'minQty': '0.00001', 'maxQty': '9000', 'stepSize': '0.00001'},
+            {'filterType': 'MARKET_LOT_SIZE', 'minQty': '0', 'maxQty': '100', 'stepSize': '0'},
+            {'filterType': 'NOTIONAL', 'minNotional': '5', 'applyMinToMarket': True,
+             'maxNotional': '9000000', 'applyMaxToMarket': False},
+        ]},
+        {'symbol': 'OLDUSDT', 'status': 'BREAK', 'baseAsset': 'OLD', 'quoteAsset': 'USDT', 'filters': []},
+    ]})
+    return table
+
+
+def test_quantity_is_rounded_down_to_the_step(info):
+    assert info.normalize_quantity('BTCUSDT', 0.0012345) == 0.00123
+    assert info.normalize_quantity('btcusdt', 0.1) == 0.1
+    # Decimal rounding: 0.3 is not turned into 0.29999
+    assert info.normalize_quantity('BTCUSDT', 0.3) == 0.3
+
+
+def test_quantity_filters(info):
+    with pytest.raises(FilterError, match='minQty'):
+        info.normalize_quantity('BTCUSDT', 0.000009)
+    with pytest.raises(FilterError, match='maxQty'):
+        info.normalize_quantity('BTCUSDT', 150)     # MARKET_LOT_SIZE is tighter than LOT_SIZE
+    with pytest.raises(FilterError, match='MIN_NOTIONAL'):
+        info.normalize_quantity('BTCUSDT', 0.0001, price=40000)
+    assert info.normalize_quantity('BTCUSDT', 0.0002, price=40000) == 0.0002
+    with pytest.raises(FilterError, match='not trading'):
+        info.normalize_quantity('OLDUSDT', 1)
+
+
+def test_unknown_symbols_pass_through(info):
+    assert info.normalize_quantity('DOGEUSDT', 12.345678) == 12.345678
+    assert info.assets('DOGEUSDT') == ('DOGE', 'USDT')
+    assert info.assets('BTCUSDT') == ('BTC', 'USDT')
+
+
+def test_guess_assets_prefers_the_longest_quote():
+    assert guess_assets('ETHFDUSD') == ('ETH', 'FDUSD')
+    assert guess_assets('ETHBTC') == ('ETH', 'BTC')
+    assert guess_assets('bnbusdc') == ('BNB', 'USDC')
+
+
+def test_refresh_from_the_simulator(sim_client):
+    info = ExchangeInfo()
+    assert info.refresh(sim_client) == 3
+    assert info.assets('ETHUSDT') == ('ETH', 'USDT')
+    assert info.normalize_quantity('ETHUSDT', 0.123456789, price=3000) == 0.12345
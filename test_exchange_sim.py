@@ -0,0 +1,78 @@
+"""
+Tests for exchange_sim.py - fills, history paging, limits and klines through python-binance
+"""
+
+import numpy as np
+import pytest
+from binance.exceptions import BinanceAPIException
+
+from candles import CandleStore
+
+
+def test_market_order_fills_and_moves_balances(sim, sim_client):
+    order = sim_client.create_order(symbol='BTCUSDT', side='BUY', type='MARKET', quantity='0.01')
+    assert order['status'] == 'FILLED'
+    assert float(order['cummulativeQuoteQty']) == pytest.approx(500.0)
+    assert sim.balances['USDT'] == pytest.approx(9500.0)
+    assert sim.balances['BTC'] == pytest.approx(1 + 0.01 * (1 - sim.config['fee_rate']))
+    assert sim_client.get_order(symbol='BTCUSDT', orderId=order['orderId'])['side'] == 'BUY'
+
+
+def test_rejections_use_binance_error_codes(sim_client):
+    with pytest.raises(BinanceAPIException) as e:
+        sim_client.create_order(symbol='BTCUSDT', side='BUY', type='MARKET', quantity='0.000001')
+    assert e.value.code == -1013
+    with pytest.raises(BinanceAPIException) as e:
+        sim_client.create_order(symbol='BTCUSDT', side='BUY', type='MARKET', quantity='1')
+    assert e.value.code == -2010
+    with pytest.raises(BinanceAPIException) as e:
+        sim_client.get_symbol_ticker(symbol='NOPEUSDT')
+    assert e.value.code == -1121
+
+
+def test_history_pages_from_an_id(sim, sim_client):
+    for _ in range(5):
+        sim.create_order({'symbol': 'ETHUSDT', 'side': 'BUY', 'type': 'MARKET', 'quantity': '0.01'})
+    first = sim_client.get_all_orders(symbol='ETHUSDT', orderId=0, limit=2)
+    rest = sim_client.get_all_orders(symbol='ETHUSDT', orderId=first[-1]['orderId'] + 1, limit=10)
+    assert [o['orderId'] for o in first + rest] == [1, 2, 3, 4, 5]
+    assert [o['orderId'] for o in sim_client.get_all_orders(symbol='ETHUSDT', limit=2)] == [4, 5]
+
+
+def test_weight_limit_answers_429_with_retry_after(sim, sim_client):
+    sim.configure(weight_limit=45)
+    sim_client.get_account()
+    sim_client.get_account()
+    with pytest.raises(BinanceAPIException) as e:
+        sim_client.get_account()
+    assert e.value.status_code == 429
+    assert int(e.value.response.headers['Retry-After']) >= 1
+    assert sim.counters['rate_limited'] == 1
+
+
+def test_synthetic_klines_are_deterministic(sim_client):
+    latest = sim_client.get_klines(symbol='BTCUSDT', interval='1m', limit=5)
+    assert len(latest) == 5
+    assert [k[0] for k in latest] == list(range(latest[0][0], latest[-1][0] + 1, 60000))
+    assert latest[-1][6] == latest[-1][0] + 59999
+    assert float(latest[-1][4]) == 50000.0       # the open bar closes at the live price
+
+    again = sim_client.get_klines(symbol='BTCUSDT', interval='1m', startTime=latest[0][0], limit=2)
+    assert again == latest[:2]
+    with pytest.raises(BinanceAPIException) as e:
+        sim_client.get_klines(symbol='BTCUSDT', interval='7m')
+    assert e.value.code == -1120
+
+
+def test_klines_come_from_the_candle_store(sim, sim_client, tmp_path):
+    times = 1700000000000 + np.arange(10) * 60000
+    CandleStore(str(tmp_path)).append('ETHUSDT', '1m', {
+        'time': times, 'open': times * 0 + 1, 'high': times * 0 + 2, 'low': times * 0 + 0.5,
+        'close': np.arange(10) + 100.0, 'volume': times * 0 + 3})
+    sim.configure(candle_store=str(tmp_path))
+
+    assert [float(k[4]) for k in sim_client.get_klines(symbol='ETHUSDT', interval='1m', limit=3)] == [107, 108, 109]
+    window = sim_client.get_klines(symbol='ETHUSDT', interval='1m', startTime=int(times[2]), endTime=int(times[4]))
+    assert [k[0] for k in window] == times[2:5].tolist()
+    # Series the store doesn't hold are still synthetic
+    assert len(sim_client.get_klines(symbol='BTCUSDT', interval='1m', limit=3)) == 3
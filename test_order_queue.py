@@ -0,0 +1,83 @@
+"""
+Tests for order_queue.py - per-symbol ordering, lane back-pressure and job records
+"""
+
+import random
+import threading
+import time
+
+import pytest
+
+from order_queue import OrderQueue, QueueFullError
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_signals_for_a_symbol_run_in_arrival_order():
+    executed = {}
+    lock = threading.Lock()
+
+    def handler(data):
+        time.sleep(random.random() / 1000)
+        with lock:
+            executed.setdefault(data['symbol'], []).append(data['n'])
+        return {'ok': True}, 200
+
+    oq = OrderQueue(handler, num_workers=4, max_pending=200)
+    oq.start()
+    symbols = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'XRPUSDT']
+    for n in range(200):
+        symbol = symbols[n % len(symbols)]
+        oq.submit(symbol, {'symbol': symbol, 'signal': 'buy', 'n': n})
+    assert wait_for(lambda: sum(len(v) for v in executed.values()) == 200)
+    oq.stop()
+
+    for symbol in symbols:
+        assert executed[symbol] == sorted(executed[symbol])
+        assert len(executed[symbol]) == 40
+
+
+def test_symbol_lane_is_stable_and_case_insensitive():
+    oq = OrderQueue(lambda data: ({}, 200), num_workers=8)
+    assert oq.lane_for('BTCUSDT') == oq.lane_for('btcusdt') == oq.lane_for('BTCUSDT')
+    assert 0 <= oq.lane_for('ETHUSDT') < 8
+
+
+def test_full_lane_rejects_and_forgets_the_job():
+    oq = OrderQueue(lambda data: ({}, 200), num_workers=1, max_pending=2)
+    oq.submit('BTCUSDT', {'signal': 'buy'})
+    oq.submit('BTCUSDT', {'signal': 'sell'})
+    with pytest.raises(QueueFullError):
+        oq.submit('BTCUSDT', {'signal': 'buy'})
+    assert oq.stats()['pending'] == [2]
+    assert oq.stats()['tracked_jobs'] == 2
+
+
+def test_job_status_follows_the_handler_result():
+    def handler(data):
+        if data['signal'] == 'crash':
+            raise RuntimeError('boom')
+        return {'signal': data['signal']}, 200 if data['signal'] == 'buy' else 400
+
+    oq = OrderQueue(handler, num_workers=2)
+    oq.start()
+    done = oq.submit('BTCUSDT', {'signal': 'buy'})
+    failed = oq.submit('BTCUSDT', {'signal': 'sell'})
+    crashed = oq.submit('BTCUSDT', {'signal': 'crash'})
+    assert wait_for(lambda: oq.get_job(crashed['id'])['status'] in ('done', 'failed'))
+    oq.stop()
+
+    assert oq.get_job(done['id'])['status'] == 'done'
+    assert oq.get_job(failed['id'])['http_status'] == 400
+    assert oq.get_job(failed['id'])['status'] == 'failed'
+    assert oq.get_job(crashed['id'])['http_status'] == 500
+    assert oq.get_job(crashed['id'])['result'] == {'error': 'boom'}
+    assert done['seq'] < failed['seq'] < crashed['seq']
+    assert oq.get_job('unknown') is None
@@ -0,0 +1,73 @@
+"""
+Tests for positions.py - average cost, realized/unrealized PnL and snapshots
+"""
+
+import pytest
+
+from positions import Position, PositionBook
+
+
+def test_average_cost_and_realized_pnl():
+    position = Position('main', 'BTCUSDT', 'BTC', 'USDT')
+    position.apply('BUY', 1.0, 100.0, {})
+    position.apply('BUY', 1.0, 200.0, {})
+    assert position.quantity == 2.0
+    assert position.avg_price == 150.0
+
+    position.apply('SELL', 0.5, 150.0, {})      # sold at 300
+    assert position.realized_pnl == pytest.approx(75.0)
+    assert position.avg_price == 150.0
+    assert position.quantity == 1.5
+
+
+def test_commissions_adjust_quantity_and_cost():
+    position = Position('main', 'BTCUSDT', 'BTC', 'USDT')
+    position.apply('BUY', 1.0, 100.0, {'BTC': 0.01})
+    assert position.quantity == pytest.approx(0.99)
+    assert position.avg_price == pytest.approx(100.0 / 0.99)
+
+    position.apply('SELL', 0.99, 110.0, {'USDT': 0.11})
+    assert position.quantity == 0.0
+    assert position.avg_price == 0.0
+    assert position.realized_pnl == pytest.approx(110.0 - 0.11 - 100.0)
+    assert position.fees == {'BTC': 0.01, 'USDT': 0.11}
+
+
+def test_selling_more_than_tracked_is_not_a_short():
+    position = Position('main', 'BTCUSDT', 'BTC', 'USDT')
+    position.apply('BUY', 1.0, 100.0, {})
+    position.apply('SELL', 3.0, 360.0, {})
+    assert position.quantity == 0.0
+    assert position.realized_pnl == pytest.approx(20.0)
+    assert position.untracked_sold == 2.0
+
+
+def test_book_applies_simulator_fills(sim):
+    prices = {'BTCUSDT': 50000.0}
+    book = PositionBook(mark_price=prices.get)
+    buy = sim.create_order({'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'MARKET', 'quantity': '0.01'})
+    data = book.apply_order('main', 'BTCUSDT', buy, 'BTC', 'USDT')
+    assert data['quantity'] == pytest.approx(0.01 * (1 - sim.config['fee_rate']))
+    assert data['avg_price'] * data['quantity'] == pytest.approx(500.0)
+
+    prices['BTCUSDT'] = 55000.0
+    marked = book.get('main', 'BTCUSDT')
+    assert marked['unrealized_pnl'] == pytest.approx(marked['quantity'] * (55000.0 - marked['avg_price']))
+    assert book.totals(book.all())['USDT']['unrealized_pnl'] == pytest.approx(marked['unrealized_pnl'])
+
+    assert book.apply_order('main', 'BTCUSDT', {'side': 'BUY', 'executedQty': '0'}, 'BTC', 'USDT') is None
+    assert book.all(account='other') == []
+
+
+def test_book_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'positions.json')
+    book = PositionBook(path=path)
+    book.apply_order('swing', 'ETHUSDT', {'side': 'BUY', 'executedQty': '2', 'cummulativeQuoteQty': '6000',
+                                          'fills': [{'commission': '0.002', 'commissionAsset': 'ETH'}]},
+                     'ETH', 'USDT')
+    assert book.save()
+    assert not book.save()      # unchanged since the last snapshot
+
+    restored = PositionBook(path=path)
+    assert restored.load() == 1
+    assert restored.get('swing', 'ETHUSDT') == book.get('swing', 'ETHUSDT')
@@ -0,0 +1,96 @@
+"""
+Tests for price_cache.py - stream frame parsing, price staleness and the stream
+subscriber against a local fake market-data server
+"""
+
+import json
+import threading
+import time
+
+import pytest
+from websockets.sync.server import serve
+
+import trading_core
+from price_cache import PriceBook, PriceStream, parse_stream_message
+from routing import Route, Router
+
+
+def book_ticker(symbol, bid, ask):
+    return json.dumps({'stream': f'{symbol.lower()}@bookTicker',
+                       'data': {'u': 1, 's': symbol, 'b': str(bid), 'B': '1', 'a': str(ask), 'A': '1'}})
+
+
+def trade(symbol, price):
+    return json.dumps({'e': 'trade', 'E': 1, 's': symbol, 't': 7, 'p': str(price), 'q': '1', 'b': 88, 'a': 50})
+
+
+@pytest.fixture
+def stream_server():
+    """
+    Fake Binance stream endpoint. Each connection is answered with the next list
+    of frames from `server.sessions`, then closed (the last list is kept open).
+    """
+    class Server:
+        sessions = []
+        paths = []
+
+    def handler(ws):
+        Server.paths.append(ws.request.path)
+        session = min(len(Server.paths), len(Server.sessions)) - 1
+        for frame in Server.sessions[session]:
+            ws.send(frame)
+        if session == len(Server.sessions) - 1:
+            for _ in ws:
+                pass
+
+    with serve(handler, '127.0.0.1', 0) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        Server.url = f"ws://127.0.0.1:{server.socket.getsockname()[1]}"
+        yield Server
+        server.shutdown()
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_stream_frames():
+    assert parse_stream_message(book_ticker('BTCUSDT', 100, 102)) == ('BTCUSDT', 101.0)
+    assert parse_stream_message(trade('ETHUSDT', 3000.5)) == ('ETHUSDT', 3000.5)
+    assert parse_stream_message('{"e": "24hrMiniTicker", "s": "BNBUSDT", "c": "600"}') == ('BNBUSDT', 600.0)
+    assert parse_stream_message('{"result": null, "id": 1}') is None
+
+
+def test_stale_prices_are_not_served():
+    book = PriceBook()
+    book.update('btcusdt', 50000, ts=time.time() - 10)
+    assert book.get('BTCUSDT') == 50000
+    assert book.get('BTCUSDT', max_age=5) is None
+    book.update('BTCUSDT', 50100)
+    assert book.get('BTCUSDT', max_age=5) == 50100
+
+
+def test_stream_reconnects_after_the_server_drops_it(stream_server):
+    stream_server.sessions = [[book_ticker('BTCUSDT', 100, 102)], [trade('BTCUSDT', 105), trade('ETHUSDT', 3000)]]
+    book = PriceBook()
+    stream = PriceStream(book, ['BTCUSDT', 'ethusdt'], url=stream_server.url, stream_type='trade', backoff=0.05)
+    stream.start()
+    try:
+        assert wait_for(lambda: book.get('ETHUSDT') == 3000)
+        assert book.get('BTCUSDT') == 105
+        assert stream.connects == 2 and stream.connected
+    finally:
+        stream.stop()
+    assert stream_server.paths[0] == '/stream?streams=btcusdt@trade/ethusdt@trade'
+
+
+def test_default_symbols_come_from_the_routes(monkeypatch):
+    monkeypatch.setattr(trading_core, 'PRICE_SYMBOLS', [])
+    monkeypatch.setattr(trading_core, 'price_stream', PriceStream(PriceBook(), ['BTCUSDT']))
+    monkeypatch.setattr(trading_core.price_stream, 'start', lambda: None)
+    router = Router({}, [Route('main', 'ethusdt'), Route('main', 'BNBUSDT'), Route('main', strategy='scalp')], 'main')
+    trading_core.start_price_stream(router)
+    assert trading_core.price_stream.symbols == sorted({trading_core.TRADING_PAIR, 'BNBUSDT', 'ETHUSDT'})
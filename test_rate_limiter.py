@@ -0,0 +1,89 @@
+"""
+Tests for rate_limiter.py - header re-sync, priority shedding and the async client wrapper
+"""
+
+import asyncio
+
+import pytest
+from binance.client import AsyncClient
+
+from exchange_sim import simulator_client
+from rate_limiter import (AsyncLimitedClient, LimitedClient, RateLimiter, RateLimitExceeded,
+                          PRIORITY_DASHBOARD, PRIORITY_ORDER, PRIORITY_TRADE)
+
+
+def test_used_weight_header_resyncs_the_budget_and_sheds_the_dashboard(sim, sim_client):
+    limiter = RateLimiter(weight_per_minute=100, dashboard_reserve=0.3, max_wait=0.05)
+    client = LimitedClient(sim_client, limiter)
+    # Another process on the same IP has spent most of the exchange's budget
+    sim.used_weight = 50
+
+    client.get_account()
+    assert limiter.used_weight_1m == 70
+    assert limiter.stats()['weight_available'] <= 30
+
+    with limiter.priority(PRIORITY_DASHBOARD):
+        with pytest.raises(RateLimitExceeded):
+            client.get_account()
+    # Trade reads may still dip into the dashboard reserve, orders into everything
+    client.ping()
+    limiter.acquire(25, PRIORITY_ORDER)
+    assert limiter.counters['shed'] == 1
+
+
+def test_429_blocks_every_call_until_retry_after(sim, sim_client):
+    sim.configure(weight_limit=25)
+    limiter = RateLimiter(max_wait=0.05)
+    client = LimitedClient(sim_client, limiter)
+    client.get_account()
+    with pytest.raises(Exception) as e:
+        client.get_account()
+    assert e.value.status_code == 429
+    with pytest.raises(RateLimitExceeded, match='backoff'):
+        client.ping()
+    assert limiter.counters['backoffs'] == 1
+
+
+def test_async_acquire_waits_off_the_event_loop():
+    limiter = RateLimiter(weight_per_minute=600, trade_reserve=0, max_wait=1)
+    limiter.weight.tokens = 0
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await limiter.acquire_async(2, PRIORITY_TRADE)      # ~0.2s at 10 weight/s
+        ticker.cancel()
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire_async(50, PRIORITY_DASHBOARD)
+        return ticks
+
+    assert asyncio.run(run()) > 5
+    assert limiter.counters['waits'] == 1
+
+
+def test_async_client_is_charged_to_the_shared_budget(sim_server, sim):
+    url, _ = sim_server
+    limiter = RateLimiter()
+
+    async def run():
+        client = AsyncLimitedClient(await simulator_client(AsyncClient, url).create('k', 's'), limiter)
+        try:
+            with limiter.priority(PRIORITY_DASHBOARD):
+                first, second = await asyncio.gather(client.get_account(), client.get_account())
+            await client.create_order(symbol='BTCUSDT', side='BUY', type='MARKET', quantity='0.01')
+            return first is second
+        finally:
+            await client.wrapped.close_connection()
+
+    assert asyncio.run(run())
+    stats = limiter.stats()
+    assert (stats['calls'], stats['coalesced']) == (2, 1)
+    assert stats['used_weight_1m'] == sim.used_weight     # create() pings before the calls above
+    assert stats['orders_available'] == {'main': 99}
@@ -0,0 +1,99 @@
+"""
+Tests for reconciler.py - paging allOrders/myTrades from the simulator into the fills table
+"""
+
+import pytest
+from binance.client import Client
+
+from exchange_sim import SimExchange, simulator_client, start_in_thread
+from reconciler import FillReconciler, aggregate_trades
+from trade_journal import TradeJournal
+
+
+def place(sim, symbol, side, quantity):
+    return sim.create_order({'symbol': symbol, 'side': side, 'type': 'MARKET', 'quantity': quantity})
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return TradeJournal(str(tmp_path / 'journal.db'), flush_interval=0.01)
+
+
+def journal_order(journal, order, symbol=None, quantity=None):
+    journal.append({'timestamp': '2024-01-01T12:00:00', 'signal': order['side'].lower(),
+                    'symbol': symbol or order['symbol'], 'price': 0, 'order_id': order['orderId'],
+                    'status': 'success', 'quantity': quantity or order['executedQty']})
+
+
+def test_aggregate_trades_sums_per_order():
+    trades = [
+        {'orderId': 1, 'qty': '0.5', 'quoteQty': '50', 'commission': '0.001', 'commissionAsset': 'BTC',
+         'isBuyer': True},
+        {'orderId': 1, 'qty': '0.5', 'quoteQty': '60', 'commission': '0.06', 'commissionAsset': 'USDT',
+         'isBuyer': True},
+        {'orderId': 2, 'qty': '1', 'quoteQty': '100', 'commission': '0', 'isBuyer': False},
+    ]
+    orders = aggregate_trades(trades)
+    assert orders[1] == {'qty': 1.0, 'quote_qty': 110.0, 'commission': {'BTC': 0.001, 'USDT': 0.06},
+                         'count': 2, 'side': 'BUY'}
+    assert orders[2]['side'] == 'SELL'
+    assert orders[2]['commission'] == {}
+
+
+def test_paging_resumes_from_the_high_water_marks(sim, sim_client, journal):
+    elsewhere = place(sim, 'ETHUSDT', 'BUY', '0.01')
+    orders = [place(sim, 'BTCUSDT', 'BUY' if i % 2 == 0 else 'SELL', '0.001') for i in range(7)]
+    for order in orders[:5]:
+        journal_order(journal, order)
+    journal_order(journal, orders[5], quantity='0.002')      # journal disagrees with the fill
+    journal_order(journal, elsewhere, symbol='BTCUSDT')      # never returned by BTCUSDT allOrders
+    # orders[6] was placed outside the bot, so it is not journaled
+    journal.flush()
+
+    reconciler = FillReconciler(journal, lambda: [('main', sim_client)], page_limit=2, max_pages=2)
+
+    first = reconciler.run_once()
+    assert (first['orders'], first['trades'], first['requests']) == (4, 4, 4)
+    assert not first['caught_up']
+    assert first['matched'] == 4
+
+    second = reconciler.run_once()
+    assert (second['orders'], second['trades']) == (3, 3)
+    assert second['caught_up']
+    assert (second['matched'], second['mismatch'], second['unjournaled']) == (1, 1, 1)
+
+    third = reconciler.run_once()
+    assert (third['orders'], third['trades'], third['requests']) == (0, 0, 2)
+
+    assert journal.fill_summary() == {'matched': 5, 'mismatch': 1, 'unjournaled': 1, 'missing': 1}
+    fill = journal.get_fills('BTCUSDT', [orders[0]['orderId']])[orders[0]['orderId']]
+    assert fill['avg_price'] == pytest.approx(sim.prices['BTCUSDT'])
+    assert fill['trade_count'] == 1
+    assert journal.get_meta('reconcile:main:BTCUSDT:order') == str(orders[-1]['orderId'] + 1)
+
+
+def test_symbols_without_journaled_orders_can_be_added(sim, sim_client, journal):
+    place(sim, 'BNBUSDT', 'BUY', '0.1')
+    journal.start()
+    reconciler = FillReconciler(journal, lambda: [('main', sim_client), ('idle', None)],
+                                symbols=lambda: ['BNBUSDT'])
+    report = reconciler.run_once()
+    assert report['unjournaled'] == 1
+    assert report['errors'] == []
+    assert reconciler.stats()['fills'] == {'unjournaled': 1}
+
+
+def test_missing_orders_are_flagged_when_another_account_never_traded_the_symbol(sim, sim_client, journal):
+    idle_url, _ = start_in_thread(SimExchange())
+    idle_client = simulator_client(Client, idle_url)('idle-key', 'idle-secret')
+    elsewhere = place(sim, 'ETHUSDT', 'BUY', '0.01')
+    orders = [place(sim, 'BTCUSDT', 'BUY', '0.001') for _ in range(3)]
+    for order in orders:
+        journal_order(journal, order)
+    journal_order(journal, elsewhere, symbol='BTCUSDT')
+    journal.flush()
+
+    reconciler = FillReconciler(journal, lambda: [('main', sim_client), ('idle', idle_client)])
+    report = reconciler.run_once()
+    assert (report['matched'], report['missing']) == (3, 1)
+    assert journal.get_meta('reconcile:idle:BTCUSDT:order') == '0'
@@ -0,0 +1,48 @@
+"""
+Tests for replay.py - offline backtests through the shared order path
+"""
+
+import json
+import math
+import subprocess
+import sys
+from pathlib import Path
+
+REPO = Path(__file__).parent
+
+# Refuses every outbound connection, then runs replay.py as a script
+NO_NETWORK = """
+import runpy, socket, sys
+def refuse(*args, **kwargs):
+    raise OSError('network access during replay')
+socket.socket.connect = refuse
+socket.create_connection = refuse
+sys.argv = ['replay.py'] + sys.argv[1:]
+runpy.run_module('replay', run_name='__main__')
+assert 'webhook_server' not in sys.modules
+"""
+
+
+def write_candles(path, count=300):
+    with open(path, 'w') as f:
+        f.write('time,open,high,low,close,volume\n')
+        for i in range(count):
+            close = 30000 + 2000 * math.sin(i / 15)
+            f.write(f'{1700000000000 + i * 60000},{close},{close},{close},{close},1\n')
+
+
+def test_backtest_runs_offline_without_side_effects(tmp_path):
+    write_candles(tmp_path / 'candles.csv')
+    (tmp_path / 'trade_history.csv').write_text('timestamp,signal,symbol,price,order_id,status,quantity,error\n')
+    before = sorted(p.name for p in tmp_path.iterdir())
+    result = subprocess.run(
+        [sys.executable, '-c', NO_NETWORK, '--ohlcv', 'candles.csv', '--symbol', 'BTCUSDT',
+         '--quantity', '0.01', '--rules', 'simple'],
+        cwd=tmp_path, capture_output=True, text=True,
+        env={'PYTHONPATH': str(REPO), 'PATH': '/usr/bin:/bin'}
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report['results']['success'] == report['fills'] > 0
+    # No log file, journal, position snapshot or import of the legacy CSV in the working directory
+    assert sorted(p.name for p in tmp_path.iterdir()) == before
@@ -0,0 +1,104 @@
+"""
+Tests for routing.py - route resolution, sizing and the JSON config loader
+"""
+
+import json
+
+import pytest
+
+from routing import Account, Route, Router, load_routing_config
+
+
+@pytest.fixture
+def router():
+    accounts = {name: Account(name, None, None) for name in ('main', 'swing', 'scalp')}
+    routes = [
+        Route('main', quantity=0.001),
+        Route('swing', symbol='ETHUSDT', quote_amount=300, use_alert_quantity=False),
+        Route('scalp', symbol='BTCUSDT', strategy='scalper', quantity=0.002, max_quantity=0.005),
+        Route('main', symbol='BNBUSDT', account_tag='main', quantity=1),
+    ]
+    return Router(accounts, routes, 'main')
+
+
+def test_most_specific_route_wins(router):
+    account, route = router.resolve('btcusdt', 'scalper')
+    assert account.name == 'scalp'
+    assert route.quantity == 0.002
+
+    account, route = router.resolve('BTCUSDT', 'other')
+    assert account.name == 'main'
+    assert route.symbol == '*'
+
+
+def test_account_tag_redirects_unless_the_route_pins_one(router):
+    account, route = router.resolve('ETHUSDT', None, 'scalp')
+    assert account.name == 'scalp'
+    assert route.quote_amount == 300
+
+    # The BNBUSDT rule only matches the 'main' tag; other tags fall through to the catch-all
+    assert router.resolve('BNBUSDT', None, 'main')[1].quantity == 1
+    assert router.resolve('BNBUSDT', None, 'swing')[0].name == 'swing'
+
+
+def test_unknown_account_tag_is_rejected_before_wildcard_routes(router):
+    with pytest.raises(ValueError, match='swnig'):
+        router.resolve('BTCUSDT', None, 'swnig')
+
+
+def test_route_only_tags_are_known():
+    accounts = {'main': Account('main', None, None)}
+    router = Router(accounts, [Route('main', account_tag='aggressive', quantity=0.01)], 'main')
+    assert router.resolve('BTCUSDT', None, 'aggressive')[1].quantity == 0.01
+
+
+def test_unknown_account_tag_without_a_rule():
+    router = Router({'main': Account('main', None, None)}, [], 'main')
+    assert router.resolve('BTCUSDT')[0].name == 'main'
+    with pytest.raises(ValueError):
+        router.resolve('BTCUSDT', None, 'nobody')
+
+
+def test_route_sizing_precedence(router):
+    _, scalp = router.resolve('BTCUSDT', 'scalper')
+    assert scalp.size(0.003, 50000, 0.001) == 0.003
+    assert scalp.size(0.01, 50000, 0.001) == 0.005    # capped by max_quantity
+    assert scalp.size(None, 50000, 0.001) == 0.002
+
+    _, swing = router.resolve('ETHUSDT')
+    assert swing.size(5, 3000, 0.001) == pytest.approx(0.1)    # alert quantity ignored
+    assert Route('main').size(None, 50000, 0.001) == 0.001
+
+
+def test_netted_quantity_skips_sizing_but_not_the_cap(router):
+    _, swing = router.resolve('ETHUSDT')
+    assert swing.size(0.7, 3000, 0.001, netted=True) == 0.7
+    _, scalp = router.resolve('BTCUSDT', 'scalper')
+    assert scalp.size(0.5, 50000, 0.001, netted=True) == 0.005
+
+
+def test_load_routing_config(tmp_path):
+    path = tmp_path / 'routes.json'
+    path.write_text(json.dumps({
+        'accounts': {'swing': {'api_key_env': 'SWING_KEY'}},
+        'routes': [{'symbol': 'ETHUSDT', 'account': 'swing', 'quote_amount': 100}],
+    }))
+    made = []
+
+    def make_account(name, settings):
+        made.append((name, settings))
+        return Account(name, None, None, settings=settings)
+
+    router = load_routing_config(str(path), make_account, Account('main', None, None))
+    assert made == [('swing', {'api_key_env': 'SWING_KEY'})]
+    account, route = router.resolve('ETHUSDT')
+    assert account.name == 'swing'
+    assert account.settings == {'api_key_env': 'SWING_KEY'}
+    assert route.quote_amount == 100
+
+
+def test_route_to_an_unknown_account_is_rejected(tmp_path):
+    path = tmp_path / 'routes.json'
+    path.write_text(json.dumps({'routes': [{'symbol': 'ETHUSDT', 'account': 'ghost'}]}))
+    with pytest.raises(ValueError):
+        load_routing_config(str(path), None, Account('main', None, None))
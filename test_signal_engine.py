@@ -0,0 +1,91 @@
+"""
+Tests for signal_engine.py - closed-candle handling, back-fill and alert_id de-duplication
+on the shared alert path
+"""
+
+import json
+import math
+
+import pytest
+
+import trading_core
+from dedup import AlertIndex
+from signal_engine import SignalEngine, parse_kline_message
+
+START = 1704067200000   # 2024-01-01T00:00:00Z
+MINUTE = 60000
+
+# Closes that cross the EMAs both ways several times
+CANDLES = [(START + i * MINUTE, 30000 + 2000 * math.sin(i / 15)) for i in range(300)]
+
+
+def kline(open_time, close, closed=True):
+    return json.dumps({'stream': 'btcusdt@kline_1m', 'data': {'e': 'kline', 's': 'BTCUSDT', 'k': {
+        's': 'BTCUSDT', 't': open_time, 'T': open_time + MINUTE - 1, 'c': str(close), 'x': closed}}})
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """The shared alert path with de-duplication on; executed alerts are collected in `.executed`"""
+    monkeypatch.setattr(trading_core, 'DEDUP_ENABLED', True)
+    monkeypatch.setattr(trading_core, 'COALESCE_WINDOW', 0)
+    monkeypatch.setattr(trading_core, 'ORDER_QUEUE_ENABLED', False)
+    monkeypatch.setattr(trading_core, 'alert_index', AlertIndex(ttl=300))
+    executed = []
+
+    def execute(alert):
+        executed.append(alert)
+        return {'status': 'success'}, 200
+
+    pipeline = trading_core.AlertPipeline(lambda: None, execute)
+    pipeline.executed = executed
+    return pipeline
+
+
+def engine(dispatch, **kwargs):
+    return SignalEngine(['BTCUSDT'], dispatch, synchronous=True, **kwargs)
+
+
+def test_only_closed_candles_are_used():
+    assert parse_kline_message(kline(START, 100.5, closed=False)) is None
+    assert parse_kline_message(kline(START, 100.5)) == ('BTCUSDT', START, 100.5, START + MINUTE - 1)
+
+
+def test_replayed_bars_do_not_trade_twice(pipeline):
+    first = engine(pipeline.handle)
+    for open_time, close in CANDLES:
+        first.on_message(kline(open_time, close))
+    signals = len(pipeline.executed)
+    assert signals > 2 and first.stats()['signals'] == signals
+    assert len({alert['alert_id'] for alert in pipeline.executed}) == signals
+
+    # The stream resends a bar: the engine itself ignores bars it has seen
+    first.on_message(kline(*CANDLES[-1]))
+    assert first.bars == len(CANDLES)
+
+    # A restarted engine sees the same bars again: the alert path drops them by alert_id
+    second = engine(pipeline.handle)
+    for open_time, close in CANDLES:
+        second.on_candle('BTCUSDT', open_time, close)
+    assert len(pipeline.executed) == signals
+    assert trading_core.alert_index.duplicates == signals
+    assert second.last_signal['result'] == 'duplicate'
+
+
+def test_missed_bars_are_back_filled_without_trading(pipeline):
+    requests = []
+
+    def fetch_klines(symbol, interval, limit, startTime=None):
+        requests.append(startTime)
+        return [[t, '0', '0', '0', str(c), '0', t + MINUTE - 1] for t, c in CANDLES if t >= (startTime or 0)][:limit]
+
+    gapped = engine(pipeline.handle, fetch_klines=fetch_klines, warmup=0)
+    for open_time, close in CANDLES[:100]:
+        gapped.on_candle('BTCUSDT', open_time, close)
+    traded = len(pipeline.executed)
+    gapped.on_candle('BTCUSDT', *CANDLES[200])
+
+    assert requests == [CANDLES[100][0]]
+    assert gapped.bars == 201 and gapped.last_open['BTCUSDT'] == CANDLES[200][0]
+    # Only the live bar may trade; the 100 back-filled bars just advance the indicators
+    assert len(pipeline.executed) - traded <= 1
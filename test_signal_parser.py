@@ -0,0 +1,93 @@
+"""
+Tests for signal_parser.py - payload format dispatch and the format registry
+"""
+
+import pytest
+
+import signal_parser
+from signal_parser import parse_payload, register_format
+
+
+@pytest.mark.parametrize('content_type, body, expected', [
+    ('application/json', '{"signal": "BUY", "symbol": "ethusdt", "price": "3000", "quantity": 0.5}',
+     ('json', 'buy', 'ETHUSDT', 3000.0, 0.5)),
+    ('application/json; charset=utf-8', b'{"signal": "sell"}', ('json', 'sell', 'BTCUSDT', 0.0, None)),
+    ('text/plain', '  {"signal": "buy", "symbol": "BNBUSDT"}', ('json', 'buy', 'BNBUSDT', 0.0, None)),
+    ('text/plain', 'sell|ETHUSDT|3100.5|0.2', ('pipe', 'sell', 'ETHUSDT', 3100.5, 0.2)),
+    ('application/x-www-form-urlencoded', 'signal=buy&symbol=ethusdt&price=3000',
+     ('form', 'buy', 'ETHUSDT', 3000.0, None)),
+    ('text/plain', 'signal=sell&symbol=BNBUSDT', ('form', 'sell', 'BNBUSDT', 0.0, None)),
+    ('text/plain', 'order buy @ 0.002 filled on ETHUSDT', ('template', 'buy', 'ETHUSDT', 0.0, 0.002)),
+    ('', 'Strategy alert: order sell @ 1 filled on BNBUSDT', ('template', 'sell', 'BNBUSDT', 0.0, 1.0)),
+])
+def test_body_formats(content_type, body, expected):
+    parsed = parse_payload(content_type, body)
+    assert (parsed.format, parsed.signal, parsed.symbol, parsed.price, parsed.quantity) == expected
+
+
+def test_declared_type_falls_back_to_sniffing():
+    parsed = parse_payload('application/json', 'buy|ETHUSDT|3000')
+    assert parsed.format == 'pipe'
+
+
+def test_query_string_is_the_last_resort():
+    parsed = parse_payload('', '', args={'signal': 'buy', 'symbol': 'ethusdt', 'quantity': '0.1'})
+    assert (parsed.format, parsed.symbol, parsed.quantity) == ('query', 'ETHUSDT', 0.1)
+    assert parse_payload('application/json', '{"signal": "sell"}', args={'signal': 'buy'}).signal == 'sell'
+
+
+def test_multipart_uses_the_decoded_form():
+    parsed = parse_payload('multipart/form-data; boundary=x', b'--x...', form={'message': 'sell|BTCUSDT|1'})
+    assert (parsed.format, parsed.signal) == ('pipe', 'sell')
+
+
+def test_unparseable_payloads():
+    assert parse_payload('text/plain', '') is None
+    assert parse_payload('text/plain', 'hello world') is None
+    assert parse_payload('text/plain', 'status|ok') is None
+    assert parse_payload('application/json', '[1, 2]') is None
+
+
+def test_signal_validation():
+    assert signal_parser.signal_error('buy', 50000.0) is None
+    assert 'Invalid signal' in signal_parser.signal_error('hold', 50000.0)
+    assert 'Invalid price' in signal_parser.signal_error('sell', -1.0)
+    assert 'market price' in signal_parser.signal_error('buy', 0)
+
+
+def test_json_keeps_unknown_fields():
+    parsed = parse_payload('application/json', '{"signal": "buy", "strategy": "swing", "time": 1}')
+    assert parsed.to_dict() == {'signal': 'buy', 'symbol': 'BTCUSDT', 'price': 0.0, 'strategy': 'swing', 'time': 1}
+
+
+def test_reserved_fields_cannot_come_from_a_payload():
+    parsed = parse_payload('application/json', '{"signal": "buy", "quantity": 0.5, "coalesced": 1}')
+    assert 'coalesced' not in parsed.to_dict()
+    assert signal_parser.signal_from_dict({'signal': 'sell', 'coalesced': 3}, 'BTCUSDT', fmt='batch').extra == {}
+
+
+@pytest.fixture
+def csv_format():
+    def parse_csv(text, default_symbol, form=None):
+        fields = text.strip().split(',')
+        if len(fields) != 2:
+            return None
+        return signal_parser.TradeSignal(signal=fields[0], symbol=fields[1].upper(), format='csv')
+
+    yield register_format('csv', parse_csv, content_types=('text/csv',), first_bytes='#',
+                          sniff=lambda text: ',' in text)
+    del signal_parser.FORMATS['csv']
+    signal_parser._rebuild_tables()
+
+
+def test_registered_format_dispatch(csv_format):
+    assert parse_payload('text/csv', 'buy,ethusdt').format == 'csv'
+    assert parse_payload('text/plain', '#sell,ethusdt').signal == '#sell'
+    # Letters are still tried by the built-in formats first
+    assert parse_payload('text/plain', 'buy|ETHUSDT').format == 'pipe'
+    assert signal_parser._by_first_byte['#'][0] is csv_format
+
+
+def test_registry_only_holds_callable_parsers():
+    assert set(signal_parser.FORMATS) >= {'json', 'pipe', 'form', 'template'}
+    assert all(callable(fmt.parse) for fmt in signal_parser.FORMATS.values())
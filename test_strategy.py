@@ -0,0 +1,55 @@
+"""
+Tests for strategy.py - the vectorized and streaming modes must agree bar for bar
+"""
+
+import numpy as np
+import pytest
+
+from strategy import StrategyParams, StreamingStrategy, compute_indicators, generate_signals, signal_list
+
+
+# The full rules need an EMA and a MACD cross on the same bar; fast settings make that happen often enough
+FAST = StrategyParams(ema_fast=3, ema_slow=8, macd_fast=3, macd_slow=8, macd_signal=2)
+
+
+def random_walk(bars=5000, seed=7):
+    rng = np.random.default_rng(seed)
+    return 50000 * np.exp(np.cumsum(rng.normal(0, 0.004, bars)))
+
+
+def stream(close, params=None, rules='full'):
+    strategy = StreamingStrategy(params, rules)
+    signals = [strategy.update(c) for c in close]
+    return np.array([b for b, _ in signals]), np.array([s for _, s in signals]), strategy
+
+
+@pytest.mark.parametrize('rules, params', [('full', FAST), ('simple', None)])
+def test_streaming_matches_vectorized_signals(rules, params):
+    close = random_walk(seed=1)
+    buy, sell = generate_signals(close, params, rules)
+    stream_buy, stream_sell, _ = stream(close, params, rules)
+
+    assert buy.any() and sell.any()
+    assert signal_list(stream_buy, stream_sell) == signal_list(buy, sell)
+
+
+def test_streaming_matches_vectorized_indicators():
+    close = random_walk(bars=600, seed=11)
+    params = StrategyParams(ema_fast=9, ema_slow=21, bb_length=30)
+    indicators = compute_indicators(close, params)
+    *_, strategy = stream(close, params)
+
+    for name, value in strategy.values.items():
+        assert value == pytest.approx(indicators[name][-1], rel=1e-9), name
+
+
+def test_simple_rules_never_signal_both_ways():
+    buy, sell = generate_signals(random_walk(seed=3), rules='simple')
+    assert not (buy & sell).any()
+
+
+def test_unknown_rules_are_rejected():
+    with pytest.raises(ValueError):
+        generate_signals(random_walk(bars=10), rules='fancy')
+    with pytest.raises(ValueError):
+        StreamingStrategy(rules='fancy')
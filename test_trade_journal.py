@@ -0,0 +1,86 @@
+"""
+Tests for trade_journal.py - batched appends, the CSV migration and the incremental
+/history cursor over trades and reconciled fills
+"""
+
+import pytest
+
+from trade_journal import TradeJournal
+
+
+def trade(n, **fields):
+    return dict({'timestamp': f'2024-01-01T12:00:{n:02d}', 'signal': 'buy', 'symbol': 'BTCUSDT', 'price': 50000,
+                 'order_id': n, 'status': 'success', 'quantity': '0.001'}, **fields)
+
+
+def fill(order_id, updated_at, avg_price):
+    return {'symbol': 'BTCUSDT', 'order_id': order_id, 'side': 'BUY', 'order_status': 'FILLED',
+            'executed_qty': 0.001, 'quote_qty': avg_price * 0.001, 'avg_price': avg_price, 'commission': '{}',
+            'trade_count': 1, 'check_status': 'matched', 'updated_at': updated_at}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = TradeJournal(str(tmp_path / 'journal.db'), flush_interval=0.01)
+    journal.append_many([trade(n) for n in range(1, 6)])
+    journal.flush()
+    return journal
+
+
+def test_cursor_returns_new_trades_and_trades_whose_fill_changed(journal):
+    journal.save_fills([fill(1, '2024-01-01T13:00:00', 50010.0)])
+    mark = journal.fills_mark()
+    cursor = journal.last_id()
+
+    assert journal.query(after_id=cursor, fills_after=mark) == []
+
+    journal.save_fills([fill(2, '2024-01-01T13:05:00', 50020.0)])
+    journal.append(trade(6))
+    journal.flush()
+    rows = journal.query(after_id=cursor, fills_after=mark)
+    assert [(row['id'], row['exec_price']) for row in rows] == [(2, 50020.0), (6, None)]
+    assert journal.fills_mark() == '2024-01-01T13:05:00'
+
+    # Other filters still apply to both halves
+    assert [row['id'] for row in journal.query(after_id=cursor, fills_after=mark, limit=1)] == [2]
+    assert journal.query(after_id=cursor, fills_after=mark, symbol='ETHUSDT') == []
+
+
+def test_cursor_query_uses_indexes_not_a_scan(journal):
+    sql, params = journal._query_sql(3, None, None, None, 100, '2024-01-01T13:00:00')
+    plan = [row[3] for row in journal._reader().execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    assert not [step for step in plan if step.startswith('SCAN')], plan
+    assert any('USING INTEGER PRIMARY KEY (rowid>?)' in step for step in plan)
+    assert any('idx_fills_updated_at' in step for step in plan)
+
+
+def test_plain_cursor_and_newest_page(journal):
+    assert [row['id'] for row in journal.query(after_id=3)] == [4, 5]
+    assert [row['id'] for row in journal.query(limit=2)] == [4, 5]
+    assert [row['id'] for row in journal.query(since='2024-01-01T12:00:03')] == [4, 5]
+
+
+def test_appends_are_committed_in_batches_with_their_ids(tmp_path):
+    batches = []
+    journal = TradeJournal(str(tmp_path / 'journal.db'), batch_size=3, flush_interval=1, on_commit=batches.append)
+    for n in range(1, 8):
+        journal.append(trade(n))
+    journal.append_many([trade(8), trade(9, status='error', order_id='', price='n/a')])
+    assert journal.flush()
+
+    assert [len(batch) for batch in batches] == [3, 3, 3]
+    assert [t['id'] for batch in batches for t in batch] == list(range(1, 10))
+    assert batches[-1][-1]['order_id'] is None and batches[-1][-1]['price'] is None
+    assert [row['id'] for row in journal.query()] == list(range(1, 10))
+
+
+def test_legacy_csv_is_imported_once(tmp_path):
+    csv_path = tmp_path / 'trade_history.csv'
+    csv_path.write_text('timestamp,signal,symbol,price,order_id,status,quantity,error\n'
+                        '2023-12-31T10:00:00,buy,BTCUSDT,42000,11,success,0.001,\n'
+                        '2023-12-31T11:00:00,sell,BTCUSDT,0,,error,,Insufficient BTC balance\n')
+    journal = TradeJournal(str(tmp_path / 'journal.db'))
+    assert journal.migrate_csv(str(csv_path)) == 2
+    assert journal.migrate_csv(str(csv_path)) == 0
+    rows = journal.query()
+    assert [(row['order_id'], row['error']) for row in rows] == [(11, None), (None, 'Insufficient BTC balance')]
@@ -0,0 +1,374 @@
+"""
+Trade Journal - Append-only SQLite trade store
+Replaces the reopen-per-write trade_history.csv with a WAL-mode database,
+a batched background writer and indexes for the dashboard queries
+
+Usage:
+    python trade_journal.py --migrate trade_history.csv   - One-shot import of the old CSV history
+"""
+
+import csv
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+TRADE_COLUMNS = ['timestamp', 'signal', 'symbol', 'price', 'order_id', 'status', 'quantity', 'error']
+
+# Exchange-side view of an order, written by the fill reconciler (reconciler.py)
+FILL_COLUMNS = ['symbol', 'order_id', 'side', 'order_status', 'executed_qty', 'quote_qty', 'avg_price',
+                'commission', 'trade_count', 'order_time', 'check_status', 'note', 'updated_at']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    signal TEXT,
+    symbol TEXT,
+    price REAL,
+    order_id INTEGER,
+    status TEXT,
+    quantity TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades (symbol);
+CREATE INDEX IF NOT EXISTS idx_trades_status ON trades (status);
+CREATE INDEX IF NOT EXISTS idx_trades_order_id ON trades (order_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS fills (
+    symbol TEXT NOT NULL,
+    order_id INTEGER NOT NULL,
+    side TEXT,
+    order_status TEXT,
+    executed_qty REAL,
+    quote_qty REAL,
+    avg_price REAL,
+    commission TEXT,
+    trade_count INTEGER,
+    order_time INTEGER,
+    check_status TEXT,
+    note TEXT,
+    updated_at TEXT,
+    PRIMARY KEY (symbol, order_id)
+);
+CREATE INDEX IF NOT EXISTS idx_fills_check_status ON fills (check_status);
+CREATE INDEX IF NOT EXISTS idx_fills_updated_at ON fills (updated_at);
+"""
+
+
+def _to_float(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_text(value):
+    return None if value in (None, '') else str(value)
+
+
+def normalize_trade(trade):
+    """Coerce a trade dict (from the server or a CSV row) into a journal row tuple"""
+    return (
+        _to_text(trade.get('timestamp')) or '',
+        _to_text(trade.get('signal')),
+        _to_text(trade.get('symbol')),
+        _to_float(trade.get('price')),
+        _to_int(trade.get('order_id')),
+        _to_text(trade.get('status')),
+        _to_text(trade.get('quantity')),
+        _to_text(trade.get('error')),
+    )
+
+
+class TradeJournal:
+    """
+    SQLite trade store with a single background writer.
+
+    append() only puts the row on an in-memory queue; the writer thread commits
+    queued rows in batches (up to batch_size rows or every flush_interval
+    seconds), so callers never wait on disk I/O. Readers use their own
+    per-thread connections, which WAL mode lets run alongside the writer.
+
+    on_commit, if given, is called from the writer thread with the list of
+    trade dicts (including their new ids) after each committed batch.
+    """
+
+    def __init__(self, path, batch_size=100, flush_interval=0.2, on_commit=None):
+        self.path = path
+        self.on_commit = on_commit
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self):
+        """Per-thread read connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.start()
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def start(self):
+        """Create the schema and start the writer thread (idempotent)"""
+        with self._start_lock:
+            if self._thread:
+                return
+            conn = self._connect()
+            conn.executescript(SCHEMA)
+            conn.commit()
+            self._thread = threading.Thread(target=self._writer, args=(conn,), name="trade-journal-writer", daemon=True)
+            self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, trade):
+        """Queue a trade dict for writing"""
+        self.start()
+        self._queue.put(('row', normalize_trade(trade)))
+
+    def append_many(self, trades):
+        """Queue several trades to be committed in the same transaction"""
+        self.start()
+        self._queue.put(('rows', [normalize_trade(t) for t in trades]))
+
+    def flush(self, timeout=5):
+        """Block until every trade queued so far has been committed"""
+        self.start()
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def _writer(self, conn):
+        insert = f"INSERT INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * len(TRADE_COLUMNS))})"
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1][0] != 'flush' and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    break
+            rows = []
+            waiters = []
+            for kind, payload in batch:
+                if kind == 'row':
+                    rows.append(payload)
+                elif kind == 'rows':
+                    rows.extend(payload)
+                else:
+                    waiters.append(payload)
+            if rows:
+                try:
+                    with conn:
+                        ids = [conn.execute(insert, row).lastrowid for row in rows]
+                except Exception as e:
+                    logger.error(f"Failed to write {len(rows)} trade(s) to journal: {e}")
+                    ids = None
+                if ids and self.on_commit:
+                    try:
+                        self.on_commit([dict(zip(['id'] + TRADE_COLUMNS, (i,) + row)) for i, row in zip(ids, rows)])
+                    except Exception as e:
+                        logger.error(f"Trade journal commit callback failed: {e}")
+            for done in waiters:
+                done.set()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def last_id(self):
+        """Id of the newest committed trade (0 when empty)"""
+        return self._reader().execute('SELECT COALESCE(MAX(id), 0) FROM trades').fetchone()[0]
+
+    def fills_mark(self):
+        """updated_at of the most recently written fill ('' when none): changes whenever a fill does"""
+        return self._reader().execute("SELECT COALESCE(MAX(updated_at), '') FROM fills").fetchone()[0]
+
+    def query(self, after_id=None, since=None, symbol=None, status=None, limit=None, fills_after=None):
+        """
+        Trades matching the filters, oldest first.
+
+        after_id returns only trades newer than that id (the incremental
+        cursor); with fills_after (a fills_mark()), older trades whose fill was
+        written after that mark are returned as well. Without after_id and with
+        a limit, the newest `limit` trades are returned. since filters on
+        timestamp (ISO string, exclusive).
+        Each trade carries the reconciled execution price (exec_price) and
+        check result (reconciled) once the fill reconciler has seen its order.
+        """
+        sql, params = self._query_sql(after_id, since, symbol, status, limit, fills_after)
+        return [dict(row) for row in self._reader().execute(sql, params).fetchall()]
+
+    def _query_sql(self, after_id, since, symbol, status, limit, fills_after):
+        clauses = []
+        params = []
+        if after_id is not None and fills_after is not None:
+            # A UNION of two index searches (new rowids, recently written fills), not an OR
+            # over the join, which SQLite can only answer by scanning every trade
+            clauses.append("t.id IN (SELECT id FROM trades WHERE id > ? UNION "
+                           "SELECT ft.id FROM fills uf JOIN trades ft "
+                           "ON ft.symbol = uf.symbol AND ft.order_id = uf.order_id WHERE uf.updated_at > ?)")
+            params.extend((after_id, fills_after))
+        elif after_id is not None:
+            clauses.append('t.id > ?')
+            params.append(after_id)
+        if since:
+            clauses.append('t.timestamp > ?')
+            params.append(since)
+        if symbol:
+            clauses.append('t.symbol = ?')
+            params.append(symbol)
+        if status:
+            clauses.append('t.status = ?')
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        columns = (f"t.id, {', '.join('t.' + c for c in TRADE_COLUMNS)}, "
+                   "f.avg_price AS exec_price, f.check_status AS reconciled")
+        source = "trades t LEFT JOIN fills f ON f.symbol = t.symbol AND f.order_id = t.order_id"
+        if limit and after_id is None:
+            sql = f"SELECT * FROM (SELECT {columns} FROM {source} {where} ORDER BY t.id DESC LIMIT ?) ORDER BY id"
+            params.append(limit)
+        elif limit:
+            sql = f"SELECT {columns} FROM {source} {where} ORDER BY t.id LIMIT ?"
+            params.append(limit)
+        else:
+            sql = f"SELECT {columns} FROM {source} {where} ORDER BY t.id"
+        return sql, params
+
+    def get_meta(self, key):
+        row = self._reader().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        conn = self._reader()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    # ------------------------------------------------------------------
+    # Reconciled fills
+    # ------------------------------------------------------------------
+
+    def order_symbols(self):
+        """Symbols that have journaled orders"""
+        rows = self._reader().execute('SELECT DISTINCT symbol FROM trades WHERE order_id IS NOT NULL').fetchall()
+        return [row[0] for row in rows if row[0]]
+
+    def _by_order(self, table, symbol, order_ids):
+        result = {}
+        order_ids = list(order_ids)
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(order_ids), 500):
+            chunk = order_ids[i:i + 500]
+            sql = f"SELECT * FROM {table} WHERE symbol = ? AND order_id IN ({', '.join('?' * len(chunk))})"
+            for row in self._reader().execute(sql, [symbol, *chunk]).fetchall():
+                result[row['order_id']] = dict(row)
+        return result
+
+    def get_fills(self, symbol, order_ids):
+        """Stored fills for these orders: {order_id: fill dict}"""
+        return self._by_order('fills', symbol, order_ids)
+
+    def trades_for_orders(self, symbol, order_ids):
+        """Journaled trades for these orders: {order_id: trade dict}"""
+        self.flush()
+        return self._by_order('trades', symbol, order_ids)
+
+    def unreconciled_orders(self, symbol, below_order_id):
+        """Successful trades with an order id below `below_order_id` that have no fill row"""
+        self.flush()
+        rows = self._reader().execute(
+            "SELECT t.* FROM trades t LEFT JOIN fills f ON f.symbol = t.symbol AND f.order_id = t.order_id "
+            "WHERE t.symbol = ? AND t.status = 'success' AND t.order_id < ? AND f.order_id IS NULL",
+            (symbol, below_order_id)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_fills(self, fills, meta=None):
+        """Upsert fill rows and update meta keys (e.g. paging cursors) in one transaction"""
+        insert = f"INSERT OR REPLACE INTO fills ({', '.join(FILL_COLUMNS)}) VALUES ({', '.join('?' * len(FILL_COLUMNS))})"
+        conn = self._reader()
+        with conn:
+            conn.executemany(insert, [tuple(f.get(c) for c in FILL_COLUMNS) for f in fills])
+            for key, value in (meta or {}).items():
+                conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def fill_summary(self):
+        """Number of fill rows per check status"""
+        rows = self._reader().execute('SELECT check_status, COUNT(*) FROM fills GROUP BY check_status').fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def flagged_fills(self, limit=100):
+        """Most recent fills whose check found a problem"""
+        rows = self._reader().execute(
+            "SELECT * FROM fills WHERE check_status IN ('mismatch', 'missing', 'unjournaled') "
+            "ORDER BY updated_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # ------------------------------------------------------------------
+    # Migration
+    # ------------------------------------------------------------------
+
+    def migrate_csv(self, csv_path):
+        """
+        Import an old trade_history.csv once. The import is recorded in the
+        meta table, so calling this again is a no-op. Returns rows imported.
+        """
+        if self.get_meta('migrated_csv'):
+            return 0
+        if not os.path.exists(csv_path):
+            return 0
+        with open(csv_path, 'r', newline='') as f:
+            rows = [normalize_trade(row) for row in csv.DictReader(f)]
+        self.flush()
+        conn = self._reader()
+        insert = f"INSERT INTO trades ({', '.join(TRADE_COLUMNS)}) VALUES ({', '.join('?' * len(TRADE_COLUMNS))})"
+        with conn:
+            conn.executemany(insert, rows)
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', ('migrated_csv', os.path.abspath(csv_path)))
+        logger.info(f"Migrated {len(rows)} trades from {csv_path} into {self.path}")
+        return len(rows)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3 and sys.argv[1] == '--migrate':
+        db_path = sys.argv[3] if len(sys.argv) > 3 else 'trade_journal.db'
+        journal = TradeJournal(db_path)
+        imported = journal.migrate_csv(sys.argv[2])
+        if imported:
+            print(f"✅ Imported {imported} trades from {sys.argv[2]} into {db_path}")
+        else:
+            print(f"⚠ Nothing imported (already migrated or {sys.argv[2]} not found)")
+    else:
+        print("Usage: python trade_journal.py --migrate <trade_history.csv> [trade_journal.db]")
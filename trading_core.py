@@ -0,0 +1,652 @@
+"""
+Trading Core - Configuration and state shared by the Flask server, the async server and replays
+Holds the settings read from the environment, the trade journal, price book,
+position ledger, rate limiter, dashboard event bus, the alert path
+(de-duplication, coalescing, order queues, sizing) and the synchronous order
+path (process_signal). Importing it has no side effects: it sets up no
+logging, creates no Binance client and starts no threads; the entry points
+do that (webhook_server.py, async_server.py, replay.py).
+"""
+
+import logging
+import os
+from datetime import datetime
+
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+
+from balance_cache import BalanceCache
+from dedup import AlertIndex, SignalCoalescer, alert_fingerprint
+from event_bus import EventBus
+from exchange_info import ExchangeInfo
+import metrics
+from order_queue import OrderQueue, QueueFullError
+from positions import PositionBook
+from price_cache import PriceBook, PriceStream, DEFAULT_STREAM_URL
+from rate_limiter import RateLimiter
+from routing import Account
+from signal_parser import signal_error
+from trade_journal import TradeJournal
+
+# Load environment variables from .env file FIRST (before reading env vars)
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    load_dotenv = None  # optional: the environment is used as it is
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Load configuration from environment variables or config file
+BINANCE_API_KEY = os.getenv('BINANCE_API_KEY', 'your_testnet_api_key')
+BINANCE_API_SECRET = os.getenv('BINANCE_API_SECRET', 'your_testnet_api_secret')
+BINANCE_TESTNET = True  # Always use testnet
+
+# Local exchange simulator (exchange_sim.py): when set, all Binance REST calls go there instead of the testnet
+BINANCE_SIMULATOR_URL = os.getenv('BINANCE_SIMULATOR_URL', '').rstrip('/')
+
+# Trading parameters
+TRADING_PAIR = os.getenv('TRADING_PAIR', 'BTCUSDT')
+TRADE_AMOUNT = float(os.getenv('TRADE_AMOUNT', '0.001'))  # Amount in base currency (BTC)
+
+# Routing: JSON file mapping symbols/strategies/account tags to accounts and sizing
+ROUTING_CONFIG = os.getenv('ROUTING_CONFIG', 'routes.json')
+
+# Exchange info (symbol filters) refresh period in seconds
+EXCHANGE_INFO_REFRESH_INTERVAL = float(os.getenv('EXCHANGE_INFO_REFRESH_INTERVAL', '3600'))
+
+# Client-side Binance rate limits (request weight per minute per IP, orders per 10s per account)
+RATE_LIMIT_WEIGHT_PER_MINUTE = int(os.getenv('RATE_LIMIT_WEIGHT_PER_MINUTE', '6000'))
+RATE_LIMIT_ORDERS_PER_10S = int(os.getenv('RATE_LIMIT_ORDERS_PER_10S', '100'))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '5'))
+
+# Alert de-duplication: repeats of an alert within DEDUP_TTL seconds are not executed again
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'true').lower() == 'true'
+DEDUP_TTL = float(os.getenv('DEDUP_TTL', '60'))
+DEDUP_FILE = os.getenv('DEDUP_FILE', '')  # Optional: persist fingerprints across restarts
+# Also fingerprint alerts with no id or bar time by their content (identical alerts within DEDUP_TTL are dropped)
+DEDUP_CONTENT_HASH = os.getenv('DEDUP_CONTENT_HASH', 'false').lower() == 'true'
+# Coalescing window in seconds (0 = off): buy/sell alerts on one symbol inside it are netted
+COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW', '0'))
+
+# Order queue: when enabled, /webhook answers 202 and orders run on a worker pool
+ORDER_QUEUE_ENABLED = os.getenv('ORDER_QUEUE_ENABLED', 'false').lower() == 'true'
+ORDER_WORKERS = int(os.getenv('ORDER_WORKERS', '4'))
+ORDER_QUEUE_SIZE = int(os.getenv('ORDER_QUEUE_SIZE', '100'))
+
+# Batch endpoint (/webhook/batch): most legs accepted per request, and threads placing them
+BATCH_MAX_LEGS = int(os.getenv('BATCH_MAX_LEGS', '50'))
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '8'))
+
+# Balance cache: seconds a snapshot may be served before a synchronous refresh,
+# and how often the background thread refreshes it
+BALANCE_MAX_AGE = float(os.getenv('BALANCE_MAX_AGE', '10'))
+BALANCE_REFRESH_INTERVAL = float(os.getenv('BALANCE_REFRESH_INTERVAL', '5'))
+
+# Price cache: symbols streamed into the local price book (default: TRADING_PAIR and every
+# symbol a route names), stream endpoint/type, and how old a streamed price may be before
+# falling back to REST
+PRICE_SYMBOLS = [s.strip().upper() for s in os.getenv('PRICE_SYMBOLS', '').split(',') if s.strip()]
+# (the live stream is off by default against the simulator, whose prices it wouldn't match)
+PRICE_STREAM_ENABLED = os.getenv('PRICE_STREAM_ENABLED', 'false' if BINANCE_SIMULATOR_URL else 'true').lower() == 'true'
+PRICE_STREAM_URL = os.getenv('PRICE_STREAM_URL', DEFAULT_STREAM_URL)
+PRICE_STREAM_TYPE = os.getenv('PRICE_STREAM_TYPE', 'bookTicker')
+PRICE_MAX_AGE = float(os.getenv('PRICE_MAX_AGE', '5'))
+
+# Position ledger: snapshot file and how often it is rewritten while positions change
+POSITIONS_FILE = os.getenv('POSITIONS_FILE', 'positions.json')
+POSITIONS_SNAPSHOT_INTERVAL = float(os.getenv('POSITIONS_SNAPSHOT_INTERVAL', '30'))
+
+# Fill reconciler: pages allOrders/myTrades in the background and checks them against the journal
+RECONCILE_ENABLED = os.getenv('RECONCILE_ENABLED', 'true').lower() == 'true'
+RECONCILE_INTERVAL = float(os.getenv('RECONCILE_INTERVAL', '60'))
+RECONCILE_MAX_PAGES = int(os.getenv('RECONCILE_MAX_PAGES', '5'))       # per endpoint, account and symbol per pass
+
+# In-process signal engine: runs the strategy on streamed closed candles instead of waiting for TradingView
+SIGNAL_ENGINE_ENABLED = os.getenv('SIGNAL_ENGINE_ENABLED', 'false').lower() == 'true'
+SIGNAL_SYMBOLS = [s.strip().upper() for s in os.getenv('SIGNAL_SYMBOLS', TRADING_PAIR).split(',') if s.strip()]
+SIGNAL_INTERVAL = os.getenv('SIGNAL_INTERVAL', '1m')
+SIGNAL_RULES = os.getenv('SIGNAL_RULES', 'simple')                # simple (trading_strategy_simple.pine) or full
+SIGNAL_WARMUP_BARS = int(os.getenv('SIGNAL_WARMUP_BARS', '500'))
+SIGNAL_STRATEGY_ID = os.getenv('SIGNAL_STRATEGY_ID', 'engine')    # strategy id the engine's alerts are routed by
+
+# Dashboard events: how often the server itself checks Binance connectivity
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', '15'))
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+# Hot-path timers (exposed on /metrics); series are bound once so recording is a single observe()
+WEBHOOK_SECONDS = metrics.histogram('webhook_request_seconds', 'Time to answer a /webhook request')
+BATCH_SECONDS = metrics.histogram('webhook_batch_request_seconds', 'Time to answer a /webhook/batch request')
+STAGE_SECONDS = metrics.histogram('webhook_stage_seconds', 'Time spent in each stage of the webhook path', ['stage'])
+PARSE_SECONDS = STAGE_SECONDS.labels('parse')
+PRICE_LOOKUP_SECONDS = STAGE_SECONDS.labels('price_lookup')
+BALANCE_CHECK_SECONDS = STAGE_SECONDS.labels('balance_check')
+ORDER_SECONDS = STAGE_SECONDS.labels('order')
+JOURNAL_WRITE_SECONDS = STAGE_SECONDS.labels('journal_write')
+SIGNALS_TOTAL = metrics.counter('webhook_signals_total', 'Signals processed, by signal and outcome', ['signal', 'status'])
+
+# Every Binance call is charged to this budget (orders first, dashboard reads last)
+rate_limiter = RateLimiter(
+    weight_per_minute=RATE_LIMIT_WEIGHT_PER_MINUTE,
+    orders_per_10s=RATE_LIMIT_ORDERS_PER_10S,
+    max_wait=RATE_LIMIT_MAX_WAIT
+)
+
+# Server-Sent Events hub for the dashboard (/events)
+event_bus = EventBus()
+
+# ============================================================================
+# TRADE HISTORY STORAGE
+# ============================================================================
+
+TRADE_HISTORY_FILE = 'trade_history.csv'  # Legacy CSV history, imported once into the journal
+TRADE_JOURNAL_FILE = os.getenv('TRADE_JOURNAL_FILE', 'trade_journal.db')
+HISTORY_MAX_LIMIT = 1000  # Largest page /history will return in one response
+
+trade_journal = TradeJournal(
+    TRADE_JOURNAL_FILE,
+    on_commit=lambda trades: [event_bus.publish('trade', trade) for trade in trades]
+)
+
+def init_trade_history():
+    """Open the trade journal and import the legacy CSV history on first run"""
+    trade_journal.start()
+    try:
+        imported = trade_journal.migrate_csv(TRADE_HISTORY_FILE)
+        if imported:
+            logger.info(f"Imported {imported} trades from {TRADE_HISTORY_FILE} into {TRADE_JOURNAL_FILE}")
+    except Exception as e:
+        logger.error(f"Failed to migrate {TRADE_HISTORY_FILE}: {e}")
+
+@JOURNAL_WRITE_SECONDS.time()
+def save_trade(timestamp, signal, symbol, price, order_id=None, status='pending', quantity=None, error=None):
+    """Queue trade for the journal writer (never blocks on disk)"""
+    try:
+        trade_journal.append({
+            'timestamp': timestamp, 'signal': signal, 'symbol': symbol, 'price': price,
+            'order_id': order_id, 'status': status, 'quantity': quantity, 'error': error
+        })
+        logger.info("Trade saved to history: %s %s @ %s", signal, symbol, price)
+    except Exception as e:
+        logger.error(f"Failed to save trade to history: {e}")
+
+@JOURNAL_WRITE_SECONDS.time()
+def save_trades(trades):
+    """Queue several trades to be committed in one journal transaction"""
+    try:
+        trade_journal.append_many(trades)
+        logger.info("%d trades saved to history", len(trades))
+    except Exception as e:
+        logger.error(f"Failed to save trades to history: {e}")
+
+def history_page(args, query_string, if_none_match=()):
+    """
+    Build a /history response (shared by the Flask and async servers)
+
+    Query parameters (all optional):
+        cursor  - only trades newer than this cursor (from a previous response), plus
+                  older ones whose reconciled fill changed since it was issued
+        since   - only trades with a timestamp after this ISO time
+        symbol  - filter by symbol
+        status  - filter by status (success/error)
+        limit   - maximum number of trades (newest ones when no cursor is given)
+
+    The cursor is "<last trade id>.<fills mark>"; a bare trade id is accepted too
+    (then only newer trades are returned).
+
+    Returns (body, etag, http_status); body is None for 304 Not Modified, which is
+    returned when nothing changed since the cursor or the If-None-Match ETag.
+    """
+    cursor_id, _, cursor_mark = (args.get('cursor') or '').partition('.')
+    try:
+        cursor = int(cursor_id) if cursor_id else None
+        limit = min(int(args['limit']), HISTORY_MAX_LIMIT) if args.get('limit') else None
+    except ValueError:
+        return {'error': 'cursor and limit must be integers'}, None, 400
+    fills_after = cursor_mark if cursor is not None and '.' in args['cursor'] else None
+    since = args.get('since')
+    symbol = (args.get('symbol') or '').upper() or None
+    status = (args.get('status') or '').lower() or None
+    
+    trade_journal.flush()
+    last_id = trade_journal.last_id()
+    # Read before querying: a fill written meanwhile is newer than the mark and is sent next time
+    mark = trade_journal.fills_mark()
+    etag = f"{last_id}.{mark}-{query_string}"
+    if etag in if_none_match or (cursor is not None and cursor >= last_id
+                                 and (fills_after is None or fills_after >= mark)):
+        return None, etag, 304
+    
+    trades = trade_journal.query(after_id=cursor, since=since, symbol=symbol, status=status, limit=limit,
+                                 fills_after=fills_after)
+    has_more = bool(limit) and cursor is not None and len(trades) == limit and trades[-1]['id'] < last_id
+    next_cursor = trades[-1]['id'] if has_more else last_id
+    return {'trades': trades, 'cursor': f"{next_cursor}.{mark}", 'has_more': has_more}, etag, 200
+
+# ============================================================================
+# BALANCES, PRICES AND POSITIONS
+# ============================================================================
+
+# Top 5 trading assets shown on the dashboard (most commonly traded)
+DASHBOARD_ASSETS = ['USDT', 'BTC', 'ETH', 'BNB', 'BUSD']
+
+def format_balances(all_balances):
+    """Dashboard view of a balance snapshot: the top trading assets that have a free balance"""
+    balances = {}
+    for asset in DASHBOARD_ASSETS:
+        entry = all_balances.get(asset)
+        if entry and entry['free'] > 0:
+            balances[asset] = {
+                'free': f"{entry['free']:.8f}",
+                'locked': f"{entry['locked']:.8f}"
+            }
+    return balances
+
+def publish_balances(snapshot):
+    """BalanceCache on_change hook: push the dashboard view to /events"""
+    event_bus.publish('balance', {'balances': format_balances(snapshot)})
+
+price_book = PriceBook()
+price_stream = PriceStream(price_book, PRICE_SYMBOLS or [TRADING_PAIR], url=PRICE_STREAM_URL,
+                           stream_type=PRICE_STREAM_TYPE)
+
+def start_price_stream(router):
+    """Start streaming PRICE_SYMBOLS, or by default TRADING_PAIR plus every symbol the routes name"""
+    if not PRICE_SYMBOLS:
+        price_stream.symbols = sorted({TRADING_PAIR, *router.symbols()})
+    price_stream.start()
+
+# Built from order fills; unrealized PnL is marked from the price book, never from a Binance call
+position_book = PositionBook(POSITIONS_FILE or None, POSITIONS_SNAPSHOT_INTERVAL, mark_price=price_book.get)
+
+def record_fill(account, symbol, order, base_asset, quote_asset):
+    """Apply a filled order to the account's balance cache and the position book"""
+    account.balance_cache.apply_order(order, base_asset, quote_asset)
+    position_book.apply_order(account.name, symbol, order, base_asset, quote_asset)
+
+# ============================================================================
+# ACCOUNTS AND SIZING
+# ============================================================================
+
+exchange_info = ExchangeInfo()
+
+def account_credentials(settings):
+    """(api_key, api_secret, testnet) from a routing-config account entry"""
+    api_key = os.getenv(settings.get('api_key_env', ''), settings.get('api_key', ''))
+    api_secret = os.getenv(settings.get('api_secret_env', ''), settings.get('api_secret', ''))
+    return api_key, api_secret, settings.get('testnet', BINANCE_TESTNET)
+
+def build_account(name, client, handler, fetch=None, settings=None, on_change=None):
+    """
+    An account around an already-built Binance client: its balance snapshot (refreshed
+    through `fetch` when given) and its own order worker lanes, which run `handler(data)`
+    """
+    settings = settings or {}
+    account = Account(name, client, BalanceCache(
+        fetch, max_age=BALANCE_MAX_AGE, refresh_interval=BALANCE_REFRESH_INTERVAL, on_change=on_change
+    ), settings=settings)
+    # Each account gets its own worker lanes so a slow account can't stall the others
+    account.order_queue = OrderQueue(
+        handler,
+        num_workers=settings.get('workers', ORDER_WORKERS),
+        max_pending=ORDER_QUEUE_SIZE
+    )
+    return account
+
+def order_size(route, data, price):
+    """
+    Order quantity for an alert: the alert's quantity if the route allows it, otherwise the
+    route's sizing (default TRADE_AMOUNT). Alerts netted by the coalescing window are already
+    sized; parsers drop 'coalesced' from payloads.
+    """
+    return route.size(data.get('quantity'), price, TRADE_AMOUNT, netted=bool(data.get('coalesced')))
+
+# ============================================================================
+# ORDER EXECUTION
+# ============================================================================
+
+@PRICE_LOOKUP_SECONDS.time()
+def get_market_price(symbol, client):
+    """Current price from the streamed price book, falling back to a REST ticker call on `client`"""
+    price = price_book.get(symbol, max_age=PRICE_MAX_AGE)
+    if price is not None:
+        return price
+    if not client:
+        return None
+    ticker = client.get_symbol_ticker(symbol=symbol)
+    price = float(ticker['price'])
+    price_book.update(symbol, price)
+    logger.info("Fetched current market price for %s via REST: %s", symbol, price)
+    return price
+
+@BALANCE_CHECK_SECONDS.time()
+def get_account_balance(symbol, account):
+    """Get account balance for a specific symbol (served from the balance cache)"""
+    try:
+        if not account.client:
+            return None
+        return account.balance_cache.get_free(symbol)
+    except Exception as e:
+        logger.error(f"Failed to get account balance: {e}")
+        return None
+
+@ORDER_SECONDS.time()
+def execute_buy_order(symbol, quantity, account):
+    """Execute a market buy order"""
+    try:
+        if not account.client:
+            raise Exception("Binance client not initialized")
+        
+        logger.info("Executing BUY order: %s %s (%s)", quantity, symbol, account.name)
+        
+        # Place market buy order
+        order = account.client.create_order(
+            symbol=symbol,
+            side=Client.SIDE_BUY,
+            type=Client.ORDER_TYPE_MARKET,
+            quantity=quantity
+        )
+        
+        logger.info("BUY order executed successfully: %s", order,
+                    extra={'order_id': order.get('orderId'), 'symbol': symbol, 'side': 'BUY', 'account': account.name})
+        return order
+    except BinanceAPIException as e:
+        error_msg = f"Binance API error: {e.message}"
+        logger.error(error_msg)
+        # The exchange disagreed with our view of the account - resync balances
+        account.balance_cache.invalidate()
+        raise Exception(error_msg)
+    except Exception as e:
+        error_msg = f"Failed to execute BUY order: {e}"
+        logger.error(error_msg)
+        raise Exception(error_msg)
+
+@ORDER_SECONDS.time()
+def execute_sell_order(symbol, quantity, account):
+    """Execute a market sell order"""
+    try:
+        if not account.client:
+            raise Exception("Binance client not initialized")
+        
+        logger.info("Executing SELL order: %s %s (%s)", quantity, symbol, account.name)
+        
+        # Place market sell order
+        order = account.client.create_order(
+            symbol=symbol,
+            side=Client.SIDE_SELL,
+            type=Client.ORDER_TYPE_MARKET,
+            quantity=quantity
+        )
+        
+        logger.info("SELL order executed successfully: %s", order,
+                    extra={'order_id': order.get('orderId'), 'symbol': symbol, 'side': 'SELL', 'account': account.name})
+        return order
+    except BinanceAPIException as e:
+        error_msg = f"Binance API error: {e.message}"
+        logger.error(error_msg)
+        # The exchange disagreed with our view of the account - resync balances
+        account.balance_cache.invalidate()
+        raise Exception(error_msg)
+    except Exception as e:
+        error_msg = f"Failed to execute SELL order: {e}"
+        logger.error(error_msg)
+        raise Exception(error_msg)
+
+def process_signal(data, router):
+    """
+    Execute a parsed signal on the account `router` picks for it and record it.
+    Prices missing from the price book are fetched through the router's default account.
+    Returns (response, http_status)
+    """
+    # Extract signal information
+    signal = str(data.get('signal', '')).lower()
+    symbol = data.get('symbol', TRADING_PAIR)
+    price = data.get('price', 0)
+    timestamp = datetime.now().isoformat()
+    
+    # If price is 0, try to get current market price
+    if price == 0:
+        try:
+            price = get_market_price(symbol, router.accounts[router.default_account].client) or 0
+        except Exception as e:
+            logger.warning(f"Could not fetch market price: {e}")
+    
+    error_msg = signal_error(signal, price)
+    if error_msg:
+        logger.error(error_msg)
+        save_trade(timestamp, signal, symbol, price, status='error', error=error_msg)
+        SIGNALS_TOTAL.labels('invalid', 'error').inc()
+        return {'error': error_msg}, 400
+    
+    # Execute trade based on signal
+    order = None
+    order_id = None
+    quantity = None
+    status = 'success'
+    error = None
+    base_asset, quote_asset = exchange_info.assets(symbol)
+    
+    try:
+        # Pick the account and sizing rule for this alert
+        account, route = router.resolve(symbol, data.get('strategy'), data.get('account'))
+        
+        # Quantity from alert if the route allows it, otherwise the route's sizing (see order_size)
+        trade_quantity = order_size(route, data, price)
+        
+        # Round to the symbol's step size and reject LOT_SIZE/MIN_NOTIONAL violations locally
+        trade_quantity = exchange_info.normalize_quantity(symbol, trade_quantity, price)
+        
+        if signal == 'buy':
+            # Check quote currency (USDT) balance for buying
+            balance = get_account_balance(quote_asset, account)
+            if balance is None:
+                raise Exception("Failed to retrieve account balance")
+            required = trade_quantity * price if price > 0 else trade_quantity
+            if balance < required:
+                raise Exception(f"Insufficient {quote_asset} balance. Required: {required}, Available: {balance}")
+            
+            order = execute_buy_order(symbol, trade_quantity, account)
+            order_id = order.get('orderId')
+            quantity = order.get('executedQty')
+            record_fill(account, symbol, order, base_asset, quote_asset)
+            
+        elif signal == 'sell':
+            # Check base currency balance for selling
+            base_balance = get_account_balance(base_asset, account)
+            if base_balance is None:
+                raise Exception("Failed to retrieve account balance")
+            if base_balance < trade_quantity:
+                raise Exception(f"Insufficient {base_asset} balance. Required: {trade_quantity}, Available: {base_balance}")
+            
+            order = execute_sell_order(symbol, trade_quantity, account)
+            order_id = order.get('orderId')
+            quantity = order.get('executedQty')
+            record_fill(account, symbol, order, base_asset, quote_asset)
+        
+        logger.info("Trade executed successfully: %s %s %s", signal, quantity, symbol)
+        
+    except Exception as e:
+        status = 'error'
+        error = str(e)
+        logger.error(f"Trade execution failed: {error}")
+    
+    # Save trade to history
+    save_trade(timestamp, signal, symbol, price, order_id, status, quantity, error)
+    SIGNALS_TOTAL.labels(signal, status).inc()
+    
+    # Return response
+    response = {
+        'status': status,
+        'signal': signal,
+        'symbol': symbol,
+        'price': price,
+        'order_id': order_id,
+        'quantity': quantity,
+        'timestamp': timestamp
+    }
+    
+    if error:
+        response['error'] = error
+    
+    return response, 200 if status == 'success' else 500
+
+# ============================================================================
+# ALERT PATH
+# ============================================================================
+
+alert_index = AlertIndex(ttl=DEDUP_TTL, path=DEDUP_FILE or None)
+
+metrics.gauge('rate_limit_weight_available', 'Request weight left in the client-side budget',
+              lambda: rate_limiter.stats()['weight_available'])
+metrics.gauge('rate_limit_shed_total', 'Binance calls shed or timed out by the rate limiter',
+              lambda: rate_limiter.counters['shed'], kind='counter')
+metrics.gauge('dedup_duplicates_total', 'Duplicate alerts acknowledged without executing',
+              lambda: alert_index.duplicates if DEDUP_ENABLED else None, kind='counter')
+
+def claim_alert(data):
+    """
+    Record an alert's fingerprint (when de-duplication is on).
+    Returns (fingerprint, seen): `seen` is the earlier entry if this is a duplicate
+    """
+    if not DEDUP_ENABLED:
+        return None, None
+    fingerprint = alert_fingerprint(data, content_hash=DEDUP_CONTENT_HASH)
+    if fingerprint is None:
+        return None, None
+    seen = alert_index.check(fingerprint)
+    if seen:
+        logger.warning(f"Duplicate alert ignored ({fingerprint}, first seen {seen['age']}s ago)")
+    return fingerprint, seen
+
+def settle_alert(fingerprint, status, ref=None):
+    """Keep the fingerprint of an executed or queued alert; forget it otherwise so a retry goes through"""
+    if not fingerprint:
+        return
+    if status not in (200, 202):
+        alert_index.forget(fingerprint)
+    elif ref is not None:
+        alert_index.set_ref(fingerprint, ref)
+
+def duplicate_response(data, fingerprint, seen):
+    """Answer to an alert already seen within DEDUP_TTL"""
+    return {
+        'status': 'duplicate',
+        'fingerprint': fingerprint,
+        'signal': data['signal'],
+        'symbol': data['symbol'],
+        'job_id': seen['ref']
+    }, 200
+
+
+class AlertPipeline:
+    """
+    What both servers do with a parsed alert after de-duplication: hold buy/sell
+    alerts in the coalescing window (COALESCE_WINDOW), then queue them on their
+    account's workers (ORDER_QUEUE_ENABLED) or execute them now.
+
+    router()   - the server's current Router (routing can be reloaded at startup)
+    execute    - execute(data) -> (response, http_status); called from request
+                 threads, order workers and the coalescing window's timers
+    """
+
+    def __init__(self, router, execute):
+        self.router = router
+        self.execute = execute
+        self.coalescer = SignalCoalescer(COALESCE_WINDOW, self.size, self.dispatch) if COALESCE_WINDOW > 0 else None
+
+    def size(self, data):
+        """Order size an alert would get from its route (used to net coalesced alerts)"""
+        symbol = data.get('symbol', TRADING_PAIR)
+        _, route = self.router().resolve(symbol, data.get('strategy'), data.get('account'))
+        return order_size(route, data, data.get('price') or price_book.get(symbol) or 0)
+
+    def hold(self, data):
+        """Put a buy/sell alert in the coalescing window; None when coalescing is off"""
+        if not self.coalescer or data['signal'] not in ['buy', 'sell']:
+            return None
+        try:
+            account, _ = self.router().resolve(data['symbol'], data.get('strategy'), data.get('account'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        position = self.coalescer.add(data, account.name)
+        return {
+            'status': 'coalescing',
+            'signal': data['signal'],
+            'symbol': data['symbol'],
+            'window': COALESCE_WINDOW,
+            'position': position
+        }, 202
+
+    def enqueue(self, data):
+        """Queue a valid alert on its account's workers; None when it should execute now"""
+        if not ORDER_QUEUE_ENABLED:
+            return None
+        signal = str(data.get('signal', '')).lower()
+        symbol = data.get('symbol', TRADING_PAIR)
+        # Invalid alerts are answered (and journaled) right away
+        if signal not in ['buy', 'sell'] or (data.get('price') or 0) < 0:
+            return None
+        try:
+            account, _ = self.router().resolve(symbol, data.get('strategy'), data.get('account'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        try:
+            job = account.order_queue.submit(symbol, data)
+        except QueueFullError as e:
+            logger.error(str(e))
+            return {'error': str(e)}, 503
+        logger.info("Queued %s %s as job %s (%s)", signal, symbol, job['id'], account.name)
+        return {
+            'status': 'queued',
+            'job_id': job['id'],
+            'account': account.name,
+            'signal': signal,
+            'symbol': symbol,
+            'status_url': f"/jobs/{job['id']}"
+        }, 202
+
+    def dispatch(self, data):
+        """Queue an alert (queued mode) or execute it now"""
+        return self.enqueue(data) or self.execute(data)
+
+    def handle(self, data):
+        """De-duplicate, coalesce, then queue or execute an alert. Returns (response, http_status)"""
+        fingerprint, seen = claim_alert(data)
+        if seen:
+            return duplicate_response(data, fingerprint, seen)
+        body, status = self.hold(data) or self.dispatch(data)
+        settle_alert(fingerprint, status, body.get('job_id'))
+        return body, status
+
+    def find_job(self, job_id):
+        """Look up an order job across every account's queue"""
+        for account in self.router().all_accounts():
+            if account.order_queue:
+                job = account.order_queue.get_job(job_id)
+                if job:
+                    return job
+        return None
+
+# ============================================================================
+# CONNECTIVITY
+# ============================================================================
+
+class BinanceStatus:
+    """Last known Binance connectivity; a change is published to the dashboards as a 'status' event"""
+
+    def __init__(self, connected):
+        self.state = {'binance_connected': connected, 'binance_status': 'not_initialized', 'binance_error': None}
+
+    def update(self, status, error, connected=True):
+        changed = (status, error) != (self.state['binance_status'], self.state['binance_error'])
+        self.state.update({'binance_connected': connected, 'binance_status': status, 'binance_error': error})
+        if changed:
+            event_bus.publish('status', dict(self.state, timestamp=datetime.now().isoformat()))
+        return status, error
@@ -10,6 +10,7 @@ from dotenv import load_dotenv
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
 from datetime import datetime
+from exchange_sim import simulator_client
 
 # Load environment variables
 load_dotenv()
@@ -17,15 +18,25 @@ load_dotenv()
 # Initialize Binance client
 BINANCE_API_KEY = os.getenv('BINANCE_API_KEY')
 BINANCE_API_SECRET = os.getenv('BINANCE_API_SECRET')
+# Verify against the local exchange simulator (exchange_sim.py) instead of the testnet
+BINANCE_SIMULATOR_URL = os.getenv('BINANCE_SIMULATOR_URL', '').rstrip('/')
 
-if not BINANCE_API_KEY or BINANCE_API_KEY == 'your_testnet_api_key':
+if BINANCE_SIMULATOR_URL:
+    # The simulator doesn't check keys, so placeholders are fine
+    BINANCE_API_KEY = BINANCE_API_KEY or 'simulator'
+    BINANCE_API_SECRET = BINANCE_API_SECRET or 'simulator'
+elif not BINANCE_API_KEY or BINANCE_API_KEY == 'your_testnet_api_key':
     print("❌ Error: Binance API keys not configured in .env file")
     print("   Please set BINANCE_API_KEY and BINANCE_API_SECRET in .env")
     sys.exit(1)
 
 try:
-    client = Client(BINANCE_API_KEY, BINANCE_API_SECRET, testnet=True)
-    print("✅ Connected to Binance Testnet\n")
+    if BINANCE_SIMULATOR_URL:
+        client = simulator_client(Client, BINANCE_SIMULATOR_URL)(BINANCE_API_KEY, BINANCE_API_SECRET, testnet=True)
+        print(f"✅ Connected to Binance simulator at {BINANCE_SIMULATOR_URL}\n")
+    else:
+        client = Client(BINANCE_API_KEY, BINANCE_API_SECRET, testnet=True)
+        print("✅ Connected to Binance Testnet\n")
 except Exception as e:
     print(f"❌ Failed to connect: {e}")
     sys.exit(1)
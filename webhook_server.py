@@ -3,34 +3,44 @@ Automated Trading Bot - Webhook Server
 Receives TradingView alerts and executes trades on Binance Testnet
 """
 
-import json
 import logging
-import csv
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
-import requests
+from order_queue import OrderQueue
+from balance_cache import BalanceCache
+from reconciler import FillReconciler
+from signal_engine import SignalEngine
+from signal_parser import parse_payload, signal_error, signal_from_dict
+from routing import Account, Router, load_routing_config
+from rate_limiter import LimitedClient, RateLimitExceeded, PRIORITY_DASHBOARD
+from exchange_sim import simulator_client
+import metrics
+from logging_config import LazyJson, setup_logging
+# Configuration (read from the environment and .env) and state shared with async_server.py
+import trading_core
+from trading_core import (
+    BALANCE_CHECK_SECONDS, BALANCE_MAX_AGE, BALANCE_REFRESH_INTERVAL, BATCH_MAX_LEGS, BATCH_SECONDS,
+    BATCH_WORKERS, BINANCE_API_KEY, BINANCE_API_SECRET, BINANCE_SIMULATOR_URL, BINANCE_TESTNET,
+    DEDUP_ENABLED, EXCHANGE_INFO_REFRESH_INTERVAL, HEALTH_CHECK_INTERVAL, ORDER_QUEUE_ENABLED,
+    ORDER_QUEUE_SIZE, ORDER_WORKERS, PARSE_SECONDS, PRICE_STREAM_ENABLED, PRICE_STREAM_URL,
+    RECONCILE_ENABLED, RECONCILE_INTERVAL, RECONCILE_MAX_PAGES, ROUTING_CONFIG, SIGNALS_TOTAL,
+    SIGNAL_ENGINE_ENABLED, SIGNAL_INTERVAL, SIGNAL_RULES, SIGNAL_STRATEGY_ID, SIGNAL_SYMBOLS,
+    SIGNAL_WARMUP_BARS, TRADE_AMOUNT, TRADING_PAIR, WEBHOOK_SECONDS, AlertPipeline, BinanceStatus,
+    account_credentials, alert_index, build_account, claim_alert, event_bus, exchange_info,
+    execute_buy_order, execute_sell_order, format_balances, history_page, init_trade_history, order_size,
+    position_book, price_stream, publish_balances, rate_limiter, record_fill, save_trades, settle_alert,
+    start_price_stream, trade_journal
+)
 
-# Load environment variables from .env file FIRST (before reading env vars)
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-    print("✓ Loaded environment variables from .env file")
-except ImportError:
+if trading_core.load_dotenv is None:
     print("⚠ python-dotenv not installed. Install with: pip install python-dotenv")
     print("⚠ Will try to use system environment variables instead")
-except Exception as e:
-    print(f"⚠ Warning: Could not load .env file: {e}")
-
-# ============================================================================
-# CONFIGURATION
-# ============================================================================
-
-# Load configuration from environment variables or config file
-BINANCE_API_KEY = os.getenv('BINANCE_API_KEY', 'your_testnet_api_key')
-BINANCE_API_SECRET = os.getenv('BINANCE_API_SECRET', 'your_testnet_api_secret')
 
 # Debug: Check if keys are loaded (without showing actual keys)
 if BINANCE_API_KEY and BINANCE_API_KEY != 'your_testnet_api_key':
@@ -42,21 +52,12 @@ if BINANCE_API_SECRET and BINANCE_API_SECRET != 'your_testnet_api_secret':
     print(f"✓ API Secret loaded (length: {len(BINANCE_API_SECRET)})")
 else:
     print("⚠ API Secret not found or using default placeholder")
-BINANCE_TESTNET = True  # Always use testnet
-
-# Trading parameters
-TRADING_PAIR = os.getenv('TRADING_PAIR', 'BTCUSDT')
-TRADE_AMOUNT = float(os.getenv('TRADE_AMOUNT', '0.001'))  # Amount in base currency (BTC)
-
-# Logging setup
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('trading_bot.log'),
-        logging.StreamHandler()
-    ]
-)
+
+# Local exchange simulator (exchange_sim.py): when set, all Binance REST calls go there instead of the testnet
+BinanceClient = simulator_client(Client, BINANCE_SIMULATOR_URL) if BINANCE_SIMULATOR_URL else Client
+
+# Logging setup: records are queued and written by a background thread (see logging_config.py)
+log_handler = setup_logging()
 logger = logging.getLogger(__name__)
 
 # Flask app
@@ -64,352 +65,394 @@ app = Flask(__name__, static_folder='static', static_url_path='')
 
 # Initialize Binance client
 try:
-    client = Client(BINANCE_API_KEY, BINANCE_API_SECRET, testnet=BINANCE_TESTNET)
-    logger.info("Binance Testnet client initialized successfully")
+    client = LimitedClient(BinanceClient(BINANCE_API_KEY, BINANCE_API_SECRET, testnet=BINANCE_TESTNET), rate_limiter)
+    if BINANCE_SIMULATOR_URL:
+        logger.info(f"Binance client initialized against the simulator at {BINANCE_SIMULATOR_URL}")
+    else:
+        logger.info("Binance Testnet client initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize Binance client: {e}")
     client = None
 
 # ============================================================================
-# TRADE HISTORY STORAGE
+# BALANCE CACHE
 # ============================================================================
 
-TRADE_HISTORY_FILE = 'trade_history.csv'
-
-def init_trade_history():
-    """Initialize CSV file for trade history if it doesn't exist"""
-    if not os.path.exists(TRADE_HISTORY_FILE):
-        with open(TRADE_HISTORY_FILE, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                'timestamp', 'signal', 'symbol', 'price', 'order_id', 
-                'status', 'quantity', 'error'
-            ])
-        logger.info(f"Created trade history file: {TRADE_HISTORY_FILE}")
-
-def save_trade(timestamp, signal, symbol, price, order_id=None, status='pending', quantity=None, error=None):
-    """Save trade to CSV file"""
-    try:
-        with open(TRADE_HISTORY_FILE, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                timestamp, signal, symbol, price, order_id, status, quantity, error
-            ])
-        logger.info(f"Trade saved to history: {signal} {symbol} @ {price}")
-    except Exception as e:
-        logger.error(f"Failed to save trade to history: {e}")
+def fetch_account():
+    """Fetch the full account from Binance (used by the balance cache)"""
+    if not client:
+        raise Exception("Binance client not initialized")
+    return client.get_account()
+
+balance_cache = BalanceCache(
+    fetch_account,
+    max_age=BALANCE_MAX_AGE,
+    refresh_interval=BALANCE_REFRESH_INTERVAL,
+    on_change=publish_balances
+)
 
 # ============================================================================
-# TRADING FUNCTIONS
+# PRICES
 # ============================================================================
 
-def get_account_balance(symbol='USDT'):
-    """Get account balance for a specific symbol"""
-    try:
-        if not client:
-            return None
-        account = client.get_account()
-        for balance in account['balances']:
-            if balance['asset'] == symbol:
-                return float(balance['free'])
-        return 0.0
-    except Exception as e:
-        logger.error(f"Failed to get account balance: {e}")
-        return None
+def get_market_price(symbol):
+    """Current price of `symbol` (price book first, then the main client; see trading_core.get_market_price)"""
+    return trading_core.get_market_price(symbol, client)
 
-def execute_buy_order(symbol, quantity):
-    """Execute a market buy order"""
-    try:
-        if not client:
-            raise Exception("Binance client not initialized")
-        
-        logger.info(f"Executing BUY order: {quantity} {symbol}")
-        
-        # Place market buy order
-        order = client.create_order(
-            symbol=symbol,
-            side=Client.SIDE_BUY,
-            type=Client.ORDER_TYPE_MARKET,
-            quantity=quantity
-        )
-        
-        logger.info(f"BUY order executed successfully: {order}")
-        return order
-    except BinanceAPIException as e:
-        error_msg = f"Binance API error: {e.message}"
-        logger.error(error_msg)
-        raise Exception(error_msg)
-    except Exception as e:
-        error_msg = f"Failed to execute BUY order: {e}"
-        logger.error(error_msg)
-        raise Exception(error_msg)
+# ============================================================================
+# ORDER QUEUE
+# ============================================================================
+
+order_queue = OrderQueue(
+    lambda data: process_signal(data),
+    num_workers=ORDER_WORKERS,
+    max_pending=ORDER_QUEUE_SIZE
+)
+
+# ============================================================================
+# ACCOUNT ROUTING
+# ============================================================================
+
+# The account behind the server's own API keys; also the router's fallback
+default_account = Account('main', client, balance_cache, order_queue)
+router = Router({'main': default_account}, [], 'main')
+
+# De-duplication, coalescing and order queues in front of process_signal (see trading_core.py)
+alert_pipeline = AlertPipeline(lambda: router, lambda data: process_signal(data))
+
+def set_client(new_client):
+    """Swap the main Binance client (e.g. for a simulator or a stub in benchmarks)"""
+    global client
+    client = LimitedClient(new_client, rate_limiter) if new_client else None
+    default_account.client = client
 
-def execute_sell_order(symbol, quantity):
-    """Execute a market sell order"""
+def make_account(name, settings):
+    """Create a routed sub-account from its routing-config entry"""
+    api_key, api_secret, testnet = account_credentials(settings)
     try:
-        if not client:
-            raise Exception("Binance client not initialized")
-        
-        logger.info(f"Executing SELL order: {quantity} {symbol}")
-        
-        # Place market sell order
-        order = client.create_order(
-            symbol=symbol,
-            side=Client.SIDE_SELL,
-            type=Client.ORDER_TYPE_MARKET,
-            quantity=quantity
-        )
-        
-        logger.info(f"SELL order executed successfully: {order}")
-        return order
-    except BinanceAPIException as e:
-        error_msg = f"Binance API error: {e.message}"
-        logger.error(error_msg)
-        raise Exception(error_msg)
+        account_client = LimitedClient(BinanceClient(api_key, api_secret, testnet=testnet), rate_limiter, account=name)
+        logger.info(f"Binance client initialized for account '{name}'")
     except Exception as e:
-        error_msg = f"Failed to execute SELL order: {e}"
-        logger.error(error_msg)
-        raise Exception(error_msg)
+        logger.error(f"Failed to initialize Binance client for account '{name}': {e}")
+        account_client = None
+    
+    def fetch():
+        if not account.client:
+            raise Exception(f"Binance client for account '{name}' not initialized")
+        return account.client.get_account()
+    
+    account = build_account(name, account_client, lambda data: process_signal(data), fetch=fetch, settings=settings)
+    return account
 
-def get_base_currency_balance(symbol):
-    """Get balance of base currency (e.g., BTC for BTCUSDT)"""
-    base_currency = symbol.replace('USDT', '').replace('USD', '')
-    return get_account_balance(base_currency)
+def init_routing():
+    """Load exchange info and the routing config file (if present) at startup"""
+    global router
+    default_account.client = client
+    if client:
+        try:
+            exchange_info.refresh(client)
+        except Exception as e:
+            logger.warning(f"Could not load exchange info, guessing base/quote assets from symbols: {e}")
+        exchange_info.start(lambda: client, interval=EXCHANGE_INFO_REFRESH_INTERVAL)
+    if os.path.exists(ROUTING_CONFIG):
+        router = load_routing_config(ROUTING_CONFIG, make_account, default_account)
+
+# Checks journaled orders against each account's exchange history (see reconciler.py)
+fill_reconciler = FillReconciler(
+    trade_journal,
+    lambda: [(account.name, account.client) for account in router.all_accounts()],
+    limiter=rate_limiter,
+    interval=RECONCILE_INTERVAL,
+    max_pages=RECONCILE_MAX_PAGES
+)
+
+# Strategy signals generated in-process from the kline stream, executed through handle_alert
+signal_engine = SignalEngine(
+    SIGNAL_SYMBOLS,
+    lambda alert: handle_alert(alert),
+    interval=SIGNAL_INTERVAL,
+    rules=SIGNAL_RULES,
+    fetch_klines=lambda **params: client.get_klines(**params),
+    warmup=SIGNAL_WARMUP_BARS,
+    url=PRICE_STREAM_URL,
+    strategy_id=SIGNAL_STRATEGY_ID
+) if SIGNAL_ENGINE_ENABLED else None
 
 # ============================================================================
 # WEBHOOK ENDPOINT
 # ============================================================================
 
-def parse_tradingview_message(message):
-    """Parse TradingView alert message in format: 'order buy @ 0.001 filled on BTCUSDT'"""
-    try:
-        import re
-        # Pattern: "order buy @ 0.001 filled on BTCUSDT"
-        # Handles: "order {{strategy.order.action}} @ {{strategy.order.contracts}} filled on {{ticker}}"
-        # Extract signal (buy/sell)
-        signal_match = re.search(r'order\s+(buy|sell)', message, re.IGNORECASE)
-        if not signal_match:
-            return None
-        
-        signal = signal_match.group(1).lower()
-        
-        # Extract symbol (ticker)
-        symbol_match = re.search(r'filled\s+on\s+(\w+)', message, re.IGNORECASE)
-        if not symbol_match:
-            return None
-        
-        symbol = symbol_match.group(1).upper()
-        
-        # Extract quantity (contracts) - this is the amount, not price
-        quantity_match = re.search(r'@\s+([\d.]+)', message)
-        quantity = float(quantity_match.group(1)) if quantity_match else 0
-        
-        # Price is not in the message, we'll need to get it from the market
-        # For now, set to 0 and it will be fetched if needed
-        price = 0
-        
-        return {'signal': signal, 'symbol': symbol, 'price': price, 'quantity': quantity}
-    except Exception as e:
-        logger.warning(f"Failed to parse TradingView message: {e}")
-    return None
-
 @app.route('/webhook', methods=['POST'])
+@WEBHOOK_SECONDS.time()
 def webhook():
     """Receive TradingView webhook alerts"""
     try:
-        data = None
-        raw_data = None
-        
-        # Try to get data based on Content-Type
         content_type = request.content_type or ''
         
-        logger.info(f"Received webhook with Content-Type: {content_type}")
-        
-        # Try JSON first (if Content-Type is application/json)
-        if 'application/json' in content_type:
-            try:
-                data = request.get_json()
-                logger.info("Parsed as JSON")
-            except Exception as e:
-                logger.warning(f"JSON parsing failed: {e}")
-        
-        # If no JSON data, try form data
-        if not data and request.form:
-            logger.info("Trying to parse as form data")
-            signal = request.form.get('signal', '').lower()
-            if not signal:
-                # Try to extract from message field (common in TradingView)
-                message = request.form.get('message', '') or request.form.get('text', '')
-                if message:
-                    raw_data = message
-                else:
-                    # Try all form fields
-                    signal = request.form.get('{{strategy.order.action}}', '').lower()
-                    symbol = request.form.get('{{ticker}}', TRADING_PAIR)
-            else:
-                symbol = request.form.get('symbol', request.form.get('{{ticker}}', TRADING_PAIR))
-                price = request.form.get('price', request.form.get('{{close}}', 0))
-                try:
-                    price = float(price) if price else 0
-                except:
-                    price = 0
-                data = {'signal': signal, 'symbol': symbol, 'price': price}
-                logger.info(f"Parsed from form data: {data}")
-        
-        # If still no data, try raw body
-        if not data:
-            try:
-                raw_data = request.data.decode('utf-8')
-                logger.info(f"Raw data received: {raw_data[:200]}")
-            except:
-                raw_data = str(request.data)
-        
-        # Try parsing raw data as JSON string
-        if not data and raw_data:
-            try:
-                data = json.loads(raw_data)
-                logger.info("Parsed raw data as JSON")
-            except:
-                pass
-        
-        # Try parsing as TradingView template message format
-        if not data and raw_data:
-            parsed = parse_tradingview_message(raw_data)
-            if parsed:
-                data = parsed
-                logger.info(f"Parsed TradingView message format: {data}")
-        
-        # If still no data, try to extract from query parameters
-        if not data:
-            signal = request.args.get('signal', '').lower()
-            if signal:
-                data = {
-                    'signal': signal,
-                    'symbol': request.args.get('symbol', TRADING_PAIR),
-                    'price': float(request.args.get('price', 0))
-                }
-                logger.info(f"Parsed from query params: {data}")
+        # Multipart bodies are the only case that needs Werkzeug's form decoding
+        form = request.form if 'multipart/form-data' in content_type else None
+        parse_start = time.perf_counter()
+        parsed = parse_payload(
+            content_type,
+            request.get_data(cache=True),
+            args=request.args,
+            form=form,
+            default_symbol=TRADING_PAIR
+        )
+        PARSE_SECONDS.observe(time.perf_counter() - parse_start)
         
-        # Final fallback - log everything for debugging
-        if not data:
-            logger.error(f"Could not parse webhook. Content-Type: {content_type}")
-            logger.error(f"Form data: {dict(request.form)}")
-            logger.error(f"Raw data: {raw_data[:500] if raw_data else 'None'}")
-            logger.error(f"Headers: {dict(request.headers)}")
+        if parsed is None:
+            raw_data = request.get_data(as_text=True)
+            logger.error(f"Could not parse webhook. Content-Type: {content_type}, raw data: {raw_data[:500] or 'None'}")
             return jsonify({
                 'error': 'Could not parse webhook payload',
                 'content_type': content_type,
-                'hint': 'Make sure your TradingView alert sends data in JSON format or TradingView message format'
+                'hint': 'Send JSON, form fields, signal|symbol|price or the TradingView template message'
             }), 400
         
-        logger.info(f"Received webhook: {json.dumps(data, indent=2)}")
-        
-        # Extract signal information
-        signal = data.get('signal', '').lower()
-        symbol = data.get('symbol', TRADING_PAIR)
-        price = data.get('price', 0)
-        quantity_from_alert = data.get('quantity', None)  # Quantity from TradingView alert
-        timestamp = datetime.now().isoformat()
-        
-        # If price is 0, try to get current market price
-        if price == 0 and client:
-            try:
-                ticker = client.get_symbol_ticker(symbol=symbol)
-                price = float(ticker['price'])
-                logger.info(f"Fetched current market price for {symbol}: {price}")
-            except Exception as e:
-                logger.warning(f"Could not fetch market price: {e}")
-        
-        if signal not in ['buy', 'sell']:
-            error_msg = f"Invalid signal: {signal}. Must be 'buy' or 'sell'"
-            logger.error(error_msg)
-            save_trade(timestamp, signal, symbol, price, status='error', error=error_msg)
-            return jsonify({'error': error_msg}), 400
+        data = parsed.to_dict()
+        logger.info("Received webhook (%s): %s", parsed.format, LazyJson(data),
+                    extra={'format': parsed.format, 'alert': data})
         
-        # Execute trade based on signal
-        order = None
-        order_id = None
-        quantity = None
-        status = 'success'
-        error = None
+        return handle_alert(data)
         
+    except Exception as e:
+        error_msg = f"Webhook processing error: {e}"
+        logger.error(error_msg)
+        return jsonify({'error': error_msg}), 500
+
+def handle_alert(data):
+    """
+    Everything /webhook does with a parsed alert: de-duplicate, coalesce, then
+    queue or execute it. Shared with the in-process signal engine.
+    Returns (response, http_status)
+    """
+    return alert_pipeline.handle(data)
+
+def process_signal(data):
+    """Execute a parsed signal on its routed account and record it (see trading_core.process_signal)"""
+    return trading_core.process_signal(data, router)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status of a queued order job"""
+    job = alert_pipeline.find_job(job_id)
+    if not job:
+        return jsonify({'error': f'Unknown job: {job_id}'}), 404
+    return jsonify(job), 200
+
+# ============================================================================
+# BATCH ENDPOINT
+# ============================================================================
+
+# Orders of different symbols in a batch are placed in parallel on this pool
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+
+def plan_leg(data):
+    """Resolve a batch leg's account, price and normalized quantity (raises on a bad leg)"""
+    signal = data['signal']
+    symbol = data['symbol']
+    price = data.get('price') or 0
+    if price == 0 and signal in ['buy', 'sell']:
         try:
-            # Use quantity from alert if available, otherwise use default TRADE_AMOUNT
-            trade_quantity = quantity_from_alert if quantity_from_alert else TRADE_AMOUNT
-            
-            if signal == 'buy':
-                # Check USDT balance for buying
-                balance = get_account_balance('USDT')
-                if balance is None:
-                    raise Exception("Failed to retrieve account balance")
-                required = trade_quantity * price if price > 0 else trade_quantity
-                if balance < required:
-                    raise Exception(f"Insufficient USDT balance. Required: {required}, Available: {balance}")
-                
-                order = execute_buy_order(symbol, trade_quantity)
-                order_id = order.get('orderId')
-                quantity = order.get('executedQty')
-                
-            elif signal == 'sell':
-                # Check base currency balance for selling
-                base_balance = get_base_currency_balance(symbol)
-                if base_balance is None:
-                    raise Exception("Failed to retrieve account balance")
-                if base_balance < trade_quantity:
-                    raise Exception(f"Insufficient {symbol} balance. Required: {trade_quantity}, Available: {base_balance}")
-                
-                order = execute_sell_order(symbol, trade_quantity)
-                order_id = order.get('orderId')
-                quantity = order.get('executedQty')
-            
-            logger.info(f"Trade executed successfully: {signal} {quantity} {symbol}")
-            
+            price = get_market_price(symbol) or 0
         except Exception as e:
-            status = 'error'
-            error = str(e)
-            logger.error(f"Trade execution failed: {error}")
-        
-        # Save trade to history
-        save_trade(timestamp, signal, symbol, price, order_id, status, quantity, error)
-        
-        # Return response
-        response = {
-            'status': status,
-            'signal': signal,
-            'symbol': symbol,
-            'price': price,
-            'order_id': order_id,
-            'quantity': quantity,
-            'timestamp': timestamp
-        }
-        
-        if error:
-            response['error'] = error
-        
-        return jsonify(response), 200 if status == 'success' else 500
-        
+            logger.warning(f"Could not fetch market price: {e}")
+    error_msg = signal_error(signal, price)
+    if error_msg:
+        raise ValueError(error_msg)
+    data['price'] = price
+    account, route = router.resolve(symbol, data.get('strategy'), data.get('account'))
+    quantity = exchange_info.normalize_quantity(symbol, order_size(route, data, price), price)
+    base_asset, quote_asset = exchange_info.assets(symbol)
+    return {'account': account, 'quantity': quantity, 'base': base_asset, 'quote': quote_asset}
+
+@BALANCE_CHECK_SECONDS.time()
+def reserve_balances(legs):
+    """
+    Check every planned leg against one balance snapshot per account, in order.
+    Each accepted leg reserves what it spends, so later legs see what's left;
+    a leg that doesn't fit gets an error instead of an order.
+    """
+    available = {}
+    for leg in legs:
+        account = leg['plan']['account']
+        if account.name not in available:
+            if not account.client:
+                available[account.name] = None
+            else:
+                try:
+                    available[account.name] = {a: e['free'] for a, e in account.balance_cache.snapshot().items()}
+                except Exception as e:
+                    logger.error(f"Failed to get account balance: {e}")
+                    available[account.name] = None
+        balances = available[account.name]
+        if balances is None:
+            leg['error'] = "Failed to retrieve account balance"
+            continue
+        plan = leg['plan']
+        if leg['signal'] == 'buy':
+            asset = plan['quote']
+            required = plan['quantity'] * leg['price'] if leg['price'] > 0 else plan['quantity']
+        else:
+            asset = plan['base']
+            required = plan['quantity']
+        balance = balances.get(asset, 0.0)
+        if balance < required:
+            leg['error'] = f"Insufficient {asset} balance. Required: {required}, Available: {balance}"
+        else:
+            balances[asset] = balance - required
+
+def execute_legs(legs):
+    """Place one symbol's orders in batch order (runs on the batch pool)"""
+    for leg in legs:
+        plan = leg['plan']
+        account = plan['account']
+        try:
+            if leg['signal'] == 'buy':
+                order = execute_buy_order(leg['symbol'], plan['quantity'], account)
+            else:
+                order = execute_sell_order(leg['symbol'], plan['quantity'], account)
+            leg['order_id'] = order.get('orderId')
+            leg['quantity'] = order.get('executedQty')
+            record_fill(account, leg['symbol'], order, plan['base'], plan['quote'])
+        except Exception as e:
+            leg['error'] = str(e)
+
+@app.route('/webhook/batch', methods=['POST'])
+@BATCH_SECONDS.time()
+def webhook_batch():
+    """
+    Execute a basket of signals in one request: a JSON array of alerts (or
+    {"signals": [...]}). Balances are checked once per account against the
+    cached snapshot, each symbol's orders are placed on their own thread,
+    and every leg is journaled in a single transaction.
+    """
+    parse_start = time.perf_counter()
+    payload = request.get_json(force=True, silent=True)
+    items = payload.get('signals') if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Batch body must be a JSON array of signals or {"signals": [...]}'}), 400
+    if len(items) > BATCH_MAX_LEGS:
+        return jsonify({'error': f'Batch has {len(items)} signals; at most {BATCH_MAX_LEGS} are allowed'}), 400
+    try:
+        return process_batch(items, parse_start)
     except Exception as e:
-        error_msg = f"Webhook processing error: {e}"
+        error_msg = f"Batch processing error: {e}"
         logger.error(error_msg)
         return jsonify({'error': error_msg}), 500
 
+def process_batch(items, parse_start):
+    """Parse, check, execute and journal a batch of alerts. Returns (response, http_status)"""
+    timestamp = datetime.now().isoformat()
+    legs = []
+    for index, item in enumerate(items):
+        parsed = signal_from_dict(item, TRADING_PAIR, fmt='batch')
+        data = parsed.to_dict() if parsed else {'signal': '', 'symbol': TRADING_PAIR, 'price': 0}
+        legs.append({'index': index, 'data': data, 'signal': data['signal'], 'symbol': data['symbol'],
+                     'price': data['price'], 'order_id': None, 'quantity': None,
+                     'error': None if parsed else 'Could not parse signal'})
+    PARSE_SECONDS.observe(time.perf_counter() - parse_start)
+    logger.info("Received batch of %d signals: %s", len(legs), LazyJson([leg['data'] for leg in legs]),
+                extra={'format': 'batch', 'alerts': [leg['data'] for leg in legs]})
+
+    planned = []
+    for leg in legs:
+        if leg['error']:
+            continue
+        leg['fingerprint'], seen = claim_alert(leg['data'])
+        if seen:
+            leg['duplicate'] = seen
+            continue
+        try:
+            leg['plan'] = plan_leg(leg['data'])
+            planned.append(leg)
+        except Exception as e:
+            leg['error'] = str(e)
+        leg['price'] = leg['data']['price']
+
+    reserve_balances(planned)
+
+    # Legs on the same account and symbol run in order; different symbols run concurrently
+    lanes = {}
+    for leg in planned:
+        if not leg['error']:
+            lanes.setdefault((leg['plan']['account'].name, leg['symbol']), []).append(leg)
+    for future in [batch_executor.submit(execute_legs, lane) for lane in lanes.values()]:
+        future.result()
+
+    results, trades = [], []
+    for leg in legs:
+        result = {'index': leg['index'], 'signal': leg['signal'], 'symbol': leg['symbol'], 'price': leg['price']}
+        if leg.get('duplicate'):
+            result.update(status='duplicate', fingerprint=leg['fingerprint'], order_id=leg['duplicate']['ref'])
+            results.append(result)
+            continue
+        status = 'error' if leg['error'] else 'success'
+        settle_alert(leg.get('fingerprint'), 200 if status == 'success' else 500, leg['order_id'])
+        result.update(status=status, order_id=leg['order_id'], quantity=leg['quantity'], timestamp=timestamp)
+        if 'plan' in leg:
+            result['account'] = leg['plan']['account'].name
+        if leg['error']:
+            result['error'] = leg['error']
+            logger.error(f"Batch leg {leg['index']} failed: {leg['error']}")
+        results.append(result)
+        trades.append({
+            'timestamp': timestamp, 'signal': leg['signal'], 'symbol': leg['symbol'], 'price': leg['price'],
+            'order_id': leg['order_id'], 'status': status, 'quantity': leg['quantity'], 'error': leg['error']
+        })
+        SIGNALS_TOTAL.labels(leg['signal'] if leg['signal'] in ['buy', 'sell'] else 'invalid', status).inc()
+
+    # One journal transaction for the whole batch
+    if trades:
+        save_trades(trades)
+
+    succeeded = sum(1 for r in results if r['status'] == 'success')
+    failed = sum(1 for r in results if r['status'] == 'error')
+    status = 'success' if not failed else 'partial' if succeeded else 'error'
+    body = {'status': status, 'legs': results, 'succeeded': succeeded, 'failed': failed}
+    return jsonify(body), 200 if not failed else 207 if succeeded else 500
+
+# ============================================================================
+# DASHBOARD EVENTS
+# ============================================================================
+
+connectivity = BinanceStatus(client is not None)
+
+def check_binance_status():
+    """Ping Binance once and publish a status event if connectivity changed"""
+    if client is None:
+        return connectivity.update('not_initialized', 'Binance client not initialized. Check API keys.', False)
+    try:
+        with rate_limiter.priority(PRIORITY_DASHBOARD):
+            client.ping()
+    except RateLimitExceeded:
+        # Ping shed to save request weight: report the last known state
+        return connectivity.state['binance_status'], connectivity.state['binance_error']
+    except Exception as e:
+        return connectivity.update('error', str(e))
+    return connectivity.update('connected', None)
+
+def connectivity_monitor():
+    """Background loop: one Binance ping per interval, shared by every dashboard"""
+    while True:
+        check_binance_status()
+        time.sleep(HEALTH_CHECK_INTERVAL)
+
+@app.route('/events', methods=['GET'])
+def events():
+    """Server-Sent Events stream of trade, balance and status changes for the dashboard"""
+    subscriber = event_bus.subscribe()
+    response = Response(event_bus.stream(subscriber), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    binance_status = 'not_initialized'
-    binance_error = None
-    
-    if client is None:
-        binance_status = 'not_initialized'
-        binance_error = 'Binance client not initialized. Check API keys.'
-    else:
-        try:
-            # Try a simple API call to verify connection
-            client.ping()
-            binance_status = 'connected'
-        except Exception as e:
-            binance_status = 'error'
-            binance_error = str(e)
+    # Try a simple API call to verify connection
+    binance_status, binance_error = check_binance_status()
     
     return jsonify({
         'status': 'healthy',
@@ -417,10 +460,44 @@ def health():
         'binance_connected': client is not None,
         'binance_status': binance_status,
         'binance_error': binance_error,
+        'binance_simulator': BINANCE_SIMULATOR_URL or None,
         'api_key_set': bool(BINANCE_API_KEY and BINANCE_API_KEY != 'your_testnet_api_key'),
-        'api_secret_set': bool(BINANCE_API_SECRET and BINANCE_API_SECRET != 'your_testnet_api_secret')
+        'api_secret_set': bool(BINANCE_API_SECRET and BINANCE_API_SECRET != 'your_testnet_api_secret'),
+        'order_queue': {a.name: a.order_queue.stats() for a in router.all_accounts()} if ORDER_QUEUE_ENABLED else None,
+        'balance_cache_age': round(balance_cache.age(), 3) if balance_cache.age() < 1e9 else None,
+        'price_stream_connected': price_stream.connected,
+        'rate_limit': rate_limiter.stats(),
+        'dedup': alert_index.stats() if DEDUP_ENABLED else None,
+        'coalescing': alert_pipeline.coalescer.stats() if alert_pipeline.coalescer else None,
+        'reconciler': fill_reconciler.stats() if RECONCILE_ENABLED else None,
+        'signal_engine': signal_engine.stats() if signal_engine else None
     }), 200
 
+# Point-in-time values read when /metrics is scraped
+metrics.gauge('balance_cache_age_seconds', 'Age of the account balance snapshot',
+              lambda: round(balance_cache.age(), 3) if balance_cache.age() < 1e9 else None)
+metrics.gauge('order_queue_pending', 'Orders waiting on the worker pools',
+              lambda: sum(sum(a.order_queue.stats()['pending']) for a in router.all_accounts()) if ORDER_QUEUE_ENABLED else None)
+metrics.gauge('log_records_dropped_total', 'Log records dropped because the logging queue was full',
+              lambda: log_handler.dropped, kind='counter')
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text-format metrics: per-stage latency histograms, Binance call timings, counters"""
+    return Response(metrics.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+@app.route('/positions', methods=['GET'])
+def positions():
+    """Positions and PnL from the local ledger (?account=&symbol= to filter); no Binance calls"""
+    account = request.args.get('account')
+    symbol = request.args.get('symbol', '').upper() or None
+    if account and symbol:
+        position = position_book.get(account, symbol)
+        rows = [position] if position else []
+    else:
+        rows = position_book.all(account=account, symbol=symbol)
+    return jsonify({'positions': rows, 'totals': position_book.totals(rows), 'count': len(rows)}), 200
+
 @app.route('/balance', methods=['GET'])
 def balance():
     """Get account balances"""
@@ -431,7 +508,11 @@ def balance():
             return jsonify({'error': error_msg, 'details': 'Make sure BINANCE_API_KEY and BINANCE_API_SECRET are set correctly'}), 500
         
         try:
-            account = client.get_account()
+            with rate_limiter.priority(PRIORITY_DASHBOARD):
+                all_balances = balance_cache.snapshot()
+        except RateLimitExceeded:
+            # Refresh shed to save request weight for trading: serve the last snapshot
+            all_balances = balance_cache.snapshot(refresh=False)
         except BinanceAPIException as e:
             error_msg = f"Binance API error: {e.message}"
             logger.error(error_msg)
@@ -448,25 +529,9 @@ def balance():
                 'details': 'Network error or invalid API credentials'
             }), 500
         
-        balances = {}
-        # Top 5 trading assets to display (most commonly traded)
-        trading_assets = ['USDT', 'BTC', 'ETH', 'BNB', 'BUSD']
-        
         try:
-            # Collect all balances first
-            all_balances = {}
-            for balance in account['balances']:
-                free_balance = float(balance['free'])
-                if free_balance > 0:
-                    all_balances[balance['asset']] = {
-                        'free': balance['free'],
-                        'locked': balance['locked']
-                    }
-            
             # Only show the top 5 trading assets that have balance
-            for asset in trading_assets:
-                if asset in all_balances:
-                    balances[asset] = all_balances[asset]
+            balances = format_balances(all_balances)
             
             # If we have less than 5, show what we have
             # (This handles cases where testnet doesn't have all assets)
@@ -488,17 +553,18 @@ def balance():
 
 @app.route('/history', methods=['GET'])
 def history():
-    """Get trade history"""
+    """Get trade history (see history_page for the query parameters)"""
     try:
-        if not os.path.exists(TRADE_HISTORY_FILE):
-            return jsonify({'trades': []}), 200
-        
-        trades = []
-        with open(TRADE_HISTORY_FILE, 'r') as f:
-            reader = csv.DictReader(f)
-            trades = list(reader)
-        
-        return jsonify({'trades': trades}), 200
+        body, etag, status = history_page(
+            request.args,
+            request.query_string.decode(),
+            if_none_match=[tag for tag in request.if_none_match]
+        )
+        response = jsonify(body) if body is not None else app.response_class()
+        response.status_code = status
+        if etag:
+            response.set_etag(etag)
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -524,13 +590,41 @@ if __name__ == '__main__':
     # Initialize trade history file
     init_trade_history()
     
+    # Load exchange info and account routing
+    init_routing()
+    
+    if DEDUP_ENABLED:
+        alert_index.load()
+    
+    # Restore the position ledger and keep snapshotting it
+    position_book.start()
+    
+    for account in router.all_accounts():
+        if ORDER_QUEUE_ENABLED and account.order_queue:
+            account.order_queue.start()
+        if account.client:
+            account.balance_cache.start()
+    
+    if PRICE_STREAM_ENABLED:
+        start_price_stream(router)
+    
+    if RECONCILE_ENABLED and client:
+        fill_reconciler.start()
+    
+    if signal_engine:
+        signal_engine.start()
+    
+    # One shared connectivity check feeds every dashboard via /events
+    threading.Thread(target=connectivity_monitor, name="connectivity-monitor", daemon=True).start()
+    
     logger.info("Starting Trading Bot Webhook Server...")
     logger.info(f"Trading Pair: {TRADING_PAIR}")
     logger.info(f"Trade Amount: {TRADE_AMOUNT}")
+    logger.info(f"Order queue: {'enabled (' + str(ORDER_WORKERS) + ' workers)' if ORDER_QUEUE_ENABLED else 'disabled'}")
     logger.info("Server will listen on http://localhost:5000")
     logger.info("Dashboard available at: http://localhost:5000/")
     logger.info("Webhook endpoint: http://localhost:5000/webhook")
     
-    # Run Flask app
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    # Run Flask app (threaded so /events streams don't block other requests)
+    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
 